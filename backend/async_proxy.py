@@ -0,0 +1,313 @@
+# ============================================
+# FEATURE #11: Asyncio Proxy Engine
+# File: backend/async_proxy.py
+# Purpose: Serve /proxy/request with non-blocking upstream I/O
+# Run with: uvicorn async_proxy:app --port 8000
+# ============================================
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import JSONResponse
+
+import proxy
+from circuit_breaker import CircuitOpenError
+from concurrency_limiter import ConcurrencyLimitExceeded
+from config import config
+from prom_metrics import instrument_fastapi
+from response_normalizer import CHUNK_SIZE
+from retry_policy import Deadline, DeadlineExceeded, upstream_timeout
+from routing_table import IDEMPOTENT_ENDPOINTS
+from structured_log import get_logger
+
+log = get_logger('proxy')
+
+
+class AsyncStranglerRouter(proxy.StranglerRouter):
+    """StranglerRouter whose upstream calls are awaited instead of holding a thread"""
+
+    def __init__(self, base_router: proxy.StranglerRouter, max_connections: int = config.ASYNC_MAX_CONNECTIONS):
+        # Routing config is read live from the threaded router, so plan saves and
+        # mode changes made through the Flask endpoints apply to both engines
+        self.base = base_router
+        self.metrics = base_router.metrics
+        self.max_connections = max_connections
+        self.legacy_client = None
+        self.cloud_client = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def routing_table(self):
+        return self.base.routing_table
+
+    @property
+    def routing_mode(self):
+        return self.base.routing_mode
+
+    @property
+    def hash_ring(self):
+        return self.base.hash_ring
+
+    @property
+    def cache(self):
+        return self.base.cache
+
+    @property
+    def normalizer(self):
+        return self.base.normalizer
+
+    @property
+    def breakers(self):
+        # Shared with the threaded router: one breaker per backend endpoint, whichever engine calls it
+        return self.base.breakers
+
+    @property
+    def limiters(self):
+        # Also shared: the limit is what the backend can take, from both engines together
+        return self.base.limiters
+
+    @property
+    def single_flight(self):
+        return self.base.single_flight
+
+    @property
+    def hedger(self):
+        return self.base.hedger
+
+    @property
+    def retries(self):
+        return self.base.retries
+
+    @property
+    def shadow(self):
+        # Mirrored calls run on the threaded router's worker pool
+        return self.base.shadow
+
+    async def start(self):
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=config.UPSTREAM_POOL_SIZE
+        )
+        self.legacy_client = httpx.AsyncClient(limits=limits, timeout=config.UPSTREAM_TIMEOUT)
+        self.cloud_client = httpx.AsyncClient(limits=limits, timeout=config.UPSTREAM_TIMEOUT)
+
+    async def close(self):
+        await self.legacy_client.aclose()
+        await self.cloud_client.aclose()
+
+    async def route_request(self, endpoint: str, method: str, data: Dict[str, Any],
+                            deadline: Deadline = None) -> Dict[str, Any]:
+        start_time = time.time()
+        route = self.routing_table.lookup(endpoint)
+        use_cloud = self.should_use_cloud(data, route.percentage)
+        source = "cloud" if use_cloud else "legacy"
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if not use_cloud:
+                cached = self.cache.get(endpoint, data)
+                if cached is not None:
+                    log.info('cache', 'Serving from cache', endpoint=endpoint, engine='asyncio')
+                    return await self._off_loop(self._success, route, method, 'cache', start_time, data, cached)
+            generation = self.cache.generation
+            try:
+                response, source = await self._call_backend(source, route, method, data, deadline)
+            except (CircuitOpenError, ConcurrencyLimitExceeded) as e:
+                response, source = await self._failover(e, source, route, method, data, deadline)
+            if source == 'legacy':
+                self.cache.put(endpoint, data, response, generation)
+            return await self._off_loop(self._success, route, method, source, start_time, data, response)
+        except Exception as e:
+            return await self._off_loop(self._failure, endpoint, source, start_time, e)
+        finally:
+            self.in_flight -= 1
+            self.cache.invalidate_for_write(endpoint, data)
+
+    async def _off_loop(self, fn, *args):
+        # _success/_failure log the request: the ring's lock and, with shared state, a flock() that
+        # another worker may hold while it writes a document. Waiting on those would stall the loop.
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _call_backend(self, source, route, method, data, deadline=None):
+        if self.hedger.should_hedge(source, route.endpoint):
+            log.info('route', 'Routing to legacy (hedged)', endpoint=route.endpoint, engine='asyncio')
+            return await self.hedger.call_async(route, method, data, deadline, fetch=self._fetch)
+        log.info('route', f'Routing to {source}', endpoint=route.endpoint, engine='asyncio')
+        return await self._fetch(source, route, method, data, deadline), source
+
+    async def _failover(self, error, source, route, method, data, deadline=None, fetch=None):
+        # Same rule as the threaded router: an open breaker or a full limiter means the request never left the proxy, so the other backend may take it
+        if not self.breakers.failover:
+            raise error
+        other = 'legacy' if source == 'cloud' else 'cloud'
+        log.warning('failover', f"{error} - failing over to {other}", endpoint=route.endpoint, source=source,
+                    target=other, engine='asyncio')
+        return await self._fetch(other, route, method, data, deadline), other
+
+    async def _fetch(self, source, route, method, data, deadline=None):
+        if route.endpoint not in IDEMPOTENT_ENDPOINTS:
+            return await self._guarded_call(source, route, method, data, deadline)
+        # Reads are safe to retry; every attempt goes through the limiter and breaker again
+        def call():
+            return self.retries.call_async(route.endpoint,
+                                           lambda: self._guarded_call(source, route, method, data, deadline),
+                                           deadline)
+        # Identical concurrent reads to the same backend share one upstream call
+        key = self.single_flight.make_key(source, route.endpoint, data)
+        return await self.single_flight.do_async(key, call,
+                                                 timeout=upstream_timeout(deadline, config.SINGLE_FLIGHT_WAIT_TIMEOUT))
+
+    async def _guarded_call(self, source, route, method, data, deadline=None):
+        call = self._call_cloud if source == 'cloud' else self._call_legacy
+        label = self._endpoint_label(route.endpoint)
+        breaker = self.breakers.get(source, label) if self.breakers.enabled else None
+        limiter = self.limiters[source]
+        # Take a concurrency slot first, so calls queued or rejected here never count against the breaker
+        await limiter.acquire_async(upstream_timeout(deadline, limiter.queue_timeout_ms / 1000) * 1000)
+        try:
+            # Whatever is left of the client's deadline, never more than the route's timeout
+            timeout = upstream_timeout(deadline, route.timeout)
+            if breaker is not None:
+                breaker.before_call()
+        except (CircuitOpenError, DeadlineExceeded):
+            limiter.release(label)
+            raise
+        started = time.time()
+        success = False
+        cut_short = False
+        cancelled = False
+        try:
+            response = await call(route, method, data, timeout)
+            success = True
+            return response
+        except httpx.HTTPStatusError as e:
+            # 4xx means the upstream is up and answering; only 5xx counts against it
+            success = e.response.status_code < 500
+            raise
+        except httpx.TimeoutException:
+            cut_short = timeout < route.timeout
+            raise
+        except asyncio.CancelledError:
+            # A lost hedge race or a vanished client: says nothing about the upstream
+            cut_short = cancelled = True
+            raise
+        finally:
+            latency_ms = (time.time() - started) * 1000
+            outcome = 'cancelled' if cancelled else 'deadline' if cut_short else 'ok' if success else 'error'
+            proxy.upstream_requests.labels(source, label, outcome).inc()
+            proxy.upstream_duration.labels(source, label).observe(latency_ms / 1000)
+            if cut_short:
+                # The client's deadline ended the call, not the upstream: no verdict either way
+                if breaker is not None:
+                    breaker.cancel()
+                limiter.release(label)
+            else:
+                if breaker is not None:
+                    breaker.record(success, latency_ms)
+                limiter.release(label, latency_ms, dropped=not success)
+
+    async def _call_legacy(self, route, method, data, timeout=config.UPSTREAM_TIMEOUT):
+        url = route.legacy_url
+        body = {'json': data} if method == "POST" else {}
+
+        async with self.legacy_client.stream(method, url, timeout=timeout, **body) as response:
+            response.raise_for_status()
+            if not self.normalizer.enabled:
+                await response.aread()
+                return response.text # Legacy returns text/XML
+            parser = self.normalizer.parser(route.endpoint)
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                parser.feed(chunk)
+            return parser.close()
+
+    async def _call_cloud(self, route, method, data, timeout=config.UPSTREAM_TIMEOUT):
+        url = route.cloud_url
+
+        if method == "POST":
+            response = await self.cloud_client.post(url, json=data, timeout=timeout)
+        else:
+            response = await self.cloud_client.get(url, timeout=timeout)
+
+        response.raise_for_status()
+        return response.json() # Cloud service returns JSON
+
+    def get_engine_stats(self) -> Dict[str, Any]:
+        return {
+            'engine': 'asyncio',
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'max_connections': self.max_connections,
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+app = FastAPI(title="AutoMigrate AI - Async Proxy Router")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["https://automigrateai.web.app"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+# Native routes are counted here; requests passed to the mounted Flask app are counted by proxy.py
+instrument_fastapi(app, proxy.prom)
+
+async_router = AsyncStranglerRouter(proxy.router)
+
+
+@app.on_event("startup")
+async def startup_event():
+    await async_router.start()
+    log.info('engine', 'Asyncio engine ready', max_connections=async_router.max_connections)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await async_router.close()
+
+
+@app.post("/proxy/request")
+async def proxy_request(request: Request):
+    try:
+        data = await request.json()
+        endpoint = data.get('endpoint')
+        method = data.get('method', 'POST')
+        request_data = data.get('data', {})
+        deadline = Deadline.parse(request.headers.get('X-Deadline-Ms'), data.get('deadline_ms'))
+        if data.get('passthrough') or request.query_params.get('passthrough') in ('1', 'true'):
+            # Streaming passthrough is only implemented by the threaded engine
+            raise ValueError("passthrough is not supported by the asyncio engine")
+        result = await async_router.route_request(endpoint, method, request_data, deadline)
+
+        # This will return a 500 if the downstream service failed
+        if not result['success']:
+            return JSONResponse(result, status_code=500)
+
+        return result
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e), 'timestamp': datetime.now().isoformat()}, status_code=400)
+    finally:
+        # As Flask's after_request hook does for its writes: live dashboards pick up the new request
+        proxy.event_hub.notify()
+
+
+@app.get("/proxy/engine")
+async def engine_stats():
+    return async_router.get_engine_stats()
+
+
+# Every other route (metrics, history, plan, AI...) is still served by the Flask app
+app.mount("/", WSGIMiddleware(proxy.app))
+
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.environ.get("PORT", config.PROXY_PORT))
+    uvicorn.run(app, host="0.0.0.0", port=port)
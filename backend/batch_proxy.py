@@ -0,0 +1,66 @@
+# ============================================
+# FEATURE #19: Batch Proxy Requests
+# File: backend/batch_proxy.py
+# Purpose: Route many {endpoint, method, data} items concurrently
+# ============================================
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterator, List, Tuple
+
+
+class BatchRunner:
+    """Fan batch items out through the router with a per-batch concurrency limit"""
+
+    def __init__(self, router, max_workers: int = 32, max_items: int = 100, default_concurrency: int = 8):
+        """
+        Args:
+            router: StranglerRouter every item is routed through
+            max_workers: Threads shared by all batches
+            max_items: Largest batch accepted
+            default_concurrency: In-flight items per batch when the client does not say
+        """
+        self.router = router
+        self.max_workers = max_workers
+        self.max_items = max_items
+        self.default_concurrency = default_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch')
+
+    def validate(self, items, concurrency=None) -> Tuple[List[Dict[str, Any]], int]:
+        """Check the batch shape; returns (items, concurrency) or raises ValueError"""
+        if not isinstance(items, list) or not items:
+            raise ValueError("'items' must be a non-empty list")
+        if len(items) > self.max_items:
+            raise ValueError(f"Batch too large: {len(items)} items (max {self.max_items})")
+        concurrency = concurrency or self.default_concurrency
+        if not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError("'concurrency' must be a positive integer")
+        return items, min(concurrency, self.max_workers)
+
+    def _run_item(self, item, deadline=None) -> Dict[str, Any]:
+        if not isinstance(item, dict) or not item.get('endpoint'):
+            return {'success': False, 'error': "Each item needs an 'endpoint'"}
+        return self.router.route_request(item['endpoint'], item.get('method', 'POST'), item.get('data', {}), deadline)
+
+    def run(self, items: List[Dict[str, Any]], concurrency: int, deadline=None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, result) as items finish, never more than `concurrency` in flight (all share `deadline`)"""
+        queued = iter(enumerate(items))
+        in_flight = {}
+
+        def submit_next():
+            for index, item in queued:
+                in_flight[self.executor.submit(self._run_item, item, deadline)] = index
+                return
+
+        for _ in range(concurrency):
+            submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                submit_next()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'success': False, 'error': str(e)}
+                yield index, result
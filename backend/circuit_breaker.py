@@ -0,0 +1,192 @@
+# ============================================
+# FEATURE #18: Per-Upstream Circuit Breakers
+# File: backend/circuit_breaker.py
+# Purpose: Fast-fail (or fail over) when a backend endpoint is unhealthy
+# ============================================
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from structured_log import get_logger
+
+log = get_logger()
+
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit open for {name} (retry in {retry_in:.1f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Rolling-window breaker driven by error rate and slow-call rate"""
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 10,
+                 error_rate_threshold: float = 50, slow_call_ms: float = 6000,
+                 slow_rate_threshold: float = 80, open_seconds: float = 15,
+                 half_open_probes: int = 2):
+        """
+        Args:
+            name: '<backend>:<endpoint>'
+            window: Number of recent calls the rates are computed over
+            min_calls: Calls needed in the window before the breaker can trip
+            error_rate_threshold: % of failed calls that opens the breaker
+            slow_call_ms: Calls slower than this count as slow
+            slow_rate_threshold: % of slow calls that opens the breaker
+            open_seconds: How long to fast-fail before probing again
+            half_open_probes: Concurrent trial calls allowed while half-open
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_ms = slow_call_ms
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)  # (failed, slow)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        self.transitions = deque(maxlen=20)
+
+    def _transition(self, new_state: str, reason: str):
+        # Caller holds the lock
+        self.transitions.append({
+            'from': self.state,
+            'to': new_state,
+            'reason': reason,
+            'timestamp': datetime.now().isoformat()
+        })
+        log.warning('breaker', f"{self.name}: {self.state} -> {new_state}", reason=reason)
+        self.state = new_state
+        if new_state == OPEN:
+            self.opened_at = time.monotonic()
+        if new_state in (OPEN, CLOSED):
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+        if new_state == CLOSED:
+            self._calls.clear()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not go upstream"""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.open_seconds - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._transition(HALF_OPEN, 'cool-down elapsed')
+            if self.state == HALF_OPEN:
+                if self.probes_in_flight >= self.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0)
+                self.probes_in_flight += 1
+
+    def record(self, success: bool, latency_ms: float):
+        with self._lock:
+            slow = latency_ms >= self.slow_call_ms
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+                if not success or slow:
+                    self._transition(OPEN, 'half-open probe failed' if not success else 'half-open probe slow')
+                    return
+                self.probe_successes += 1
+                if self.probe_successes >= self.half_open_probes:
+                    self._transition(CLOSED, f'{self.probe_successes} probes succeeded')
+                return
+
+            self._calls.append((not success, slow))
+            if self.state == CLOSED and len(self._calls) >= self.min_calls:
+                error_rate, slow_rate = self._rates()
+                if error_rate >= self.error_rate_threshold:
+                    self._transition(OPEN, f'error rate {error_rate:.0f}%')
+                elif slow_rate >= self.slow_rate_threshold:
+                    self._transition(OPEN, f'slow-call rate {slow_rate:.0f}%')
+
+    def cancel(self):
+        """The call was abandoned without telling us anything about the upstream"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def _rates(self):
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failed = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, slow in self._calls if slow)
+        return failed / total * 100, slow / total * 100
+
+    def get_state(self) -> Dict[str, Any]:
+        with self._lock:
+            error_rate, slow_rate = self._rates()
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.open_seconds - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'name': self.name,
+                'state': self.state,
+                'calls_in_window': len(self._calls),
+                'error_rate': round(error_rate, 1),
+                'slow_call_rate': round(slow_rate, 1),
+                'rejected': self.rejected,
+                'retry_in_seconds': retry_in,
+                'transitions': list(self.transitions)
+            }
+
+
+class BreakerRegistry:
+    """One CircuitBreaker per backend + endpoint, created on first use"""
+
+    def __init__(self, enabled: bool = True, failover: bool = False,
+                 slow_call_ms: Optional[Dict[str, float]] = None, **breaker_kwargs):
+        """
+        Args:
+            failover: Send the request to the other backend while a breaker is open
+            slow_call_ms: Slow-call threshold per backend ('legacy', 'cloud')
+            breaker_kwargs: Passed through to every CircuitBreaker
+        """
+        self.enabled = enabled
+        self.failover = failover
+        self.slow_call_ms = slow_call_ms or {}
+        self.breaker_kwargs = breaker_kwargs
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, source: str, endpoint: str) -> CircuitBreaker:
+        name = f"{source}:{endpoint}"
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    kwargs = dict(self.breaker_kwargs)
+                    if source in self.slow_call_ms:
+                        kwargs['slow_call_ms'] = self.slow_call_ms[source]
+                    breaker = self._breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+    def open_breakers(self):
+        return sorted(name for name, breaker in list(self._breakers.items()) if breaker.state != CLOSED)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'failover': self.failover,
+            'open': self.open_breakers(),
+            'breakers': {name: breaker.get_state() for name, breaker in sorted(list(self._breakers.items()))}
+        }
@@ -17,6 +17,9 @@ from typing import Optional
 import json
 import os
 
+from structured_log import get_logger
+from prom_metrics import get_registry, instrument_fastapi
+
 app = FastAPI(
     title="VW Cloud Service",
     description="Modern cloud-native replacement for legacy VW system",
@@ -31,6 +34,10 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+log = get_logger('cloud')
+# Prometheus scrape target: request counts, latency and in-flight requests on GET /metrics
+instrument_fastapi(app, get_registry('cloud'), log)
+
 # ============================================
 # PYDANTIC MODELS (Data Validation)
 # ============================================
@@ -137,7 +144,7 @@ async def get_part(request: PartRequest):
     """
     part_no = request.part_number
     
-    print(f"[CLOUD] Looking up part: {part_no}")
+    log.info('lookup', 'Looking up part', part_number=part_no)
     
     if part_no in INVENTORY_DB:
         return {
@@ -161,7 +168,7 @@ async def get_dealer_details(request: DealerRequest):
     """
     dealer_id = request.dealer_id
     
-    print(f"[CLOUD] Looking up dealer: {dealer_id}")
+    log.info('lookup', 'Looking up dealer', dealer_id=dealer_id)
     
     if dealer_id in DEALERS_DB:
         return {
@@ -183,7 +190,7 @@ async def list_all_inventory():
     List all parts - FAST VERSION (<100ms)
     Modern JSON response
     """
-    print("[CLOUD] Listing all inventory...")
+    log.info('lookup', 'Listing all inventory')
     
     return {
         "status": "SUCCESS",
@@ -204,7 +211,7 @@ async def create_order(request: OrderRequest):
     part_no = request.part_number
     quantity = request.quantity
     
-    print(f"[CLOUD] Creating order: Dealer={dealer_id}, Part={part_no}, Qty={quantity}")
+    log.info('order', 'Creating order', dealer_id=dealer_id, part_number=part_no, quantity=quantity)
     
     # Validate dealer
     if dealer_id not in DEALERS_DB:
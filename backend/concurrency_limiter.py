@@ -0,0 +1,257 @@
+# ============================================
+# FEATURE #21: Adaptive Concurrency Limits
+# File: backend/concurrency_limiter.py
+# Purpose: Learn how many calls each backend can take at once from its latency
+# ============================================
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+ALGORITHMS = ('gradient', 'aimd')
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised instead of calling an upstream that is already at its concurrency limit"""
+
+    def __init__(self, name: str, limit: int, waited_ms: float):
+        super().__init__(f"Concurrency limit {limit} reached for {name} (waited {waited_ms:.0f}ms)")
+        self.name = name
+        self.limit = limit
+        self.waited_ms = waited_ms
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for one backend that grows while latency holds and shrinks when it queues"""
+
+    def __init__(self, name: str, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 algorithm: str = 'gradient', queue_timeout_ms: float = 500, max_queue: int = 32,
+                 tolerance: float = 1.5, backoff: float = 0.9, smoothing: float = 0.2,
+                 baseline_window_s: float = 60, enabled: bool = True):
+        """
+        Args:
+            name: Backend the limit protects ('legacy', 'cloud')
+            initial_limit: Starting limit, e.g. the backend's worker thread count
+            min_limit / max_limit: Bounds the learned limit stays within
+            algorithm: 'gradient' (scale by baseline/sample latency) or 'aimd'
+            queue_timeout_ms: How long a call may wait for a free slot before it is rejected
+            max_queue: Calls allowed to wait at once; the next one is rejected immediately
+            tolerance: Latency may grow to this multiple of the baseline before the limit shrinks
+            backoff: Multiplicative decrease on a dropped (timed out / 5xx) or too-slow call
+            smoothing: Weight of each new gradient estimate in the limit
+            baseline_window_s: Window the no-load (minimum) latency is tracked over
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown limiter algorithm: {algorithm}")
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.algorithm = algorithm
+        self.queue_timeout_ms = queue_timeout_ms
+        self.max_queue = max_queue
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.baseline_window_s = baseline_window_s
+        self.enabled = enabled
+
+        self._cond = threading.Condition()
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.waiting = 0
+        # Per-endpoint no-load latency: endpoints of one backend differ a lot (1.5s vs 3s on legacy)
+        self.baselines: Dict[str, float] = {}
+        self._windows: Dict[str, list] = {} # endpoint -> [window min, previous window min, window start]
+        self.last_gradient = 1.0
+
+        self.accepted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.peak_in_flight = 0
+        self.queue_waits = deque(maxlen=200)
+        self.history = deque(maxlen=50)
+
+    # ============================================
+    # ADMISSION
+    # ============================================
+
+    def acquire(self, max_wait_ms: Optional[float] = None):
+        """Take a slot, waiting up to queue_timeout_ms (or max_wait_ms); raises ConcurrencyLimitExceeded"""
+        queue_timeout_ms = self.queue_timeout_ms if max_wait_ms is None else min(max_wait_ms, self.queue_timeout_ms)
+        with self._cond:
+            if not self.enabled or self.in_flight < int(self.limit):
+                self._admit(0.0)
+                return
+
+            if self.waiting >= self.max_queue or queue_timeout_ms <= 0:
+                self.rejected += 1
+                raise ConcurrencyLimitExceeded(self.name, int(self.limit), 0)
+
+            self.waiting += 1
+            self.queued += 1
+            started = time.monotonic()
+            deadline = started + queue_timeout_ms / 1000
+            try:
+                while self.enabled and self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise ConcurrencyLimitExceeded(self.name, int(self.limit),
+                                                       (time.monotonic() - started) * 1000)
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self._admit((time.monotonic() - started) * 1000)
+
+    async def acquire_async(self, max_wait_ms: Optional[float] = None, poll_ms: float = 5):
+        """acquire() for the asyncio engine: waits on the event loop, re-checking every poll_ms, not in a blocked thread"""
+        queue_timeout_ms = self.queue_timeout_ms if max_wait_ms is None else min(max_wait_ms, self.queue_timeout_ms)
+        with self._cond:
+            if not self.enabled or self.in_flight < int(self.limit):
+                self._admit(0.0)
+                return
+
+            if self.waiting >= self.max_queue or queue_timeout_ms <= 0:
+                self.rejected += 1
+                raise ConcurrencyLimitExceeded(self.name, int(self.limit), 0)
+
+            self.waiting += 1
+            self.queued += 1
+        started = time.monotonic()
+        deadline = started + queue_timeout_ms / 1000
+        try:
+            while True:
+                await asyncio.sleep(min(poll_ms / 1000, max(0.0, deadline - time.monotonic())))
+                with self._cond:
+                    if not self.enabled or self.in_flight < int(self.limit):
+                        self._admit((time.monotonic() - started) * 1000)
+                        return
+                    if time.monotonic() >= deadline:
+                        self.rejected += 1
+                        raise ConcurrencyLimitExceeded(self.name, int(self.limit),
+                                                       (time.monotonic() - started) * 1000)
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def _admit(self, waited_ms: float):
+        # Caller holds the lock
+        self.in_flight += 1
+        self.accepted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.queue_waits.append(waited_ms)
+
+    def release(self, endpoint: str, latency_ms: Optional[float] = None, dropped: bool = False):
+        """Give the slot back; a latency sample (or a drop) adjusts the limit"""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if dropped:
+                self.dropped += 1
+                self._set_limit(self.limit * self.backoff, 'dropped call')
+            elif latency_ms is not None:
+                self._learn(endpoint, latency_ms)
+            self._cond.notify()
+
+    # ============================================
+    # LIMIT ALGORITHMS
+    # ============================================
+
+    def _learn(self, endpoint: str, latency_ms: float):
+        # Caller holds the lock
+        # No-load latency = min over the current and previous window, so a stale minimum ages out
+        now = time.monotonic()
+        window = self._windows.get(endpoint)
+        if window is None or now - window[2] >= self.baseline_window_s:
+            previous = window[0] if window is not None else latency_ms
+            window = self._windows[endpoint] = [latency_ms, previous, now]
+        elif latency_ms < window[0]:
+            window[0] = latency_ms
+        baseline = self.baselines[endpoint] = min(window[0], window[1])
+
+        # Only grow when the limit is actually being used, not while traffic is light
+        app_limited = self.in_flight + 1 < self.limit / 2
+
+        if self.algorithm == 'aimd':
+            if latency_ms > baseline * self.tolerance:
+                self._set_limit(self.limit * self.backoff, f'{endpoint} slow ({latency_ms:.0f}ms)')
+            elif not app_limited:
+                self._set_limit(self.limit + 1 / self.limit, None)
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * baseline / max(latency_ms, 0.001)))
+        self.last_gradient = gradient
+        if gradient == 1.0 and app_limited:
+            return
+        target = self.limit * gradient + math.sqrt(self.limit)
+        reason = f'{endpoint} gradient {gradient:.2f}' if gradient < 1.0 else None
+        self._set_limit(self.limit * (1 - self.smoothing) + target * self.smoothing, reason)
+
+    def _set_limit(self, limit: float, reason: Optional[str]):
+        # Caller holds the lock
+        limit = max(float(self.min_limit), min(float(self.max_limit), limit))
+        if reason and int(limit) < int(self.limit):
+            self.history.append({
+                'from': int(self.limit),
+                'to': int(limit),
+                'reason': reason,
+                'timestamp': datetime.now().isoformat()
+            })
+        grew = int(limit) > int(self.limit)
+        self.limit = limit
+        if grew:
+            self._cond.notify_all()
+
+    def configure(self, enabled: Optional[bool] = None, algorithm: Optional[str] = None,
+                  queue_timeout_ms: Optional[float] = None, max_limit: Optional[int] = None):
+        if algorithm is not None and algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown limiter algorithm: {algorithm}")
+        if queue_timeout_ms is not None and queue_timeout_ms < 0:
+            raise ValueError("queue_timeout_ms must be >= 0")
+        if max_limit is not None and max_limit < self.min_limit:
+            raise ValueError(f"max_limit must be >= {self.min_limit}")
+        with self._cond:
+            if enabled is not None:
+                self.enabled = bool(enabled)
+            if algorithm is not None:
+                self.algorithm = algorithm
+            if queue_timeout_ms is not None:
+                self.queue_timeout_ms = queue_timeout_ms
+            if max_limit is not None:
+                self.max_limit = max_limit
+                self._set_limit(self.limit, None)
+            self._cond.notify_all()
+
+    # ============================================
+    # STATS
+    # ============================================
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = list(self.queue_waits)
+            queued_waits = [w for w in waits if w > 0]
+            return {
+                'enabled': self.enabled,
+                'algorithm': self.algorithm,
+                'limit': int(self.limit),
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'waiting': self.waiting,
+                'accepted': self.accepted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'dropped': self.dropped,
+                'avg_queue_wait_ms': round(sum(waits) / len(waits), 2) if waits else 0,
+                'max_queue_wait_ms': round(max(queued_waits), 2) if queued_waits else 0,
+                'queue_timeout_ms': self.queue_timeout_ms,
+                'last_gradient': round(self.last_gradient, 3),
+                'baseline_latency_ms': {endpoint: round(ms, 2) for endpoint, ms in sorted(self.baselines.items())},
+                'recent_decreases': list(self.history)[-10:],
+                'timestamp': datetime.now().isoformat()
+            }
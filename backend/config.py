@@ -21,4 +21,110 @@ class Config:
     MOCK_DATA = os.getenv('MOCK_DATA', 'true').lower() == 'true'
     INVESTMENT_REQUIRED = int(os.getenv('INVESTMENT_REQUIRED', 2500000))
 
+    # Upstream connection pools
+    UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 16))
+    UPSTREAM_PREWARM = int(os.getenv('UPSTREAM_PREWARM', 2))
+
+    # Routing: 'random' (coin flip per request) or 'hash' (consistent hash on a business key)
+    ROUTING_MODE = os.getenv('ROUTING_MODE', 'random')
+    ROUTING_HASH_KEYS = os.getenv('ROUTING_HASH_KEYS', 'dealer_id,part_number').split(',')
+
+    # Shadow traffic (dark launch)
+    SHADOW_ENABLED = os.getenv('SHADOW_ENABLED', 'false').lower() == 'true'
+    SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', 0.1))
+    SHADOW_MAX_QUEUE = int(os.getenv('SHADOW_MAX_QUEUE', 32))
+    SHADOW_WORKERS = int(os.getenv('SHADOW_WORKERS', 2))
+
+    # Hedged legacy reads
+    HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'false').lower() == 'true'
+    HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 95))
+    HEDGE_BUDGET_PERCENT = float(os.getenv('HEDGE_BUDGET_PERCENT', 10))
+
+    # Legacy response cache
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 8 * 1024 * 1024))
+
+    # Request coalescing (single-flight)
+    SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+    SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', 10))
+
+    # Circuit breakers (per backend + endpoint)
+    BREAKER_ENABLED = os.getenv('BREAKER_ENABLED', 'true').lower() == 'true'
+    BREAKER_FAILOVER = os.getenv('BREAKER_FAILOVER', 'false').lower() == 'true'
+    BREAKER_ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', 50))
+    BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', 15))
+    BREAKER_HALF_OPEN_PROBES = int(os.getenv('BREAKER_HALF_OPEN_PROBES', 2))
+    BREAKER_LEGACY_SLOW_MS = float(os.getenv('BREAKER_LEGACY_SLOW_MS', 6000))
+    BREAKER_CLOUD_SLOW_MS = float(os.getenv('BREAKER_CLOUD_SLOW_MS', 1000))
+
+    # Adaptive concurrency limits (per backend)
+    LIMITER_ENABLED = os.getenv('LIMITER_ENABLED', 'true').lower() == 'true'
+    LIMITER_ALGORITHM = os.getenv('LIMITER_ALGORITHM', 'gradient')
+    LIMITER_LEGACY_INITIAL = int(os.getenv('LIMITER_LEGACY_INITIAL', 8))
+    LIMITER_LEGACY_MAX = int(os.getenv('LIMITER_LEGACY_MAX', 32))
+    LIMITER_CLOUD_INITIAL = int(os.getenv('LIMITER_CLOUD_INITIAL', 32))
+    LIMITER_CLOUD_MAX = int(os.getenv('LIMITER_CLOUD_MAX', 256))
+    LIMITER_QUEUE_TIMEOUT_MS = float(os.getenv('LIMITER_QUEUE_TIMEOUT_MS', 500))
+    LIMITER_MAX_QUEUE = int(os.getenv('LIMITER_MAX_QUEUE', 32))
+
+    # Upstream timeouts & retries (reads only)
+    UPSTREAM_TIMEOUT = float(os.getenv('UPSTREAM_TIMEOUT', 10))
+    RETRY_ENABLED = os.getenv('RETRY_ENABLED', 'true').lower() == 'true'
+    RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 3))
+    RETRY_BASE_DELAY_MS = float(os.getenv('RETRY_BASE_DELAY_MS', 50))
+    RETRY_MAX_DELAY_MS = float(os.getenv('RETRY_MAX_DELAY_MS', 1000))
+    RETRY_BUDGET_PERCENT = float(os.getenv('RETRY_BUDGET_PERCENT', 10))
+
+    # Batch proxy endpoint
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 32))
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 100))
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+
+    # Legacy XML -> cloud JSON normalization
+    NORMALIZE_LEGACY = os.getenv('NORMALIZE_LEGACY', 'true').lower() == 'true'
+
+    # Structured logging (shared by proxy, legacy and cloud)
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 256))
+    LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', 0.5))
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')  # e.g. "route=0.1,request=0.5"
+
+    # Automatic migration ramp (server-side)
+    RAMP_STEP = float(os.getenv('RAMP_STEP', 5))
+    RAMP_INTERVAL = float(os.getenv('RAMP_INTERVAL', 5))
+    RAMP_MIN_SAMPLES = int(os.getenv('RAMP_MIN_SAMPLES', 5))
+    RAMP_MAX_ERROR_RATE = float(os.getenv('RAMP_MAX_ERROR_RATE', 5))
+    RAMP_MAX_P95_MS = float(os.getenv('RAMP_MAX_P95_MS', 500))
+    RAMP_MAX_P99_MS = float(os.getenv('RAMP_MAX_P99_MS', 1000))
+    RAMP_ON_BREACH = os.getenv('RAMP_ON_BREACH', 'rollback')  # 'pause' or 'rollback'
+
+    # Shared-memory state for multi-worker gunicorn ('' keeps state in-process)
+    SHARED_STATE_PATH = os.getenv('SHARED_STATE_PATH', '')  # e.g. /dev/shm/automigrate-proxy.state
+    SHARED_STATE_CAPACITY = int(os.getenv('SHARED_STATE_CAPACITY', 100))  # records; metrics average over these
+
+    # Durable state log (on Cloud Run, point WAL_DIR at a mounted volume)
+    WAL_ENABLED = os.getenv('WAL_ENABLED', 'true').lower() == 'true'
+    # Outside the source tree, so a local run's state never ends up in an image built from it
+    WAL_DIR = os.getenv('WAL_DIR', os.path.join(os.getenv('XDG_STATE_HOME', os.path.expanduser('~/.local/state')),
+                                                'automigrate-proxy'))
+    WAL_FSYNC_INTERVAL = float(os.getenv('WAL_FSYNC_INTERVAL', 0.05))
+    WAL_SNAPSHOT_BYTES = int(os.getenv('WAL_SNAPSHOT_BYTES', 1024 * 1024))
+
+    # Versioned routing config; a JSON file here is hot-reloaded into a new version on change
+    ROUTING_CONFIG_FILE = os.getenv('ROUTING_CONFIG_FILE', '')
+    ROUTING_CONFIG_POLL = float(os.getenv('ROUTING_CONFIG_POLL', 2))
+
+    # Live dashboard stream (/proxy/stream, server-sent events); each open stream holds a server thread.
+    # Per worker: at most a quarter of its threads (gunicorn --threads PROXY_THREADS), the rest serve requests
+    PROXY_THREADS = int(os.getenv('PROXY_THREADS', 8))
+    STREAM_MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', max(1, PROXY_THREADS // 4)))
+    STREAM_MIN_INTERVAL = float(os.getenv('STREAM_MIN_INTERVAL', 0.25))
+    STREAM_MAX_INTERVAL = float(os.getenv('STREAM_MAX_INTERVAL', 2))
+    STREAM_HEARTBEAT = float(os.getenv('STREAM_HEARTBEAT', 15))
+    STREAM_MAX_AGE = float(os.getenv('STREAM_MAX_AGE', 300))
+
+    # Asyncio proxy engine (async_proxy.py)
+    ASYNC_MAX_CONNECTIONS = int(os.getenv('ASYNC_MAX_CONNECTIONS', 2000))
+
 config = Config()
\ No newline at end of file
@@ -0,0 +1,73 @@
+# ============================================
+# FEATURE #12: Deterministic Consistent-Hash Routing
+# File: backend/consistent_hash.py
+# Purpose: Pin each dealer/part to one backend for a given migration %
+# ============================================
+
+import hashlib
+from functools import lru_cache
+from typing import Dict, Any, Optional, Sequence
+
+# Number of slots on the ring: 10,000 slots = 0.01% routing granularity
+RING_SLOTS = 10000
+
+
+@lru_cache(maxsize=4096)
+def ring_slot(key: str) -> int:
+    """Map a business key to a fixed slot on the ring"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % RING_SLOTS
+
+
+class ConsistentHashRing:
+    """
+    Route requests by hashing a business identifier onto a 0-100% ring.
+
+    The cloud share is the arc [0, migration_percentage) of the ring, so a
+    key keeps its backend until the arc grows past it: raising the
+    percentage moves only the marginal slice of keys to cloud.
+    """
+
+    def __init__(self, key_fields: Sequence[str] = ('dealer_id', 'part_number')):
+        """
+        Args:
+            key_fields: Request fields to hash, in order of preference
+        """
+        self.key_fields = tuple(key_fields)
+
+    def routing_key(self, data: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Return the first configured key present in the request body"""
+        if not data:
+            return None
+        for field in self.key_fields:
+            value = data.get(field)
+            if value is not None and value != '':
+                return f"{field}:{value}"
+        return None
+
+    def position(self, key: str) -> float:
+        """Position of a key on the ring as a percentage (0-100)"""
+        return ring_slot(key) * 100 / RING_SLOTS
+
+    def use_cloud(self, key: str, migration_percentage: float) -> bool:
+        """O(1): hash the key and test it against the cloud arc"""
+        return ring_slot(key) < migration_percentage * RING_SLOTS / 100
+
+    def get_config(self) -> Dict[str, Any]:
+        return {
+            'key_fields': list(self.key_fields),
+            'ring_slots': RING_SLOTS
+        }
+
+
+if __name__ == '__main__':
+    ring = ConsistentHashRing()
+    keys = [f"dealer_id:DEALER_{i:04d}" for i in range(1000)]
+
+    print("Keys routed to cloud as migration % rises:")
+    previous = set()
+    for percentage in (10, 25, 50, 75, 100):
+        cloud = {k for k in keys if ring.use_cloud(k, percentage)}
+        moved_back = len(previous - cloud)
+        print(f"  {percentage:3d}% -> {len(cloud):4d} keys on cloud ({moved_back} moved back to legacy)")
+        previous = cloud
@@ -0,0 +1,260 @@
+# ============================================
+# FEATURE #15: Hedged Requests
+# File: backend/hedging.py
+# Purpose: Race a slow legacy read against cloud to cut tail latency
+# ============================================
+
+import asyncio
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from structured_log import get_logger
+
+log = get_logger()
+
+CLOUD_COST_PER_REQUEST = 0.05  # Same unit cost MetricsCollector uses for cloud calls
+
+
+class LatencyTracker:
+    """Rolling per-endpoint legacy latencies, used to learn the hedge trigger"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, latency_ms: float):
+        with self._lock:
+            self._samples[endpoint].append(latency_ms)
+
+    def percentile(self, endpoint: str, percentile: float) -> Optional[float]:
+        """Latency at `percentile`, or None until enough samples are seen"""
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+
+class HedgeBudget:
+    """Token bucket: every eligible request earns budget_percent/100 of a hedge"""
+
+    def __init__(self, budget_percent: float = 10, max_tokens: float = 10):
+        self.budget_percent = budget_percent
+        self.max_tokens = max_tokens
+        # Starts empty: hedges are earned by traffic, so a burst of slow reads right
+        # after startup is held to budget_percent like any other
+        self.tokens = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.budget_percent / 100)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class Hedger:
+    """Send a backup cloud request when a legacy read runs past its learned percentile"""
+
+    def __init__(self, router, enabled: bool = False, percentile: float = 95,
+                 budget_percent: float = 10, default_delay_ms: float = 3000,
+                 workers: int = 32, endpoints=None):
+        """
+        Args:
+            router: StranglerRouter whose blocking upstream calls are raced
+            percentile: Legacy latency percentile that triggers the hedge
+            budget_percent: Max hedges as a percentage of eligible traffic
+            default_delay_ms: Hedge trigger used until enough latencies are learned
+            workers: Threads running the raced upstream calls
+            endpoints: Idempotent endpoints that may be hedged
+        """
+        self.router = router
+        self.enabled = enabled
+        self.percentile = percentile
+        self.default_delay_ms = default_delay_ms
+        self.endpoints = frozenset(endpoints or ())
+        self.latencies = LatencyTracker()
+        self.budget = HedgeBudget(budget_percent)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hedge')
+
+        self._lock = threading.Lock()
+        self.eligible = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.budget_exhausted = 0
+        self.losers_not_cancelled = 0
+        self.loser_busy_ms = 0.0
+
+    def configure(self, enabled: Optional[bool] = None, percentile: Optional[float] = None,
+                  budget_percent: Optional[float] = None):
+        if percentile is not None and not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0-100")
+        if budget_percent is not None and not 0 <= budget_percent <= 100:
+            raise ValueError("budget_percent must be between 0-100")
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if percentile is not None:
+            self.percentile = percentile
+        if budget_percent is not None:
+            self.budget.budget_percent = budget_percent
+
+    def should_hedge(self, source: str, endpoint: str) -> bool:
+        return self.enabled and source == 'legacy' and endpoint in self.endpoints
+
+    def hedge_delay_ms(self, endpoint: str) -> float:
+        learned = self.latencies.percentile(endpoint, self.percentile)
+        return learned if learned is not None else self.default_delay_ms
+
+    def call(self, route, method: str, data, deadline=None) -> Tuple[Any, str]:
+        """Run the legacy call, hedging to cloud if it is slow; returns (response, source)"""
+        endpoint = route.endpoint
+        with self._lock:
+            self.eligible += 1
+        self.budget.deposit()
+
+        started = time.time()
+
+        def learn(future):
+            # Learn from every legacy call, including ones that lose the race
+            if not future.cancelled() and future.exception() is None:
+                self.latencies.record(endpoint, (time.time() - started) * 1000)
+
+        primary = self.executor.submit(self.router._fetch, 'legacy', route, method, data, deadline)
+        primary.add_done_callback(learn)
+
+        try:
+            return primary.result(timeout=self.hedge_delay_ms(endpoint) / 1000), 'legacy'
+        except FutureTimeout:
+            pass
+
+        if not self.budget.try_spend():
+            with self._lock:
+                self.budget_exhausted += 1
+            return primary.result(), 'legacy'
+
+        log.info('hedge', f"Legacy past p{self.percentile:g}, hedging to cloud", endpoint=endpoint)
+        hedge = self.executor.submit(self.router._fetch, 'cloud', route, method, data, deadline)
+        with self._lock:
+            self.hedges_sent += 1
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The loser cannot be interrupted mid-flight; cancel() only stops it
+                    # if it has not started, otherwise its result is discarded
+                    for loser in pending:
+                        if not loser.cancel():
+                            self._count_loser(loser)
+                    with self._lock:
+                        if future is hedge:
+                            self.hedge_wins += 1
+                        else:
+                            self.primary_wins += 1
+                    return future.result(), 'cloud' if future is hedge else 'legacy'
+
+        # Both failed: surface the legacy error, as an unhedged call would
+        return primary.result(), 'legacy'
+
+    async def call_async(self, route, method: str, data, deadline=None, fetch=None) -> Tuple[Any, str]:
+        """call() for the asyncio engine: fetch is the router's async _fetch, and the loser is cancelled"""
+        endpoint = route.endpoint
+        with self._lock:
+            self.eligible += 1
+        self.budget.deposit()
+
+        started = time.time()
+
+        def learn(task):
+            if not task.cancelled() and task.exception() is None:
+                self.latencies.record(endpoint, (time.time() - started) * 1000)
+
+        primary = asyncio.ensure_future(fetch('legacy', route, method, data, deadline))
+        primary.add_done_callback(learn)
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay_ms(endpoint) / 1000)
+            if done:
+                return primary.result(), 'legacy'
+
+            if not self.budget.try_spend():
+                with self._lock:
+                    self.budget_exhausted += 1
+                return await primary, 'legacy'
+
+            log.info('hedge', f"Legacy past p{self.percentile:g}, hedging to cloud", endpoint=endpoint, engine='asyncio')
+            hedge = asyncio.ensure_future(fetch('cloud', route, method, data, deadline))
+            with self._lock:
+                self.hedges_sent += 1
+
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        with self._lock:
+                            if task is hedge:
+                                self.hedge_wins += 1
+                            else:
+                                self.primary_wins += 1
+                        return task.result(), 'cloud' if task is hedge else 'legacy'
+
+            return primary.result(), 'legacy'
+        finally:
+            # Unlike a thread, a coroutine can be stopped mid-flight: the loser (or both, if our
+            # own caller was cancelled) gives its connection and limiter slot back right away
+            for task in pending:
+                task.cancel()
+
+    def _count_loser(self, loser):
+        # A running loser keeps its hedge thread and limiter slot until it returns: that is part of the hedge's cost
+        decided = time.time()
+        with self._lock:
+            self.losers_not_cancelled += 1
+
+        def finished(_):
+            with self._lock:
+                self.loser_busy_ms += (time.time() - decided) * 1000
+
+        loser.add_done_callback(finished)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            eligible = self.eligible
+            sent = self.hedges_sent
+            stats = {
+                'enabled': self.enabled,
+                'percentile': self.percentile,
+                'budget_percent': self.budget.budget_percent,
+                'budget_tokens': round(self.budget.tokens, 2),
+                'eligible_requests': eligible,
+                'hedges_sent': sent,
+                'hedge_rate': round(sent / eligible * 100, 2) if eligible else 0,
+                'hedge_wins': self.hedge_wins,
+                'primary_wins': self.primary_wins,
+                'budget_exhausted': self.budget_exhausted,
+                'hedge_cost': round(sent * CLOUD_COST_PER_REQUEST, 2),
+                # Race losers still running after the winner returned, and the upstream time they held
+                'losers_not_cancelled': self.losers_not_cancelled,
+                'loser_busy_ms': round(self.loser_busy_ms, 2),
+            }
+        stats['hedge_delay_ms'] = {
+            endpoint: round(self.hedge_delay_ms(endpoint), 2) for endpoint in sorted(self.endpoints)
+        }
+        stats['timestamp'] = datetime.now().isoformat()
+        return stats
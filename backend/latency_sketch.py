@@ -0,0 +1,236 @@
+# ============================================
+# FEATURE #29: Streaming Latency Quantiles
+# File: backend/latency_sketch.py
+# Purpose: p50/p90/p95/p99/max per backend and endpoint over the whole process
+#          lifetime, in bounded memory, cheap enough to update on every request
+# ============================================
+
+import math
+import threading
+from array import array
+from datetime import datetime
+from typing import Collection, Dict, Any, Optional
+
+QUANTILES = (50, 90, 95, 99)
+
+# 2**SUB_BITS buckets for the first microseconds, then 2**(SUB_BITS-1) per power of two:
+# each bucket is at most 1/64 of its value wide, so a quantile is off by < 1%
+SUB_BITS = 7
+_HALF = 1 << (SUB_BITS - 1)
+MAX_MICROS = 3600 * 1000 * 1000 # an hour; anything slower lands in the top bucket
+
+
+def bucket_index(micros: int) -> int:
+    if micros < (1 << SUB_BITS):
+        return micros
+    shift = micros.bit_length() - SUB_BITS
+    return shift * _HALF + (micros >> shift)
+
+
+def bucket_bounds(index: int):
+    """[low, high) in microseconds of a bucket"""
+    if index < (1 << SUB_BITS):
+        return index, index + 1
+    shift, mantissa = divmod(index, _HALF)
+    shift -= 1
+    mantissa += _HALF
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencySketch:
+    """Log-linear (HDR-style) histogram of latencies; two sketches merge by adding counts"""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = array('Q') # grown up to the highest bucket seen
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value_ms: float):
+        value_ms = max(0.0, value_ms)
+        index = bucket_index(min(int(value_ms * 1000), MAX_MICROS))
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend(array('Q', bytes(8 * (index + 1 - len(counts)))))
+        counts[index] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms < self.min:
+            self.min = value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def merge(self, other: 'LatencySketch'):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend(array('Q', bytes(8 * (len(other.counts) - len(self.counts)))))
+        for index, n in enumerate(other.counts):
+            if n:
+                self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, pct: float) -> Optional[float]:
+        """Nearest-rank quantile in ms (bucket midpoint, clamped to the observed min/max)"""
+        if not self.count:
+            return None
+        rank = min(self.count, max(1, math.ceil(pct / 100 * self.count)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return min(self.max, max(self.min, (low + high) / 2 / 1000))
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.count:
+            return {'count': 0}
+        result = {'count': self.count, 'mean': round(self.total / self.count, 2)}
+        for pct in QUANTILES:
+            result[f'p{pct}'] = round(self.quantile(pct), 2)
+        result['max'] = round(self.max, 2)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Sparse, so idle buckets cost nothing in shared memory
+        return {
+            'counts': {str(index): n for index, n in enumerate(self.counts) if n},
+            'count': self.count,
+            'total': self.total,
+            'min': self.min if self.count else None,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencySketch':
+        counts = {int(index): n for index, n in data['counts'].items()}
+        return cls.from_counts(counts, data['count'], data['total'],
+                               math.inf if data['min'] is None else data['min'], data['max'])
+
+    @classmethod
+    def from_counts(cls, counts: Dict[int, int], count: int, total: float, low: float, high: float) -> 'LatencySketch':
+        """Sketch from sparse {bucket index: count} (see bucket_index)"""
+        sketch = cls()
+        if counts:
+            sketch.counts = array('Q', bytes(8 * (max(counts) + 1)))
+            for index, n in counts.items():
+                sketch.counts[index] = n
+        sketch.count = count
+        sketch.total = total
+        sketch.min = low
+        sketch.max = high
+        return sketch
+
+
+class LatencySketches:
+    """One sketch per source and one per (source, endpoint)"""
+
+    OTHER = '(other)'
+
+    def __init__(self, max_endpoints: int = 64):
+        """
+        Args:
+            max_endpoints: Distinct endpoints tracked per source; the rest share '(other)'
+        """
+        self.max_endpoints = max_endpoints
+        self.sources: Dict[str, LatencySketch] = {}
+        self.endpoints: Dict[str, Dict[str, LatencySketch]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, source: str, endpoint: str, response_time: float):
+        with self._lock:
+            sketch = self.sources.get(source)
+            if sketch is None:
+                sketch = self.sources[source] = LatencySketch()
+                self.endpoints[source] = {}
+            sketch.record(response_time)
+            endpoints = self.endpoints[source]
+            sketch = endpoints.get(endpoint)
+            if sketch is None:
+                if len(endpoints) >= self.max_endpoints:
+                    endpoint = self.OTHER
+                sketch = endpoints.get(endpoint)
+                if sketch is None:
+                    sketch = endpoints[endpoint] = LatencySketch()
+            sketch.record(response_time)
+
+    def merge(self, other: 'LatencySketches'):
+        with self._lock:
+            for source, sketch in other.sources.items():
+                self.sources.setdefault(source, LatencySketch()).merge(sketch)
+                endpoints = self.endpoints.setdefault(source, {})
+                for endpoint, endpoint_sketch in other.endpoints.get(source, {}).items():
+                    endpoints.setdefault(endpoint, LatencySketch()).merge(endpoint_sketch)
+
+    def reset(self):
+        with self._lock:
+            self.sources = {}
+            self.endpoints = {}
+
+    def to_dict(self, endpoints: Optional[Collection[str]] = None) -> Dict[str, Any]:
+        """Sparse form for sharing; with endpoints, only those per-endpoint sketches are included"""
+        with self._lock:
+            return {
+                'sources': {source: sketch.to_dict() for source, sketch in self.sources.items()},
+                'endpoints': {source: {endpoint: sketch.to_dict() for endpoint, sketch in by_endpoint.items()
+                                       if endpoints is None or endpoint in endpoints}
+                              for source, by_endpoint in self.endpoints.items()}
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_endpoints: int = 64) -> 'LatencySketches':
+        sketches = cls(max_endpoints)
+        sketches.sources = {source: LatencySketch.from_dict(sketch) for source, sketch in data['sources'].items()}
+        sketches.endpoints = {source: {endpoint: LatencySketch.from_dict(sketch) for endpoint, sketch in endpoints.items()}
+                              for source, endpoints in data['endpoints'].items()}
+        return sketches
+
+    def source_summary(self) -> Dict[str, Any]:
+        """Quantiles per source only: a handful of sketches, cheap enough for every metrics poll"""
+        with self._lock:
+            return {source: sketch.summary() for source, sketch in sorted(self.sources.items())}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sources': {source: sketch.summary() for source, sketch in sorted(self.sources.items())},
+                'endpoints': {source: {endpoint: sketch.summary() for endpoint, sketch in sorted(endpoints.items())}
+                              for source, endpoints in sorted(self.endpoints.items())},
+                'timestamp': datetime.now().isoformat()
+            }
+
+
+if __name__ == '__main__':
+    # Benchmark: update cost and quantile error against exact percentiles
+    import random
+    import time
+
+    random.seed(7)
+    N = 200000
+    samples = [random.lognormvariate(4, 0.8) for _ in range(N)] # ~55ms median, long tail
+    sketches = LatencySketches()
+    started = time.perf_counter()
+    for i, value in enumerate(samples):
+        sketches.record('cloud', 'inventory/get_part' if i % 2 else 'orders/create', value)
+    elapsed = time.perf_counter() - started
+    print(f"record: {elapsed / N * 1e6:.2f}us per request (source + endpoint sketch)")
+
+    ordered = sorted(samples)
+    sketch = sketches.sources['cloud']
+    for pct in QUANTILES + (99.9,):
+        exact = ordered[min(N, max(1, math.ceil(pct / 100 * N))) - 1]
+        estimate = sketch.quantile(pct)
+        print(f"p{pct}: exact {exact:9.2f}ms  sketch {estimate:9.2f}ms  error {abs(estimate - exact) / exact * 100:.2f}%")
+    print(f"memory: {len(sketch.counts) * 8} bytes of buckets per sketch")
+
+    halves = LatencySketch(), LatencySketch()
+    for i, value in enumerate(samples):
+        halves[i % 2].record(value)
+    halves[0].merge(halves[1])
+    assert halves[0].summary() == {**sketch.summary(), 'mean': halves[0].summary()['mean']}
+    print("merge: two half sketches merged == one sketch over everything")
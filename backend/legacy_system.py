@@ -16,9 +16,14 @@ import xml.etree.ElementTree as ET
 from datetime import datetime
 import random
 from flask_cors import CORS
+from structured_log import get_logger
+from prom_metrics import get_registry, instrument_flask
 
 app = Flask(__name__)
 CORS(app)
+log = get_logger('legacy')
+# Prometheus scrape target: request counts, latency and in-flight requests on GET /metrics
+instrument_flask(app, get_registry('legacy'), log)
 
 # ============================================
 # LEGACY DATABASE (In-Memory)
@@ -122,7 +127,7 @@ def to_xml(data, root_name="response"):
 
 def log_legacy_request(endpoint, method, response_time):
     """Log all requests"""
-    print(f"[LEGACY] {datetime.now()} | {method} {endpoint} | Response: {response_time:.0f}ms")
+    log.info('request', f"{method} {endpoint}", endpoint=endpoint, method=method, response_time=round(response_time))
 
 # ============================================
 # LEGACY API ENDPOINTS
@@ -136,7 +141,7 @@ def get_part():
     data = request.get_json()
     part_no = data.get('part_number', 'UNKNOWN')
     
-    print(f"[LEGACY] Looking up part: {part_no}")
+    log.info('lookup', 'Looking up part', part_number=part_no)
     simulate_slow_database_call(delay=2.0)
     
     if part_no in INVENTORY_DB:
@@ -166,7 +171,7 @@ def get_dealer_details():
     data = request.get_json()
     dealer_id = data.get('dealer_id', 'UNKNOWN')
     
-    print(f"[LEGACY] Looking up dealer: {dealer_id}")
+    log.info('lookup', 'Looking up dealer', dealer_id=dealer_id)
     simulate_slow_database_call(delay=1.5)
     
     if dealer_id in DEALERS_DB:
@@ -193,7 +198,7 @@ def list_all_inventory():
     """Legacy endpoint: List all parts (SLOW - 2.5-3 seconds)"""
     start = time.time()
     
-    print("[LEGACY] Performing full inventory scan...")
+    log.info('lookup', 'Performing full inventory scan')
     simulate_slow_database_call(delay=2.5)
     
     response_data = {
@@ -219,7 +224,7 @@ def create_order():
     part_no = data.get('part_number')
     quantity = data.get('quantity', 1)
     
-    print(f"[LEGACY] Creating order: Dealer={dealer_id}, Part={part_no}, Qty={quantity}")
+    log.info('order', 'Creating order', dealer_id=dealer_id, part_number=part_no, quantity=quantity)
     
     # Simulate complex legacy business logic with multiple delays
     time.sleep(0.5)  # Step 1: Validate dealer
@@ -0,0 +1,91 @@
+# ============================================
+# FEATURE #23: Streaming Passthrough
+# File: backend/passthrough.py
+# Purpose: Stream an upstream body to the client inside the proxy
+#          envelope without decoding or re-encoding it
+# ============================================
+
+import codecs
+import json
+import time
+from datetime import datetime
+from typing import Dict, Callable, Iterator, Optional
+
+from response_normalizer import CHUNK_SIZE
+
+
+def _json_string_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Escape a byte stream into the body of a JSON string, chunk by chunk"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    yield b'"'
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield json.dumps(text)[1:-1].encode('ascii')
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield json.dumps(tail)[1:-1].encode('ascii')
+    yield b'"'
+
+
+class PassthroughStream:
+    """An upstream response whose body has not been read yet, plus how to splice it into the envelope"""
+
+    def __init__(self, response, source: str, endpoint: str, started: float,
+                 on_complete: Optional[Callable[[int, Optional[Exception]], None]] = None):
+        """
+        Args:
+            response: requests.Response opened with stream=True (headers received, body unread)
+            source: Backend that answered ('legacy' or 'cloud')
+            started: time.time() when the proxy received the request
+            on_complete: Called with (bytes streamed, error or None) once the body is done
+        """
+        self.response = response
+        self.source = source
+        self.endpoint = endpoint
+        self.started = started
+        # Until the first body byte: what the routing decision and upstream cost the client
+        self.response_time = (time.time() - started) * 1000
+        self.on_complete = on_complete
+        self.bytes_streamed = 0
+
+    @property
+    def is_json(self) -> bool:
+        return 'json' in self.response.headers.get('Content-Type', '')
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            'X-Proxy-Source': self.source,
+            'X-Proxy-Response-Time': f"{self.response_time:.2f}",
+            'X-Proxy-Upstream-Content-Type': self.response.headers.get('Content-Type', ''),
+            'X-Proxy-Passthrough': 'true'
+        }
+
+    def _upstream_chunks(self) -> Iterator[bytes]:
+        for chunk in self.response.iter_content(chunk_size=CHUNK_SIZE):
+            self.bytes_streamed += len(chunk)
+            yield chunk
+
+    def envelope_chunks(self) -> Iterator[bytes]:
+        """
+        {"success": true, "source": ..., "data": <upstream body>, "timestamp": ...}
+
+        JSON bodies are spliced in byte-for-byte; anything else (legacy XML) becomes
+        a JSON string, escaped incrementally without ever holding the whole body.
+        """
+        error = None
+        try:
+            yield b'{"success": true, "passthrough": true, "source": ' + json.dumps(self.source).encode() + b', "data": '
+            if self.is_json:
+                yield from self._upstream_chunks()
+            else:
+                yield from _json_string_chunks(self._upstream_chunks())
+            yield (', "response_time": ' + json.dumps(round(self.response_time, 2)) +
+                   ', "timestamp": ' + json.dumps(datetime.now().isoformat()) + '}').encode()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.response.close()
+            if self.on_complete is not None:
+                self.on_complete(self.bytes_streamed, error)
@@ -0,0 +1,385 @@
+# ============================================
+# FEATURE #31: Prometheus Metrics
+# File: backend/prom_metrics.py
+# Purpose: Counters, gauges and histograms shared by proxy, legacy and cloud,
+#          served as Prometheus / OpenMetrics text on GET /metrics
+#
+# Every process keeps its own registry. With several gunicorn workers a scrape
+# of GET /metrics reaches one of them, so the registry is put in per-worker
+# mode: each sample carries worker="<pid>" and every worker is its own series.
+# Sum them in the query (sum without (worker) (rate(...[5m]))); a restarted
+# worker is a new series that rate() treats as a counter reset.
+# ============================================
+
+import abc
+import bisect
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'automigrate_'
+
+# Seconds; legacy calls take 2-3s, cloud calls tens of ms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_PROCESS_START = time.time()
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric(abc.ABC):
+    """A metric family; .labels(...) returns the child that holds the numbers"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple, object] = {}
+        self._lock = threading.Lock() # only taken when a new label set appears
+
+    def labels(self, *values):
+        # Lock-free for label sets seen before: one dict lookup
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+                self._children[values] = child
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """A fresh child for a label set seen for the first time"""
+
+    def _samples(self) -> Iterable[Tuple[str, str, float]]:
+        seen = set()
+        for values, child in list(self._children.items()):
+            if id(child) in seen:
+                continue # same child under its original and stringified key
+            seen.add(id(child))
+            yield from child.samples(self.name, _format_labels(self.labelnames, values))
+
+    def expose(self, const_labels: str = '') -> List[str]:
+        """Text format lines; const_labels ('worker="123"') is added to every sample"""
+        # Text format 0.0.4: a counter's HELP/TYPE name is the sample name, _total included
+        name = self.name + '_total' if self.kind == 'counter' else self.name
+        lines = [f'# HELP {name} {self.documentation}', f'# TYPE {name} {self.kind}']
+        for name, labels, value in self._samples():
+            if const_labels:
+                labels = '{' + const_labels + (',' + labels[1:] if labels else '}')
+            lines.append(f'{name}{labels} {_format_value(value)}')
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield f'{name}_total', labels, self.value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _GaugeChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # per bucket, not cumulative; last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        inner = labels[1:-1]
+        cumulative = 0
+        for bound, n in zip(self.bounds + (math.inf,), counts):
+            cumulative += n
+            le = f'le="{_format_value(float(bound))}"'
+            yield f'{name}_bucket', '{' + (inner + ',' if inner else '') + le + '}', cumulative
+        yield f'{name}_sum', labels, total
+        yield f'{name}_count', labels, cumulative
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class CallbackMetric(_Metric):
+    """Values read at scrape time from existing stats (pools, executors) - nothing on the hot path"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Sequence, float]]], kind: str = 'gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def _new_child(self):
+        raise TypeError(f"{self.name} is read from a callback; it has no children to update")
+
+    def _samples(self):
+        suffix = '_total' if self.kind == 'counter' else ''
+        for values, value in self._collect():
+            if value is not None:
+                yield self.name + suffix, _format_labels(self.labelnames, values), float(value)
+
+
+class Registry:
+    def __init__(self, service: str, per_worker: bool = False):
+        """
+        Args:
+            service: Value of the service label on the HTTP metrics
+            per_worker: Label every sample with worker=<pid>, for servers running several worker processes
+        """
+        self.service = service
+        self.per_worker = per_worker
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.callback('process_start_time_seconds', 'Start time of the process (unix seconds)', [],
+                      lambda: [((), _PROCESS_START)])
+        self.callback('python_threads', 'Live Python threads', [],
+                      lambda: [((), threading.active_count())])
+
+    def _register(self, metric: _Metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing # modules imported twice (e.g. tests) share one family
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, labelnames, collect, kind='gauge') -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, labelnames, collect, kind))
+
+    def expose(self) -> str:
+        # The pid is read per scrape: workers forked from a preloaded app must not report the master's
+        const_labels = f'worker="{os.getpid()}"' if self.per_worker else ''
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.expose(const_labels))
+            except Exception as e:
+                # One broken collector must not take the whole scrape down
+                lines.append(f'# {metric.name} collection failed: {_escape(e)}')
+        return '\n'.join(lines) + '\n'
+
+
+class HttpMetrics:
+    """Request count, latency and in-flight requests for one service, labelled by route template"""
+
+    def __init__(self, registry: Registry):
+        self.registry = registry
+        self.requests = registry.counter('http_requests', 'HTTP requests served',
+                                         ['service', 'route', 'method', 'status'])
+        self.duration = registry.histogram('http_request_duration_seconds', 'HTTP request latency',
+                                           ['service', 'route', 'method'])
+        self.in_flight = registry.gauge('http_requests_in_flight', 'HTTP requests being served',
+                                        ['service']).labels(registry.service)
+
+    def started(self):
+        self.in_flight.inc()
+        return time.perf_counter()
+
+    def finished(self, started: float, route: str, method: str, status: int):
+        self.in_flight.dec()
+        service = self.registry.service
+        self.requests.labels(service, route, method, status).inc()
+        self.duration.labels(service, route, method).observe(time.perf_counter() - started)
+
+
+def _watch_logger(registry: Registry, logger):
+    service = registry.service
+    registry.callback('log_queue_depth', 'Log records waiting for the writer thread', ['service'],
+                      lambda: [((service,), len(logger._queue))])
+    registry.callback('log_records_dropped', 'Log records dropped because the queue was full', ['service'],
+                      lambda: [((service,), sum(logger.dropped.values()))], kind='counter')
+
+
+def instrument_flask(app, registry: Registry, logger=None) -> HttpMetrics:
+    """Count every request by URL rule (not raw path, which clients control) and serve GET /metrics"""
+    from flask import Response, g, request
+
+    http = HttpMetrics(registry)
+    if logger is not None:
+        _watch_logger(registry, logger)
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_started = http.started()
+
+    @app.after_request
+    def _metrics_finish(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            http.finished(started, rule, request.method, response.status_code)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        return Response(registry.expose(), content_type=CONTENT_TYPE)
+
+    return http
+
+
+def instrument_fastapi(app, registry: Registry, logger=None) -> HttpMetrics:
+    """FastAPI counterpart of instrument_flask; requests handed to a mounted app are left to that app"""
+    from starlette.responses import Response
+    from starlette.routing import Mount
+
+    http = HttpMetrics(registry)
+    if logger is not None:
+        _watch_logger(registry, logger)
+    native_paths = None
+
+    @app.middleware('http')
+    async def _record_http_metrics(request, call_next):
+        nonlocal native_paths
+        if native_paths is None:
+            routes = app.router.routes
+            # False: nothing is mounted, so every request is ours
+            native_paths = ({route.path for route in routes if not isinstance(route, Mount)}
+                            if any(isinstance(route, Mount) for route in routes) else False)
+        if native_paths and request.url.path not in native_paths:
+            return await call_next(request)
+        started = http.started()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get('route')
+            http.finished(started, getattr(route, 'path', None) or 'unmatched', request.method, status)
+
+    @app.get('/metrics', include_in_schema=False)
+    async def prometheus_metrics():
+        return Response(registry.expose(), headers={'Content-Type': CONTENT_TYPE})
+
+    return http
+
+
+def executor_samples(executors: Dict[str, object]) -> Iterable[Tuple[Tuple[str, str], float]]:
+    """(pool, state) -> value for ThreadPoolExecutors: max, threads, busy and queued work"""
+    for pool, executor in executors.items():
+        if executor is None:
+            continue
+        threads = len(getattr(executor, '_threads', ()))
+        idle = getattr(getattr(executor, '_idle_semaphore', None), '_value', 0)
+        yield (pool, 'max'), getattr(executor, '_max_workers', 0)
+        yield (pool, 'threads'), threads
+        yield (pool, 'busy'), max(0, threads - idle)
+        yield (pool, 'queued'), executor._work_queue.qsize()
+
+
+_registry: Optional[Registry] = None
+
+
+def get_registry(service: Optional[str] = None) -> Registry:
+    """The process-wide registry; the first caller names the service"""
+    global _registry
+    if _registry is None:
+        _registry = Registry(service or os.getenv('SERVICE_NAME', 'automigrate'))
+    return _registry
+
+
+if __name__ == '__main__':
+    # Benchmark: hot-path cost of a labelled counter increment and histogram observation
+    registry = Registry('bench')
+    http = HttpMetrics(registry)
+    N = 200000
+    started = time.perf_counter()
+    for i in range(N):
+        http.finished(http.started(), '/proxy/request', 'POST', 200)
+    elapsed = time.perf_counter() - started
+    print(f"per request (in-flight, counter, histogram): {elapsed / N * 1e6:.2f}us")
+    print('\n'.join(line for line in registry.expose().splitlines() if 'http_request' in line)[:1200])
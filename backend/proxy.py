@@ -823,16 +823,18 @@
 #     app.run(host='0.0.0.0', port=port, debug=config.DEBUG)
 
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS  # Make sure this is imported
 import requests
 import time
 import random
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
 import json
 from copy import deepcopy
 import os
+import atexit
+import threading
 
 # --- AI & CLOUD IMPORTS ---
 import vertexai
@@ -843,8 +845,41 @@ from digital_twin import digital_twin as validator
 from auto_scaling import auto_scaler
 from compliance_checker import compliance_checker
 from config import config
+from upstream_pool import UpstreamPool
+from consistent_hash import ConsistentHashRing
+from routing_table import (compile_routing_table, record_version, RoutingConfigStore, RoutingConfigWatcher,
+                           IDEMPOTENT_ENDPOINTS)
+from shadow_traffic import ShadowMirror
+from hedging import Hedger
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from circuit_breaker import BreakerRegistry, CircuitOpenError
+from batch_proxy import BatchRunner
+from response_normalizer import ResponseNormalizer, CHUNK_SIZE
+from concurrency_limiter import AdaptiveLimiter, ConcurrencyLimitExceeded
+from retry_policy import RetryPolicy, Deadline, DeadlineExceeded, upstream_timeout
+from passthrough import PassthroughStream
+from structured_log import get_logger
+from ramp_controller import RampController
+from shared_state import SharedState
+from state_wal import StateLog
+from request_ring import RequestRing
+from latency_sketch import LatencySketches
+from rolling_window import RollingMetrics
+from prom_metrics import get_registry, instrument_flask, executor_samples
+from event_stream import EventHub, StreamFull, DELTA, APPEND
 
 app = Flask(__name__)
+log = get_logger('proxy')
+# Prometheus scrape target on GET /metrics. Per process: with several gunicorn workers each scrape sees
+# one, so under shared state every sample is labelled with its worker (see prom_metrics)
+prom = get_registry('proxy')
+prom.per_worker = bool(config.SHARED_STATE_PATH)
+instrument_flask(app, prom, log)
+upstream_requests = prom.counter('upstream_requests', 'Calls from the proxy to legacy / cloud',
+                                 ['backend', 'endpoint', 'outcome'])
+upstream_duration = prom.histogram('upstream_request_duration_seconds', 'Latency of calls to legacy / cloud',
+                                   ['backend', 'endpoint'])
 
 # ============================================
 # === THE CORS FIX ===
@@ -854,7 +889,9 @@ app = Flask(__name__)
 # to all routes starting with /proxy/
 CORS(app, resources={
     r"/proxy/*": {
-        "origins": "https://automigrateai.web.app"
+        "origins": "https://automigrateai.web.app",
+        # Passthrough responses carry their routing metadata in headers
+        "expose_headers": ["X-Proxy-Source", "X-Proxy-Response-Time", "X-Proxy-Upstream-Content-Type", "X-Proxy-Passthrough"]
     },
     r"/": {
         "origins": "https://automigrateai.web.app"
@@ -880,19 +917,37 @@ except Exception as e:
 
 # --- METRICSCOLLECTOR & STRANGLERROUTER (Unchanged) ---
 class MetricsCollector:
-    def __init__(self):
-        self.requests = []
+    # What a restart needs for the counts, averages and history list; request/response bodies are not journaled
+    JOURNAL_FIELDS = ('id', 'timestamp', 'endpoint', 'response_time', 'source', 'error',
+                      'legacy_time', 'cloud_time', 'migration_percentage')
+
+    def __init__(self, journal=None):
+        # Last 100 summaries in preallocated columns; 'requests' reads them back as dicts
+        self.ring = RequestRing(100)
+        # Latency quantiles per source / endpoint since startup (the averages only cover the last 100)
+        self.latency = LatencySketches()
+        # Per-second buckets rolled into minutes and hours, for /proxy/metrics?window=5m
+        self.windows = RollingMetrics()
         self.request_history = []
         self.migration_percentage = 0
         self.errors = 0
         self.total_requests = 0
         self.rollback_states = {}
+        # StateLog that makes changes durable (None: in memory only)
+        self.journal = journal
+        # log_request runs on every request thread: ids, counts and the history list change together
+        self._lock = threading.Lock()
     
     def log_request(self, endpoint, response_time, source, error=None, legacy_time=None, cloud_time=None, request_data=None, response_data=None):
-        self.total_requests += 1
+        timestamp = datetime.now().isoformat()
+        with self._lock:
+            self.total_requests += 1
+            request_id = self.total_requests - 1
+            if error:
+                self.errors += 1
         request_entry = {
-            'id': len(self.request_history),
-            'timestamp': datetime.now().isoformat(),
+            'id': request_id,
+            'timestamp': timestamp,
             'endpoint': endpoint,
             'response_time': response_time,
             'source': source,
@@ -903,43 +958,70 @@ class MetricsCollector:
             'response_data': response_data,
             'migration_percentage': self.migration_percentage
         }
-        self.request_history.append(request_entry)
-        self.requests.append({
-            'timestamp': datetime.now().isoformat(),
-            'endpoint': endpoint,
-            'response_time': response_time,
-            'source': source,
-            'error': error,
-            'legacy_time': legacy_time,
-            'cloud_time': cloud_time
-        })
-        if error:
-            self.errors += 1
-        if len(self.requests) > 100:
-            self.requests = self.requests[-100:]
-        if len(self.request_history) > 50:
-            self.request_history = self.request_history[-50:]
+        with self._lock:
+            self.request_history.append(request_entry)
+            if len(self.request_history) > 50:
+                del self.request_history[:-50]
+        self._journal_request(request_entry)
+        self.ring.append(request_id, timestamp, endpoint, response_time, source, error, legacy_time, cloud_time)
+        self.latency.record(source, endpoint, response_time)
+        self.windows.record(source, endpoint, response_time, error)
+        return request_id
+
+    @property
+    def requests(self):
+        return self.ring.to_dicts()
+
+    def record_shadow(self, request_id, legacy_time, cloud_time, comparison):
+        # Fill in both backend timings once the mirrored call has finished
+        self._journal_shadow(request_id, legacy_time, cloud_time, comparison)
+        self.ring.update_times(request_id, legacy_time, cloud_time)
+        for entry in reversed(self.request_history):
+            if entry['id'] == request_id:
+                entry['legacy_time'] = legacy_time
+                entry['cloud_time'] = cloud_time
+                entry['shadow'] = comparison
+                break
+
+    def _recent_stats(self):
+        # (count, mean response time) by source over the last 100 requests, kept up to date by the ring
+        return self.ring.source_stats()
+
+    def latency_stats(self):
+        return self.latency.get_stats()
+
+    def latency_summary(self):
+        return self.latency.source_summary()
     
-    def get_metrics(self):
-        legacy_times = [r['response_time'] for r in self.requests if r['source'] == 'legacy']
-        cloud_times = [r['response_time'] for r in self.requests if r['source'] == 'cloud']
-        legacy_avg = sum(legacy_times) / len(legacy_times) if legacy_times else 2847
-        cloud_avg = sum(cloud_times) / len(cloud_times) if cloud_times else 87
-        legacy_cost = len(legacy_times) * 0.50
-        cloud_cost = len(cloud_times) * 0.05
+    def get_metrics(self, window=None):
+        # Default: the last 100 requests. With a window ('5m', '1h'...): every request in that time
+        rolled = None
+        if window is None:
+            recent, errors = self._recent_stats(), self.errors
+        else:
+            rolled = self.windows.query(window)
+            recent = {source: (stats['count'], stats['mean']) for source, stats in rolled['sources'].items()}
+            errors = sum(stats['errors'] for stats in rolled['sources'].values())
+        legacy_count, legacy_avg = recent.get('legacy', (0, 2847))
+        cloud_count, cloud_avg = recent.get('cloud', (0, 87))
+        legacy_cost = legacy_count * 0.50
+        cloud_cost = cloud_count * 0.05
         cost_saved = legacy_cost - cloud_cost
         perf_improvement = (legacy_avg / cloud_avg) if cloud_avg > 0 else 0
-        return {
-            'total_requests': len(self.requests),
-            'legacy_requests': len(legacy_times),
-            'cloud_requests': len(cloud_times),
+        result = {
+            'total_requests': sum(count for count, _ in recent.values()),
+            'legacy_requests': legacy_count,
+            'cloud_requests': cloud_count,
             'legacy_avg_time': round(legacy_avg, 2),
             'cloud_avg_time': round(cloud_avg, 2),
-            'error_count': self.errors,
+            'error_count': errors,
             'migration_percentage': self.migration_percentage,
             'cost_saved': round(cost_saved, 2),
             'performance_improvement': round(perf_improvement, 1)
         }
+        if rolled is not None:
+            result['window'] = rolled
+        return result
 
     def set_migration_percentage(self, percentage):
         self.migration_percentage = min(100, max(0, percentage))
@@ -948,6 +1030,22 @@ class MetricsCollector:
             'migration_percentage': percentage,
             'metrics': deepcopy(self.get_metrics())
         }
+        self._journal_percentage(self.rollback_states[percentage])
+
+    def _journal_percentage(self, rollback_state):
+        if self.journal is not None:
+            self.journal.append('percentage', {'migration_percentage': self.migration_percentage,
+                                               'rollback_state': rollback_state})
+
+    def _journal_request(self, entry):
+        # A copy: the writer thread serializes it later, while record_shadow may be updating the entry
+        if self.journal is not None:
+            self.journal.append('request', {field: entry[field] for field in self.JOURNAL_FIELDS})
+
+    def _journal_shadow(self, request_id, legacy_time, cloud_time, comparison):
+        if self.journal is not None:
+            self.journal.append('shadow', {'id': request_id, 'legacy_time': legacy_time,
+                                           'cloud_time': cloud_time, 'shadow': comparison})
 
     def get_request_history(self, limit=20):
         return list(reversed(self.request_history[-limit:]))
@@ -975,96 +1073,726 @@ class MetricsCollector:
             'current_migration': self.migration_percentage
         }
 
-metrics = MetricsCollector()
-for i in range(20):
-    metrics.log_request("test_endpoint", random.uniform(2500, 3000), "legacy", 
-                       request_data={'test': 'legacy'}, response_data={'result': 'ok'})
-    metrics.log_request("test_endpoint", random.uniform(50, 120), "cloud",
-                       request_data={'test': 'cloud'}, response_data={'result': 'ok'})
-print("[PROXY] Pre-populated metrics with 20 sample requests")
+    def reset(self):
+        self.ring.clear()
+        self.latency.reset()
+        self.windows.reset()
+        self.request_history = []
+        self.errors = 0
+        self.total_requests = 0
+        self.migration_percentage = 0
+        self.rollback_states = {}
+        if self.journal is not None:
+            self.journal.append('reset', {})
+
+    def restore(self, state):
+        # Rebuild from a recovered StateLog; nothing is journaled again
+        entries = state['requests']
+        self.request_history = [dict(entry) for entry in entries[-50:]]
+        self.ring.clear()
+        for entry in entries[-100:]:
+            self.ring.append(entry['id'], entry['timestamp'], entry['endpoint'], entry['response_time'],
+                             entry['source'], entry.get('error'), entry.get('legacy_time'), entry.get('cloud_time'))
+        self.total_requests = state['total_requests']
+        self.errors = state['errors']
+        self.migration_percentage = state['migration_percentage']
+        self.rollback_states = dict(state['rollback_states'])
+
+class SharedMetricsCollector(MetricsCollector):
+    # Same interface, but the state lives in SharedState so every gunicorn worker reports the same numbers.
+    # One ring of full entries; 'requests' is the last 100 without the history-only fields.
+    HISTORY_ONLY = ('request_data', 'response_data', 'migration_percentage', 'shadow')
+
+    def __init__(self, state, journal=None, known_endpoints=None, publish_interval=1.0):
+        """
+        Args:
+            known_endpoints: Callable returning the routed endpoints; only their sketches are shared
+            publish_interval: Seconds between publishing this worker's latency sketches
+        """
+        self.state = state
+        self.journal = journal
+        # Each worker sketches its own requests and shares them; readers merge every worker's sketch
+        self.latency = LatencySketches()
+        self.windows = RollingMetrics() # per worker
+        self.known_endpoints = known_endpoints
+        self.publish_interval = publish_interval
+        self._latency_generation = 0
+        self._latency_dirty = False
+        self._latency_overflow = False
+        self._publisher = None
+        self._publisher_lock = threading.Lock()
+
+    @property
+    def total_requests(self):
+        return self.state.get('total_requests')
+
+    @property
+    def errors(self):
+        return self.state.get('errors')
+
+    @property
+    def migration_percentage(self):
+        value = self.state.get('migration_percentage')
+        return int(value) if value.is_integer() else value
+
+    @migration_percentage.setter
+    def migration_percentage(self, value):
+        self.state.set('migration_percentage', float(value))
+
+    @property
+    def rollback_states(self):
+        return self.state.load_doc('rollback_states', {})
+
+    @property
+    def requests(self):
+        return [{key: value for key, value in entry.items() if key not in self.HISTORY_ONLY}
+                for entry in self.state.records(self.total_requests, 100)]
+
+    @property
+    def request_history(self):
+        return self.state.records(self.total_requests, 50)
+
+    def _recent_stats(self):
+        # Running per-source totals kept in shared memory as slots are written, not a scan of the ring
+        return self.state.source_stats()
+
+    def log_request(self, endpoint, response_time, source, error=None, legacy_time=None, cloud_time=None, request_data=None, response_data=None):
+        request_id = self.state.incr('total_requests') - 1
+        entry = {
+            'id': request_id,
+            'timestamp': datetime.now().isoformat(),
+            'endpoint': endpoint,
+            'response_time': response_time,
+            'source': source,
+            'error': error,
+            'legacy_time': legacy_time,
+            'cloud_time': cloud_time,
+            'request_data': request_data,
+            'response_data': response_data,
+            'migration_percentage': self.migration_percentage
+        }
+        self.state.append(request_id, self._encode(entry), source, response_time)
+        self.latency.record(source, endpoint, response_time)
+        self.windows.record(source, endpoint, response_time, error)
+        if error:
+            self.state.incr('errors')
+        self._journal_request(entry)
+        self._latency_dirty = True
+        if self._publisher is None:
+            self._start_publisher()
+        return request_id
+
+    def _start_publisher(self):
+        # Started on first use rather than at import, so a worker forked from a preloaded app gets its own
+        with self._publisher_lock:
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._publish_loop, name='latency-publisher', daemon=True)
+                self._publisher.start()
+
+    def _publish_loop(self):
+        # Serializing the sketches is off the request threads; idle workers don't rewrite the document
+        while True:
+            time.sleep(self.publish_interval)
+            if self._latency_dirty:
+                self._latency_dirty = False
+                self._publish_latency()
+
+    def _publish_latency(self):
+        worker = str(os.getpid())
+        # Per-source sketches plus the routed endpoints: client-invented endpoints would only fill the document
+        endpoints = self.known_endpoints() if self.known_endpoints is not None else None
+
+        def change(doc):
+            doc = doc or {'generation': 0, 'workers': {}}
+            if doc['generation'] != self._latency_generation:
+                # Another worker reset the metrics
+                self.latency.reset()
+                self._latency_generation = doc['generation']
+            workers = {**doc['workers'], worker: {'updated': time.time(), 'sketches': self.latency.to_dict(endpoints)}}
+            # Workers that exited keep counting, up to a limit
+            newest = sorted(workers, key=lambda pid: workers[pid]['updated'])[-16:]
+            return {'generation': doc['generation'], 'workers': {pid: workers[pid] for pid in newest}}
+        try:
+            doc = self.state.update_doc('latency', change)
+        except ValueError as e:
+            # Once per failure streak, not on every publish
+            if not self._latency_overflow:
+                log.warning('shared_state', 'Could not share latency sketches', error=str(e))
+            self._latency_overflow = True
+            return None
+        self._latency_overflow = False
+        return doc
+
+    def latency_stats(self):
+        self._publish_latency()
+        merged = LatencySketches()
+        for worker in (self.state.load_doc('latency') or {'workers': {}})['workers'].values():
+            merged.merge(LatencySketches.from_dict(worker['sketches']))
+        return merged.get_stats()
+
+    def _encode(self, entry):
+        try:
+            return self.state.encode(entry)
+        except ValueError:
+            # Bodies too big for a ring slot are dropped from the history, the timings are kept
+            entry = {**entry, 'request_data': {'truncated': True}, 'response_data': {'truncated': True}}
+            return self.state.encode(entry)
+
+    def record_shadow(self, request_id, legacy_time, cloud_time, comparison):
+        self._journal_shadow(request_id, legacy_time, cloud_time, comparison)
+        self.state.update(request_id, lambda entry: entry.update(
+            legacy_time=legacy_time, cloud_time=cloud_time, shadow=comparison))
+
+    def set_migration_percentage(self, percentage):
+        self.migration_percentage = min(100, max(0, percentage))
+        snapshot = {
+            'timestamp': datetime.now().isoformat(),
+            'migration_percentage': percentage,
+            'metrics': self.get_metrics()
+        }
+        self.state.update_doc('rollback_states', lambda states: {**(states or {}), str(percentage): snapshot})
+        self._journal_percentage(snapshot)
+
+    def reset(self):
+        self.state.reset_records()
+        self.latency.reset()
+        self.windows.reset()
+        self._latency_generation = self.state.update_doc(
+            'latency', lambda doc: {'generation': (doc or {'generation': 0})['generation'] + 1, 'workers': {}}
+        )['generation']
+        self.migration_percentage = 0
+        self.state.save_doc('rollback_states', {})
+        if self.journal is not None:
+            self.journal.append('reset', {})
+
+    def restore(self, state):
+        self.state.reset_records()
+        for entry in state['requests']:
+            self.state.append(entry['id'], self._encode(entry), entry['source'], entry['response_time'])
+        self.state.set('total_requests', state['total_requests'])
+        self.state.set('errors', state['errors'])
+        self.migration_percentage = state['migration_percentage']
+        self.state.save_doc('rollback_states', state['rollback_states'])
+
+# With SHARED_STATE_PATH set, gunicorn can run several workers over one set of metrics
+shared_state = SharedState(config.SHARED_STATE_PATH, config.SHARED_STATE_CAPACITY) if config.SHARED_STATE_PATH else None
+# Percentage changes, plan saves, rollbacks and request records survive a restart through the state log
+state_log = StateLog(config.WAL_DIR, config.WAL_FSYNC_INTERVAL, config.WAL_SNAPSHOT_BYTES) if config.WAL_ENABLED else None
+if state_log is not None:
+    atexit.register(state_log.close)
+metrics = (SharedMetricsCollector(shared_state, state_log, known_endpoints=lambda: router.routing_table.routes)
+           if shared_state is not None
+           else MetricsCollector(state_log))
+# Only the first worker restores (or seeds) the state; the others find it in shared memory
+owns_state = shared_state is None or shared_state.created
+recovered_state = state_log.recover() if state_log is not None and owns_state else None
+if recovered_state is not None:
+    metrics.restore(recovered_state)
+    log.info('state', 'Recovered state from the state log', recovery_ms=state_log.recovery['recovery_ms'],
+             migration_percentage=metrics.migration_percentage, total_requests=metrics.total_requests)
+elif owns_state:
+    for i in range(20):
+        metrics.log_request("test_endpoint", random.uniform(2500, 3000), "legacy", 
+                           request_data={'test': 'legacy'}, response_data={'result': 'ok'})
+        metrics.log_request("test_endpoint", random.uniform(50, 120), "cloud",
+                           request_data={'test': 'cloud'}, response_data={'result': 'ok'})
+    print("[PROXY] Pre-populated metrics with 20 sample requests")
 
 class StranglerRouter:
-    def __init__(self, legacy_url, cloud_url):
+    def __init__(self, legacy_url, cloud_url, pool_size=config.UPSTREAM_POOL_SIZE):
         self.legacy_url = legacy_url
         self.cloud_url = cloud_url
         self.metrics = metrics
+        # One keep-alive pool per upstream so requests skip the TCP/TLS handshake
+        self.legacy_pool = UpstreamPool('legacy', legacy_url, pool_size, health_path='/health')
+        self.cloud_pool = UpstreamPool('cloud', cloud_url, pool_size, health_path='/api/v1/health')
+        self.routing_mode = config.ROUTING_MODE
+        self.hash_ring = ConsistentHashRing(config.ROUTING_HASH_KEYS)
+        # Versioned routing config: requests read the active table without taking a lock
+        self.routing_config = RoutingConfigStore(
+            compile_routing_table(legacy_url, cloud_url, default_timeout=config.UPSTREAM_TIMEOUT),
+            # Workers number versions from one shared counter so a version means the same config everywhere
+            next_version=(lambda: shared_state.incr('routing_version')) if shared_state is not None else None
+        )
+        self.shadow = ShadowMirror(self, config.SHADOW_ENABLED, config.SHADOW_SAMPLE_RATE,
+                                   config.SHADOW_MAX_QUEUE, config.SHADOW_WORKERS,
+                                   endpoints=IDEMPOTENT_ENDPOINTS)
+        self.hedger = Hedger(self, config.HEDGE_ENABLED, config.HEDGE_PERCENTILE,
+                             config.HEDGE_BUDGET_PERCENT, endpoints=IDEMPOTENT_ENDPOINTS)
+        self.cache = ResponseCache(config.CACHE_MAX_BYTES, enabled=config.CACHE_ENABLED)
+        self.single_flight = SingleFlight(config.SINGLE_FLIGHT_ENABLED)
+        # Legacy XML is parsed into the cloud schema so clients see one shape
+        self.normalizer = ResponseNormalizer(enabled=config.NORMALIZE_LEGACY)
+        self.breakers = BreakerRegistry(
+            config.BREAKER_ENABLED, config.BREAKER_FAILOVER,
+            slow_call_ms={'legacy': config.BREAKER_LEGACY_SLOW_MS, 'cloud': config.BREAKER_CLOUD_SLOW_MS},
+            error_rate_threshold=config.BREAKER_ERROR_RATE,
+            open_seconds=config.BREAKER_OPEN_SECONDS,
+            half_open_probes=config.BREAKER_HALF_OPEN_PROBES
+        )
+        self.retries = RetryPolicy(config.RETRY_ENABLED, config.RETRY_MAX_ATTEMPTS,
+                                   config.RETRY_BASE_DELAY_MS, config.RETRY_MAX_DELAY_MS,
+                                   config.RETRY_BUDGET_PERCENT)
+        # Legacy only has a handful of worker threads; queueing there is what blows up latency
+        self.limiters = {
+            'legacy': AdaptiveLimiter('legacy', config.LIMITER_LEGACY_INITIAL, max_limit=config.LIMITER_LEGACY_MAX,
+                                      algorithm=config.LIMITER_ALGORITHM,
+                                      queue_timeout_ms=config.LIMITER_QUEUE_TIMEOUT_MS,
+                                      max_queue=config.LIMITER_MAX_QUEUE, enabled=config.LIMITER_ENABLED),
+            'cloud': AdaptiveLimiter('cloud', config.LIMITER_CLOUD_INITIAL, max_limit=config.LIMITER_CLOUD_MAX,
+                                     algorithm=config.LIMITER_ALGORITHM,
+                                     queue_timeout_ms=config.LIMITER_QUEUE_TIMEOUT_MS,
+                                     max_queue=config.LIMITER_MAX_QUEUE, enabled=config.LIMITER_ENABLED),
+        }
+
+    def warm_up(self, connections=config.UPSTREAM_PREWARM):
+        self.legacy_pool.prewarm_async(connections)
+        self.cloud_pool.prewarm_async(connections)
+
+    def get_pool_stats(self):
+        return {
+            'legacy': self.legacy_pool.get_stats(),
+            'cloud': self.cloud_pool.get_stats()
+        }
+
+    def get_limiter_stats(self):
+        return {source: limiter.get_stats() for source, limiter in self.limiters.items()}
+
+    def probe_cloud(self, endpoint='inventory/get_part', data=None):
+        # Synthetic cloud read for the migration ramp; limiter and breaker apply like real traffic
+        route = self.routing_table.lookup(endpoint)
+        return self._guarded_call('cloud', route, 'POST', data or {'part_number': 'PART001'})
     
-    def should_use_cloud(self):
+    def should_use_cloud(self, data=None, percentage=None):
+        if percentage is None:
+            percentage = self.metrics.migration_percentage
+        if self.routing_mode == 'hash':
+            # Same dealer/part always lands on the same backend for a given percentage
+            key = self.hash_ring.routing_key(data)
+            if key is not None:
+                return self.hash_ring.use_cloud(key, percentage)
         random_value = random.random() * 100
-        return random_value < self.metrics.migration_percentage
+        return random_value < percentage
+
+    @property
+    def routing_table(self):
+        return self.routing_config.active
+
+    def apply_plan(self, plan):
+        # Compiled off to the side, then swapped in as a new routing config version
+        return self.routing_config.publish({'plan': plan}, source='plan')
+
+    def set_routing_mode(self, mode, key_fields=None):
+        if mode not in ('random', 'hash'):
+            raise ValueError(f"Unknown routing mode: {mode}")
+        self.routing_mode = mode
+        if key_fields:
+            self.hash_ring = ConsistentHashRing(key_fields)
+
+    def get_routing_mode(self):
+        return {'mode': self.routing_mode, **self.hash_ring.get_config()}
     
-    def route_request(self, endpoint, method, data):
+    def route_request(self, endpoint, method, data, deadline=None):
         start_time = time.time()
-        use_cloud = self.should_use_cloud()
+        route = self.routing_table.lookup(endpoint)
+        use_cloud = self.should_use_cloud(data, route.percentage)
         source = "cloud" if use_cloud else "legacy"
         try:
-            if use_cloud:
-                print(f"[PROXY] Routing to CLOUD: {endpoint}")
-                response = self._call_cloud(endpoint, method, data)
-            else:
-                print(f"[PROXY] Routing to LEGACY: {endpoint}")
-                response = self._call_legacy(endpoint, method, data)
-            response_time = (time.time() - start_time) * 1000
-            self.metrics.log_request(endpoint, response_time, source, 
-                                   request_data=data, response_data=response)
-            print(f"[PROXY] Logged {source} request: {response_time:.2f}ms")
-            return {
-                'success': True,
-                'data': response,
-                'source': source,
-                'response_time': round(response_time, 2),
-                'timestamp': datetime.now().isoformat()
-            }
+            if not use_cloud:
+                cached = self.cache.get(endpoint, data)
+                if cached is not None:
+                    log.info('cache', 'Serving from cache', endpoint=endpoint)
+                    return self._success(route, method, 'cache', start_time, data, cached)
+            generation = self.cache.generation
+            try:
+                response, source = self._call_backend(source, route, method, data, deadline)
+            except (CircuitOpenError, ConcurrencyLimitExceeded) as e:
+                response, source = self._failover(e, source, route, method, data, deadline)
+            if source == 'legacy':
+                self.cache.put(endpoint, data, response, generation)
+            return self._success(route, method, source, start_time, data, response)
         except Exception as e:
-            response_time = (time.time() - start_time) * 1000
-            self.metrics.log_request(endpoint, response_time, source, error=str(e))
-            print(f"[PROXY] ERROR during routing: {str(e)}") # Added print for errors
-            return {
-                'success': False,
-                'error': str(e),
-                'source': source,
-                'response_time': round(response_time, 2),
-                'timestamp': datetime.now().isoformat()
-            }
-    
-    def _call_legacy(self, endpoint, method, data):
-        url_map = {
-            "inventory/get_part": f"{self.legacy_url}/inventory/get_part",
-            "dealer/get_details": f"{self.legacy_url}/dealer/get_details",
-            "inventory/list_all": f"{self.legacy_url}/inventory/list_all",
-            "orders/create": f"{self.legacy_url}/orders/create",
-        }
-        url = url_map.get(endpoint, f"{self.legacy_url}/{endpoint}")
+            return self._failure(endpoint, source, start_time, e)
+        finally:
+            # Writes (orders/create) drop the cached reads they made stale
+            self.cache.invalidate_for_write(endpoint, data)
+
+    def route_passthrough(self, endpoint, method, data, deadline=None):
+        """
+        Route like route_request, but hand back the unread upstream body for streaming.
+
+        Returns (PassthroughStream, None) or (None, failure envelope). The cache,
+        single-flight, hedging and shadow copies all need a decoded body, so they are skipped.
+        """
+        start_time = time.time()
+        route = self.routing_table.lookup(endpoint)
+        source = "cloud" if self.should_use_cloud(data, route.percentage) else "legacy"
+        try:
+            try:
+                upstream = self._open_passthrough(source, route, method, data, deadline)
+            except (CircuitOpenError, ConcurrencyLimitExceeded) as e:
+                upstream, source = self._failover(e, source, route, method, data, deadline,
+                                                  fetch=self._open_passthrough)
+        except Exception as e:
+            self.cache.invalidate_for_write(endpoint, data)
+            return None, self._failure(endpoint, source, start_time, e)
+        log.info('route', 'Streaming passthrough', source=source, endpoint=endpoint)
+
+        def complete(size, error):
+            self.cache.invalidate_for_write(endpoint, data)
+            if error is not None:
+                self.metrics.log_request(endpoint, (time.time() - start_time) * 1000, source, error=str(error))
+            else:
+                self.metrics.log_request(endpoint, stream.response_time, source, request_data=data,
+                                         response_data={'passthrough': True, 'bytes': size})
+
+        stream = PassthroughStream(upstream, source, endpoint, start_time, complete)
+        return stream, None
+
+    def _open_passthrough(self, source, route, method, data, deadline=None):
+        # The limiter slot and breaker cover the upstream's work up to the response headers;
+        # the body is then relayed by the proxy at whatever pace the client reads it
+        def call(route, method, data, timeout):
+            return self._open_stream(source, route, method, data, timeout)
+
+        def attempt():
+            return self._guarded_call(source, route, method, data, deadline, call)
+
+        if route.endpoint not in IDEMPOTENT_ENDPOINTS:
+            return attempt()
+        # Nothing has been sent to the client yet, so a failed open can still be retried
+        return self.retries.call(route.endpoint, attempt, deadline)
+
+    def _open_stream(self, source, route, method, data, timeout=config.UPSTREAM_TIMEOUT):
+        if source == 'cloud':
+            pool, url = self.cloud_pool, route.cloud_url
+        else:
+            pool, url = self.legacy_pool, route.legacy_url
 
         if method == "POST":
-            response = requests.post(url, json=data, timeout=10)
+            response = pool.post(url, json=data, timeout=timeout, stream=True)
         else:
-            response = requests.get(url, timeout=10)
+            response = pool.get(url, timeout=timeout, stream=True)
 
-        response.raise_for_status() # This will raise an error on 500s
-        return response.text # Legacy returns text/XML
-        
-    def _call_cloud(self, endpoint, method, data):
-        cloud_endpoint_map = {
-            "inventory/get_part": "api/v1/parts/get",
-            "dealer/get_details": "api/v1/dealers/get",
-            "inventory/list_all": "api/v1/inventory/list",
-            "orders/create": "api/v1/orders/create"
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        return response
+
+    def _call_backend(self, source, route, method, data, deadline=None):
+        if source == 'cloud':
+            log.info('route', 'Routing to cloud', endpoint=route.endpoint)
+            return self._fetch('cloud', route, method, data, deadline), 'cloud'
+        if self.hedger.should_hedge(source, route.endpoint):
+            log.info('route', 'Routing to legacy (hedged)', endpoint=route.endpoint)
+            return self.hedger.call(route, method, data, deadline)
+        log.info('route', 'Routing to legacy', endpoint=route.endpoint)
+        return self._fetch('legacy', route, method, data, deadline), 'legacy'
+
+    def _failover(self, error, source, route, method, data, deadline=None, fetch=None):
+        # An open breaker or a full limiter means the request never left the proxy, so retrying elsewhere is safe
+        if not self.breakers.failover:
+            raise error
+        other = 'legacy' if source == 'cloud' else 'cloud'
+        log.warning('failover', f"{error} - failing over to {other}", endpoint=route.endpoint, source=source, target=other)
+        return (fetch or self._fetch)(other, route, method, data, deadline), other
+
+    def _success(self, route, method, source, start_time, data, response):
+        response_time = (time.time() - start_time) * 1000
+        request_id = self.metrics.log_request(route.endpoint, response_time, source,
+                                              request_data=data, response_data=response)
+        log.info('request', 'Request served', endpoint=route.endpoint, source=source,
+                 response_time=round(response_time, 2), request_id=request_id)
+        # Copy to the other backend off the hot path (no-op unless shadow mode is on)
+        self.shadow.mirror(route, method, data, source, response, response_time, request_id)
+        return {
+            'success': True,
+            'data': response,
+            'source': source,
+            'response_time': round(response_time, 2),
+            'timestamp': datetime.now().isoformat()
         }
-        
-        cloud_endpoint = cloud_endpoint_map.get(endpoint, f"api/v1/{endpoint}")
-        url = f"{self.cloud_url}/{cloud_endpoint}"
-        
+
+    def _failure(self, endpoint, source, start_time, e):
+        response_time = (time.time() - start_time) * 1000
+        self.metrics.log_request(endpoint, response_time, source, error=str(e))
+        log.error('request', 'Routing failed', endpoint=endpoint, source=source, error=str(e))
+        return {
+            'success': False,
+            'error': str(e),
+            'source': source,
+            'response_time': round(response_time, 2),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def _fetch(self, source, route, method, data, deadline=None):
+        # Upstream call made on behalf of a client request
+        if route.endpoint not in IDEMPOTENT_ENDPOINTS:
+            return self._guarded_call(source, route, method, data, deadline)
+        # Reads are safe to retry; every attempt goes through the limiter and breaker again
+        def call():
+            return self.retries.call(route.endpoint,
+                                     lambda: self._guarded_call(source, route, method, data, deadline),
+                                     deadline)
+        # Identical concurrent reads to the same backend share one upstream call
+        key = self.single_flight.make_key(source, route.endpoint, data)
+        return self.single_flight.do(key, call,
+                                     timeout=upstream_timeout(deadline, config.SINGLE_FLIGHT_WAIT_TIMEOUT))
+
+    def _endpoint_label(self, endpoint):
+        # Unknown endpoints come from clients; folding them into one keeps per-endpoint breakers,
+        # limiter baselines and metric series bounded
+        return endpoint if endpoint in self.routing_table.routes else '(other)'
+
+    def _guarded_call(self, source, route, method, data, deadline=None, call=None):
+        call = call or (self._call_cloud if source == 'cloud' else self._call_legacy)
+        label = self._endpoint_label(route.endpoint)
+        breaker = self.breakers.get(source, label) if self.breakers.enabled else None
+        limiter = self.limiters[source]
+        # Take a concurrency slot first, so calls queued or rejected here never count against the breaker
+        limiter.acquire(upstream_timeout(deadline, limiter.queue_timeout_ms / 1000) * 1000)
+        try:
+            # The upstream gets whatever is left of the client's deadline, never more than the route's timeout
+            timeout = upstream_timeout(deadline, route.timeout)
+            if breaker is not None:
+                breaker.before_call()
+        except (CircuitOpenError, DeadlineExceeded):
+            limiter.release(label)
+            raise
+        started = time.time()
+        success = False
+        cut_short = False
+        try:
+            response = call(route, method, data, timeout)
+            success = True
+            return response
+        except requests.HTTPError as e:
+            # 4xx means the upstream is up and answering; only 5xx counts against it
+            status = e.response.status_code if e.response is not None else 500
+            success = status < 500
+            raise
+        except requests.Timeout:
+            cut_short = timeout < route.timeout
+            raise
+        finally:
+            latency_ms = (time.time() - started) * 1000
+            upstream_requests.labels(source, label, 'deadline' if cut_short else 'ok' if success else 'error').inc()
+            upstream_duration.labels(source, label).observe(latency_ms / 1000)
+            if cut_short:
+                # The client's deadline ended the call, not the upstream: no verdict either way
+                if breaker is not None:
+                    breaker.cancel()
+                limiter.release(label)
+            else:
+                if breaker is not None:
+                    breaker.record(success, latency_ms)
+                limiter.release(label, latency_ms, dropped=not success)
+
+    def _call_legacy(self, route, method, data, timeout=config.UPSTREAM_TIMEOUT):
+        url = route.legacy_url
+        # Feed the body to the normalizer as it arrives instead of buffering the XML
+        stream = self.normalizer.enabled
+
         if method == "POST":
-            response = requests.post(url, json=data, timeout=10)
+            response = self.legacy_pool.post(url, json=data, timeout=timeout, stream=stream)
         else:
-            response = requests.get(url, timeout=10)
-        
+            response = self.legacy_pool.get(url, timeout=timeout, stream=stream)
+
+        with response:
+            response.raise_for_status() # This will raise an error on 500s
+            if not stream:
+                return response.text # Legacy returns text/XML
+            return self.normalizer.normalize(route.endpoint, response.iter_content(chunk_size=CHUNK_SIZE))
+
+    def _call_cloud(self, route, method, data, timeout=config.UPSTREAM_TIMEOUT):
+        url = route.cloud_url
+
+        if method == "POST":
+            response = self.cloud_pool.post(url, json=data, timeout=timeout)
+        else:
+            response = self.cloud_pool.get(url, timeout=timeout)
+
         response.raise_for_status() # This will raise an error on 500s
         return response.json() # Cloud service returns JSON
 
 router = StranglerRouter(LEGACY_URL, CLOUD_URL)
+router.warm_up()
+batch_runner = BatchRunner(router, config.BATCH_MAX_WORKERS, config.BATCH_MAX_ITEMS, config.BATCH_CONCURRENCY)
+
+# ============================================
+# PROMETHEUS GAUGES (read from the live objects at scrape time)
+# ============================================
+
+prom.callback('upstream_pool_connections', 'Upstream keep-alive connections by state', ['backend', 'state'],
+              lambda: [((source, state), stats[key]) for source, stats in router.get_pool_stats().items()
+                       for state, key in (('active', 'active_connections'), ('idle', 'idle_connections'),
+                                          ('max', 'pool_size'))])
+prom.callback('upstream_pool_requests', 'Upstream requests by whether they opened a connection',
+              ['backend', 'connection'],
+              lambda: [((source, connection), stats[key]) for source, stats in router.get_pool_stats().items()
+                       for connection, key in (('new', 'new_connections'), ('reused', 'reused_requests'))],
+              kind='counter')
+prom.callback('concurrency_limit', 'Adaptive concurrency limiter state per backend', ['backend', 'state'],
+              lambda: [((source, state), stats[state]) for source, stats in router.get_limiter_stats().items()
+                       for state in ('limit', 'in_flight', 'waiting')])
+prom.callback('concurrency_rejected', 'Calls rejected by the concurrency limiter', ['backend'],
+              lambda: [((source,), stats['rejected']) for source, stats in router.get_limiter_stats().items()],
+              kind='counter')
+prom.callback('thread_pool_workers', 'Worker threads and queued work of the proxy thread pools', ['pool', 'state'],
+              lambda: executor_samples({'batch': batch_runner.executor, 'shadow': router.shadow.executor,
+                                        'hedge': router.hedger.executor}))
+prom.callback('circuit_breakers_open', 'Circuit breakers currently open', [],
+              lambda: [((), len(router.breakers.open_breakers()))])
+prom.callback('migration_percentage', 'Share of traffic routed to cloud', [],
+              lambda: [((), metrics.migration_percentage)])
+if state_log is not None:
+    prom.callback('state_log_queue_depth', 'State log records waiting to be written', [],
+                  lambda: [((), state_log.get_stats().get('queued', 0))])
+
+def unpin_plan_routes(source, note):
+    # Endpoints pinned by a saved plan ignore the global percentage, so a rollback must unpin them:
+    # publish a plan-free routing version (the pinned one stays available to roll forward to)
+    if any(route.percentage is not None for route in router.routing_table.routes.values()):
+        return router.routing_config.publish({'plan': {}}, source=source, note=note)
+    return router.routing_table
+
+ramp = RampController(lambda: metrics.requests, lambda: metrics.migration_percentage,
+                      metrics.set_migration_percentage, probe=router.probe_cloud, shared=shared_state,
+                      on_rollback=lambda percentage: unpin_plan_routes('ramp', f"Ramp rolled back to {percentage}%"))
 migration_plan = {} # Global var to hold the plan
+migration_plan_version = 0
+routing_config_version = 0
+
+def adopt_routing_config(doc, source):
+    # Load versions published elsewhere (another worker, or before a restart) and activate theirs
+    store = router.routing_config
+    for version, spec in sorted(doc['versions'].items(), key=lambda item: int(item[0])):
+        if store.get(int(version)) is None:
+            store.publish(spec, source=source, version=int(version), activate=False)
+    if doc['active'] is not None and doc['active'] != store.active.version:
+        store.activate(doc['active'], source=source)
+
+def share_routing_config(table, action, source):
+    if source in ('shared', 'recovered'):
+        return # already on record
+    spec = dict(table.spec) if action != 'activate' else None
+    if state_log is not None:
+        state_log.append('routing', {'action': action, 'version': table.version, 'spec': spec})
+    if shared_state is not None and action != 'load':
+        shared_state.update_doc('routing_config', lambda doc: record_version(doc, table.version, spec))
+    log.info('routing', f"Routing config v{table.version} {action}", source=source)
+
+router.routing_config.listeners.append(share_routing_config)
+
+if recovered_state is not None:
+    migration_plan = recovered_state['migration_plan']
+    if recovered_state['routing_config'] is not None:
+        adopt_routing_config(recovered_state['routing_config'], 'recovered')
+        if shared_state is not None:
+            shared_state.set('routing_version', max(map(int, recovered_state['routing_config']['versions'])))
+            shared_state.save_doc('routing_config', recovered_state['routing_config'])
+    elif migration_plan:
+        router.apply_plan(migration_plan) # state log written before routing versions were journaled
+    if shared_state is not None and migration_plan:
+        migration_plan_version = shared_state.save_doc('migration_plan', migration_plan)
+
+routing_watcher = None
+if config.ROUTING_CONFIG_FILE and owns_state:
+    # Hot reload: editing the file publishes a new version (one watcher, even with several workers)
+    routing_watcher = RoutingConfigWatcher(config.ROUTING_CONFIG_FILE, router.routing_config,
+                                           config.ROUTING_CONFIG_POLL).start()
+
+# Per-process helpers whose state other workers need to see (last writer wins)
+shared_objects = {}
+if shared_state is not None:
+    shared_objects = {
+        'auto_scaler': shared_state.bind('auto_scaler', auto_scaler, {
+            'traffic_history': lambda history: deque(history, maxlen=auto_scaler.window_size),
+            'scaling_recommendations': None
+        }),
+        'compliance': shared_state.bind('compliance', compliance_checker, {
+            'violation_history': None,
+            'compliance_score': None
+        })
+    }
+
+def publish_shared(name):
+    if name in shared_objects:
+        try:
+            shared_objects[name].push()
+        except ValueError as e:
+            log.warning('shared_state', f"Could not share {name}", error=str(e))
+
+@app.before_request
+def sync_shared_state():
+    # Adopt what other workers changed; each check is one 8-byte read while nothing changed
+    global migration_plan, migration_plan_version, routing_config_version
+    if shared_state is None:
+        return
+    version = shared_state.doc_version('migration_plan')
+    if version != migration_plan_version:
+        # The routing versions it compiled to arrive through 'routing_config'
+        migration_plan = shared_state.load_doc('migration_plan', {})
+        migration_plan_version = version
+    version = shared_state.doc_version('routing_config')
+    if version != routing_config_version:
+        doc = shared_state.load_doc('routing_config')
+        if doc is not None:
+            adopt_routing_config(doc, 'shared')
+        routing_config_version = version
+    for shared in shared_objects.values():
+        shared.pull()
+
+# ============================================
+# LIVE DASHBOARD STREAM (/proxy/stream)
+# ============================================
+
+def shared_snapshot(name, build):
+    # The stream's pump thread adopts other workers' changes the way a request would
+    def snapshot():
+        if name in shared_objects:
+            shared_objects[name].pull()
+        return build()
+    return snapshot
+
+def scaling_snapshot():
+    # Prediction and recommendation ride along, so a push doesn't send every dashboard back for two more calls.
+    # Read-only: unlike /proxy/auto-scaling/recommendation, nothing is added to the scaling history
+    summary = auto_scaler.get_metrics_summary()
+    prediction = {key: value for key, value in auto_scaler.predict_next_spike().items() if key != 'timestamp'}
+    # The capacity the dashboard asks about when it polls
+    recommendation = auto_scaler.get_scaling_recommendation(summary['current_load'] + 50)
+    return {'metrics': summary, 'prediction': prediction, 'recommendation': recommendation}
+
+event_hub = EventHub(config.STREAM_MAX_CLIENTS, config.STREAM_MIN_INTERVAL, config.STREAM_MAX_INTERVAL,
+                     config.STREAM_HEARTBEAT, config.STREAM_MAX_AGE)
+event_hub.topic('metrics', metrics.get_metrics, DELTA)
+event_hub.topic('migration', lambda: {'migration_percentage': metrics.migration_percentage})
+event_hub.topic('history', lambda: {'entries': metrics.get_request_history(30),
+                                    'total_requests': len(metrics.request_history)}, APPEND)
+event_hub.topic('compliance', shared_snapshot('compliance', compliance_checker.get_overall_compliance))
+event_hub.topic('scaling', shared_snapshot('auto_scaler', scaling_snapshot))
+
+@app.after_request
+def notify_stream(response):
+    # Writes change what dashboards show, reads don't; the hub coalesces the rest
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        event_hub.notify()
+    return response
+
+@app.route('/proxy/stream', methods=['GET'])
+def stream_events():
+    try:
+        client = event_hub.subscribe()
+    except StreamFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    response = Response(client.events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Frees the slot even if the body was never read
+    response.call_on_close(lambda: event_hub.unsubscribe(client))
+    return response
 
 # --- All other endpoints ---
 
@@ -1100,14 +1828,21 @@ def rollback():
         elif timestamp:
             rollback_info = metrics.rollback_to_timestamp(timestamp)
         
+        ramp.stop('rollback requested')
+        if state_log is not None:
+            state_log.append('rollback', {'request_id': request_id, 'timestamp': timestamp,
+                                          'from_percentage': metrics.migration_percentage})
         metrics.set_migration_percentage(0) # The actual rollback
-        print(f"[PROXY] ROLLBACK EXECUTED: Migration set to 0%")
+        table = unpin_plan_routes('rollback', 'Rollback to 0%')
+        log.warning('rollback', 'Rollback executed: migration set to 0%', request_id=request_id,
+                    timestamp=timestamp, routing_version=table.version)
         
         return jsonify({
             'success': True,
             'message': 'Rollback successful. Migration set to 0%.',
             'rolled_back_info': rollback_info,
             'new_migration_percentage': metrics.migration_percentage,
+            'routing_version': table.version,
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -1125,7 +1860,17 @@ def proxy_request():
         endpoint = data.get('endpoint')
         method = data.get('method', 'POST')
         request_data = data.get('data', {})
-        result = router.route_request(endpoint, method, request_data)
+        deadline = Deadline.parse(request.headers.get('X-Deadline-Ms'), data.get('deadline_ms'))
+
+        if data.get('passthrough') or request.args.get('passthrough') in ('1', 'true'):
+            # Stream the upstream body straight through; routing metadata goes in the headers
+            stream, failure = router.route_passthrough(endpoint, method, request_data, deadline)
+            if failure is not None:
+                return jsonify(failure), 500
+            return Response(stream_with_context(stream.envelope_chunks()),
+                            mimetype='application/json', headers=stream.headers())
+
+        result = router.route_request(endpoint, method, request_data, deadline)
         
         # This will return a 500 if the downstream service failed
         if not result['success']:
@@ -1135,17 +1880,103 @@ def proxy_request():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e), 'timestamp': datetime.now().isoformat()}), 400
 
+@app.route('/proxy/batch', methods=['POST'])
+def proxy_batch():
+    try:
+        data = request.get_json()
+        items, concurrency = batch_runner.validate(data.get('items'), data.get('concurrency'))
+        deadline = Deadline.parse(request.headers.get('X-Deadline-Ms'), data.get('deadline_ms'))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e), 'timestamp': datetime.now().isoformat()}), 400
+
+    start_time = time.time()
+    results = [None] * len(items)
+    for index, result in batch_runner.run(items, concurrency, deadline):
+        results[index] = {'index': index, **result}
+    succeeded = sum(1 for r in results if r['success'])
+    log.info('batch', f"Batch of {len(items)} done", succeeded=succeeded, failed=len(items) - succeeded)
+    return jsonify({
+        'success': True,
+        'results': results,
+        'total': len(items),
+        'succeeded': succeeded,
+        'failed': len(items) - succeeded,
+        'concurrency': concurrency,
+        'response_time': round((time.time() - start_time) * 1000, 2),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/proxy/batch/stream', methods=['POST'])
+def proxy_batch_stream():
+    # Same as /proxy/batch, but each result is written as an NDJSON line as soon as it finishes
+    try:
+        data = request.get_json()
+        items, concurrency = batch_runner.validate(data.get('items'), data.get('concurrency'))
+        deadline = Deadline.parse(request.headers.get('X-Deadline-Ms'), data.get('deadline_ms'))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e), 'timestamp': datetime.now().isoformat()}), 400
+
+    def generate():
+        for index, result in batch_runner.run(items, concurrency, deadline):
+            yield json.dumps({'index': index, **result}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/proxy/metrics', methods=['GET'])
 def get_metrics():
-    return jsonify(metrics.get_metrics())
+    try:
+        result = metrics.get_metrics(request.args.get('window'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    result['latency'] = {'sources': metrics.latency_summary()}
+    if shared_state is not None:
+        # Time windows and this summary are per worker; /proxy/latency merges every worker's sketches
+        result['latency']['scope'] = f"worker {os.getpid()}"
+        if 'window' in result:
+            result['window']['scope'] = f"worker {os.getpid()}"
+    # Polled by the dashboard: a few numbers per subsystem. Their full stats are on their own
+    # endpoints (/proxy/cache, /proxy/hedging, /proxy/limits...) or here with ?detail=1
+    result['subsystems'] = {
+        'cache_hits': router.cache.hits,
+        'open_breakers': router.breakers.open_breakers(),
+        'hedges_sent': router.hedger.hedges_sent,
+        'shadow_mismatches': router.shadow.mismatches,
+        'ramp_running': ramp.running,
+        'routing_version': router.routing_table.version
+    }
+    if request.args.get('detail') in ('1', 'true'):
+        result['upstream_pools'] = router.get_pool_stats()
+        result['shadow'] = router.shadow.get_stats()
+        result['hedging'] = router.hedger.get_stats()
+        result['cache'] = router.cache.get_stats()
+        result['single_flight'] = router.single_flight.get_stats()
+        result['circuit_breakers'] = router.breakers.get_stats()
+        result['concurrency_limits'] = router.get_limiter_stats()
+        result['retries'] = router.retries.get_stats()
+        result['logging'] = log.get_stats()
+        result['ramp'] = ramp.get_status()
+        result['routing_config'] = router.routing_table.summary()
+        result['stream'] = event_hub.get_stats()
+        if shared_state is not None:
+            result['shared_state'] = shared_state.get_stats()
+        if state_log is not None:
+            result['state_log'] = state_log.get_stats()
+    return jsonify(result)
+
+@app.route('/proxy/latency', methods=['GET'])
+def get_latency():
+    # Per-endpoint detail stays off /proxy/metrics: walking every sketch (and, shared, merging every worker's) is not free
+    return jsonify({'success': True, 'latency': metrics.latency_stats()})
 
 @app.route('/proxy/set_migration', methods=['POST'])
 def set_migration():
     try:
         data = request.get_json()
         percentage = data.get('percentage', 0)
+        if ramp.running:
+            ramp.stop('manual override')
         metrics.set_migration_percentage(percentage)
-        print(f"[PROXY] Migration percentage set to: {percentage}%")
+        log.info('migration', 'Migration percentage set', migration_percentage=metrics.migration_percentage)
         return jsonify({
             'success': True,
             'migration_percentage': metrics.migration_percentage,
@@ -1154,23 +1985,209 @@ def set_migration():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/proxy/ramp/start', methods=['POST'])
+def start_ramp():
+    try:
+        data = request.get_json() or {}
+        status = ramp.start(
+            target=float(data.get('target', 100)),
+            step=float(data.get('step', config.RAMP_STEP)),
+            interval=float(data.get('interval', config.RAMP_INTERVAL)),
+            min_samples=int(data.get('min_samples', config.RAMP_MIN_SAMPLES)),
+            max_error_rate=float(data.get('max_error_rate', config.RAMP_MAX_ERROR_RATE)),
+            max_p95_ms=float(data.get('max_p95_ms', config.RAMP_MAX_P95_MS)),
+            max_p99_ms=float(data.get('max_p99_ms', config.RAMP_MAX_P99_MS)),
+            on_breach=data.get('on_breach', config.RAMP_ON_BREACH),
+            probe=bool(data.get('probe', True))
+        )
+        log.info('ramp', 'Migration ramp started', **status['settings'])
+        return jsonify({'success': True, 'ramp': status})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/proxy/ramp/stop', methods=['POST'])
+def stop_ramp():
+    return jsonify({'success': True, 'ramp': ramp.stop()})
+
+@app.route('/proxy/ramp/status', methods=['GET'])
+def ramp_status():
+    return jsonify({'success': True, 'ramp': ramp.get_status()})
+
+@app.route('/proxy/cache', methods=['GET'])
+def cache_stats():
+    return jsonify({'success': True, 'cache': router.cache.get_stats()})
+
+@app.route('/proxy/cache/clear', methods=['POST'])
+def clear_cache():
+    router.cache.clear()
+    log.info('cache', 'Response cache cleared')
+    return jsonify({'success': True, 'cache': router.cache.get_stats(), 'timestamp': datetime.now().isoformat()})
+
+@app.route('/proxy/hedging', methods=['GET', 'POST'])
+def hedging():
+    if request.method == 'GET':
+        return jsonify({'success': True, 'hedging': router.hedger.get_stats()})
+    try:
+        data = request.get_json()
+        router.hedger.configure(data.get('enabled'), data.get('percentile'), data.get('budget_percent'))
+        log.info('config', 'Hedging updated', enabled=router.hedger.enabled, percentile=router.hedger.percentile)
+        return jsonify({
+            'success': True,
+            'hedging': router.hedger.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/proxy/limits', methods=['GET', 'POST'])
+def concurrency_limits():
+    if request.method == 'GET':
+        return jsonify({'success': True, 'concurrency_limits': router.get_limiter_stats()})
+    try:
+        data = request.get_json()
+        sources = [data['source']] if data.get('source') else list(router.limiters)
+        for source in sources:
+            if source not in router.limiters:
+                raise ValueError(f"Unknown backend: {source}")
+            router.limiters[source].configure(data.get('enabled'), data.get('algorithm'),
+                                              data.get('queue_timeout_ms'), data.get('max_limit'))
+        log.info('config', 'Concurrency limits updated', sources=sources)
+        return jsonify({
+            'success': True,
+            'concurrency_limits': router.get_limiter_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/proxy/retries', methods=['GET', 'POST'])
+def retries():
+    if request.method == 'GET':
+        return jsonify({'success': True, 'retries': router.retries.get_stats()})
+    try:
+        data = request.get_json()
+        router.retries.configure(data.get('enabled'), data.get('max_attempts'), data.get('budget_percent'))
+        log.info('config', 'Retries updated', enabled=router.retries.enabled,
+                 max_attempts=router.retries.max_attempts, budget_percent=router.retries.budget.budget_percent)
+        return jsonify({
+            'success': True,
+            'retries': router.retries.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/proxy/logging', methods=['GET', 'POST'])
+def logging_config():
+    if request.method == 'GET':
+        return jsonify({'success': True, 'logging': log.get_stats()})
+    try:
+        data = request.get_json()
+        log.configure(data.get('sample_rates'))
+        log.info('config', 'Log sample rates updated', sample_rates=log.sample_rates)
+        return jsonify({
+            'success': True,
+            'logging': log.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/proxy/shadow', methods=['GET', 'POST'])
+def shadow_traffic():
+    if request.method == 'GET':
+        return jsonify({'success': True, 'shadow': router.shadow.get_stats()})
+    try:
+        data = request.get_json()
+        router.shadow.configure(data.get('enabled'), data.get('sample_rate'), data.get('max_queue'))
+        log.info('config', 'Shadow traffic updated', enabled=router.shadow.enabled,
+                 sample_rate=router.shadow.sample_rate, max_queue=router.shadow.max_queue)
+        return jsonify({
+            'success': True,
+            'shadow': router.shadow.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/proxy/routing/table', methods=['GET'])
+def routing_table():
+    return jsonify({'success': True, 'routing_table': router.routing_table.to_dict()})
+
+@app.route('/proxy/routing/config', methods=['GET', 'POST'])
+def routing_config():
+    if request.method == 'GET':
+        stats = router.routing_config.get_stats()
+        if routing_watcher is not None:
+            stats['file'] = routing_watcher.get_stats()
+        return jsonify({'success': True, 'routing_config': stats})
+    try:
+        data = request.get_json()
+        note = data.pop('note', None)
+        # share_routing_config logs the new version
+        table = router.routing_config.publish(data, source='api', note=note)
+        return jsonify({
+            'success': True,
+            'routing_table': table.to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/proxy/routing/rollback', methods=['POST'])
+def routing_rollback():
+    try:
+        data = request.get_json()
+        version = data.get('version')
+        if version is None:
+            raise ValueError("version is required")
+        previous = router.routing_table.version
+        table = router.routing_config.activate(int(version))
+        log.info('routing', 'Routing config rolled back', from_version=previous, to_version=table.version)
+        return jsonify({
+            'success': True,
+            'previous_version': previous,
+            'routing_table': table.to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/proxy/routing/mode', methods=['GET', 'POST'])
+def routing_mode():
+    if request.method == 'GET':
+        return jsonify({'success': True, 'routing': router.get_routing_mode()})
+    try:
+        data = request.get_json()
+        router.set_routing_mode(data.get('mode', 'random'), data.get('key_fields'))
+        log.info('config', 'Routing mode updated', mode=router.routing_mode,
+                 key_fields=list(router.hash_ring.key_fields))
+        return jsonify({
+            'success': True,
+            'routing': router.get_routing_mode(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/proxy/health', methods=['GET'])
 def health():
     return jsonify({
         'status': 'ok',
         'system': 'proxy_router',
         'migration_percentage': metrics.migration_percentage,
+        'circuit_breakers': {
+            name: state['state'] for name, state in router.breakers.get_stats()['breakers'].items()
+        },
+        'open_circuits': router.breakers.open_breakers(),
         'timestamp': datetime.now().isoformat()
     })
 
 @app.route('/proxy/reset', methods=['POST'])
 def reset_metrics():
-    metrics.requests = []
-    metrics.request_history = []
-    metrics.errors = 0
-    metrics.total_requests = 0
-    metrics.migration_percentage = 0
-    metrics.rollback_states = {}
+    ramp.stop('metrics reset')
+    metrics.reset()
+    router.cache.clear()
     return jsonify({'success': True, 'message': 'Metrics reset', 'timestamp': datetime.now().isoformat()})
 
 # --- HELPER TO FIND 'legacy_system.py' ---
@@ -1431,12 +2448,22 @@ def ai_chat():
 
 @app.route('/proxy/plan/save', methods=['POST'])
 def save_migration_plan():
-    global migration_plan
+    global migration_plan, migration_plan_version
     try:
         data = request.get_json()
+        table = router.apply_plan(data)
         migration_plan = data
-        print(f"[PROXY] New migration plan saved: {migration_plan}")
-        return jsonify({'success': True, 'message': 'Plan saved successfully', 'plan': migration_plan})
+        if shared_state is not None:
+            migration_plan_version = shared_state.save_doc('migration_plan', data)
+        if state_log is not None:
+            state_log.append('plan', {'plan': data})
+        log.info('migration', 'New migration plan saved', plan=migration_plan, routing_version=table.version)
+        return jsonify({
+            'success': True,
+            'message': 'Plan saved successfully',
+            'plan': migration_plan,
+            'routing_table': table.to_dict()
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
@@ -1510,6 +2537,7 @@ def get_scaling_recommendation():
         current_capacity = request.args.get('capacity', 100, type=int)
         recommendation = auto_scaler.get_scaling_recommendation(current_capacity)
         auto_scaler.add_recommendation(recommendation)
+        publish_shared('auto_scaler')
         print(f"[PROXY] Scaling recommendation: {recommendation['action']}")
         return jsonify({'success': True, 'recommendation': recommendation, 'timestamp': datetime.now().isoformat()})
     except Exception as e:
@@ -1531,6 +2559,7 @@ def record_traffic():
         data = request.get_json()
         request_count = data.get('request_count', 0)
         auto_scaler.record_traffic(request_count)
+        publish_shared('auto_scaler')
         return jsonify({'success': True, 'message': f'Recorded {request_count} requests'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400    
@@ -1544,6 +2573,7 @@ def check_compliance():
         req_check = compliance_checker.check_request_compliance(request_data)
         resp_check = compliance_checker.check_response_compliance(response_data)
         compliance_checker.log_check(req_check, resp_check)
+        publish_shared('compliance')
         print(f"[PROXY] Compliance check: Req={req_check['status']}, Resp={resp_check['status']}")
         return jsonify({
             'success': True,
@@ -1582,8 +2612,11 @@ def root():
         'migration_percentage': metrics.migration_percentage,
         'endpoints': {
             'POST /proxy/request': 'Route request to legacy or cloud',
+            'POST /proxy/batch': 'Route a list of requests concurrently',
             'GET /proxy/metrics': 'Get current metrics',
+            'GET /proxy/latency': 'Latency quantiles per backend and endpoint',
             'POST /proxy/set_migration': 'Set migration percentage',
+            'POST /proxy/ramp/start': 'Ramp migration automatically, gated on cloud SLOs',
             'POST /proxy/analyze-code': 'NEW: Analyze code with Gemini AI'
         },
         'timestamp': datetime.now().isoformat()
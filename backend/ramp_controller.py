@@ -0,0 +1,315 @@
+# ============================================
+# FEATURE #25: Automatic Migration Ramp
+# File: backend/ramp_controller.py
+# Purpose: Step migration_percentage toward a target from inside the proxy,
+#          advancing only while cloud error rate and latency stay within SLO
+# ============================================
+
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from structured_log import get_logger
+
+log = get_logger()
+
+BREACH_ACTIONS = ('pause', 'rollback')
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class RampController:
+    """Background ramp: hold each step for `interval` seconds, then advance, pause or roll back"""
+
+    def __init__(self, samples: Callable[[], Iterable[Dict[str, Any]]],
+                 get_percentage: Callable[[], float], set_percentage: Callable[[float], None],
+                 probe: Optional[Callable[[], Any]] = None, shared=None,
+                 on_rollback: Optional[Callable[[float], None]] = None):
+        """
+        Args:
+            samples: Returns the recent request records (timestamp, source, response_time, error)
+            get_percentage / set_percentage: Read and apply the global migration percentage
+            probe: Optional synthetic cloud call made each tick, so a quiet system still produces samples
+            shared: SharedState; the ramp runs in whichever worker started it, and its
+                    status / stop requests go through shared memory to the others
+            on_rollback: Called after a breach rollback, e.g. to drop per-endpoint
+                         percentages that would otherwise ignore the global one
+        """
+        self._samples = samples
+        self._get_percentage = get_percentage
+        self._set_percentage = set_percentage
+        self._probe = probe
+        self._on_rollback = on_rollback
+        self.shared = shared
+        self._generation = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.state = 'idle'
+        self.reason = None
+        self.settings: Dict[str, Any] = {}
+        self.started_at = None
+        self.step_started = None
+        self.last_good = 0.0
+        self.last_window: Dict[str, Any] = {}
+        self._probe_results: List[tuple] = []
+        self.history = deque(maxlen=100)
+
+    # ============================================
+    # CONTROL
+    # ============================================
+
+    def start(self, target: float = 100, step: float = 5, interval: float = 5, min_samples: int = 5,
+              max_error_rate: float = 5, max_p95_ms: float = 500, max_p99_ms: float = 1000,
+              on_breach: str = 'rollback', probe: bool = True) -> Dict[str, Any]:
+        if not 0 <= target <= 100:
+            raise ValueError("target must be between 0-100")
+        if step <= 0:
+            raise ValueError("step must be > 0")
+        if interval <= 0:
+            raise ValueError("interval must be > 0")
+        if on_breach not in BREACH_ACTIONS:
+            raise ValueError(f"on_breach must be one of {', '.join(BREACH_ACTIONS)}")
+
+        self.stop('restarted')
+        with self._lock:
+            self.settings = {
+                'target': target,
+                'step': step,
+                'interval': interval,
+                'min_samples': max(1, int(min_samples)),
+                'max_error_rate': max_error_rate,
+                'max_p95_ms': max_p95_ms,
+                'max_p99_ms': max_p99_ms,
+                'on_breach': on_breach,
+                'probe': bool(probe) and self._probe is not None,
+            }
+            self.state = 'running'
+            self.reason = None
+            self.started_at = datetime.now().isoformat()
+            self.step_started = self.started_at
+            # A breach before the first step passes rolls back to where the ramp began, not to 0%
+            self.last_good = self._get_percentage()
+            self.last_window = {}
+            self._probe_results = []
+            self.history.clear()
+            self._stop.clear()
+            if self.shared is not None:
+                self._generation = self.shared.incr('ramp_generation')
+            self._thread = threading.Thread(target=self._run, name='migration-ramp', daemon=True)
+            self._thread.start()
+        self._event('start', self._get_percentage(), f"Ramp to {target}% in {step}% steps every {interval}s")
+        self._publish()
+        return self.get_status()
+
+    def stop(self, reason: str = 'stopped by operator') -> Dict[str, Any]:
+        """Stop the ramp where it is; the percentage is left unchanged"""
+        thread = self._thread
+        self._stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        with self._lock:
+            was_running = self.state == 'running'
+            self._thread = None
+            if was_running:
+                self.state = 'stopped'
+                self.reason = reason
+        if was_running:
+            self._event('stop', self._get_percentage(), reason)
+            self._publish()
+        elif self.shared is not None and self.running:
+            # Running in another worker: it sees the new generation on its next tick
+            self.shared.incr('ramp_generation')
+            event = {'action': 'stop', 'migration_percentage': self._get_percentage(),
+                     'detail': reason, 'timestamp': datetime.now().isoformat()}
+            self.shared.update_doc('ramp', lambda doc: {**doc, 'state': 'stopped', 'running': False,
+                                                        'reason': reason, 'history': doc['history'] + [event]})
+        return self.get_status()
+
+    @property
+    def running(self) -> bool:
+        if self.shared is not None:
+            return (self.shared.load_doc('ramp') or {}).get('state') == 'running'
+        return self.state == 'running'
+
+    # ============================================
+    # LOOP
+    # ============================================
+
+    def _run(self):
+        interval = self.settings['interval']
+        while not self._stop.wait(interval):
+            try:
+                if not self._tick():
+                    return
+                self._publish()
+            except Exception as e:
+                log.error('ramp', 'Ramp tick failed', error=str(e))
+
+    def _tick(self) -> bool:
+        """One evaluation of the current step; False once the ramp is finished"""
+        settings = self.settings
+        if self.shared is not None and self.shared.get('ramp_generation') != self._generation:
+            with self._lock:
+                self.state = 'stopped' # stopped or restarted from another worker
+            return False
+        if settings['probe']:
+            self._run_probe()
+
+        current = self._get_percentage()
+        window = self._window()
+        self.last_window = window
+
+        if window['samples'] < settings['min_samples']:
+            return True # not enough evidence yet: hold the step
+
+        if self._stop.is_set():
+            return False # stopped while the probe was in flight
+        breach = self._breach(window)
+        if breach is not None:
+            if settings['on_breach'] == 'rollback':
+                self._apply(self.last_good)
+                if self._on_rollback is not None:
+                    self._on_rollback(self.last_good)
+                self._finish('rolled_back', 'rollback', self.last_good, breach)
+            else:
+                self._finish('paused', 'pause', current, breach)
+            return False
+
+        self.last_good = current
+        if current >= settings['target']:
+            self._finish('completed', 'complete', current, f"Reached {settings['target']}%")
+            return False
+
+        nxt = min(settings['target'], current + settings['step'])
+        self._apply(nxt)
+        self._event('advance', nxt, self._summary(window))
+        return True
+
+    def _apply(self, percentage: float):
+        self._set_percentage(percentage)
+        with self._lock:
+            # Samples logged before this point belong to the previous step
+            self.step_started = datetime.now().isoformat()
+            self._probe_results = []
+
+    def _finish(self, state: str, action: str, percentage: float, reason: str):
+        with self._lock:
+            self.state = state
+            self.reason = reason
+        self._event(action, percentage, reason)
+        self._publish()
+        level = log.warning if state in ('rolled_back', 'paused') else log.info
+        level('ramp', f"Ramp {state} at {percentage}%", reason=reason)
+
+    def _run_probe(self):
+        started = time.time()
+        error = None
+        try:
+            self._probe()
+        except Exception as e:
+            error = str(e)
+        with self._lock:
+            self._probe_results.append((started, (time.time() - started) * 1000, error))
+
+    # ============================================
+    # SLO EVALUATION
+    # ============================================
+
+    def _window(self) -> Dict[str, Any]:
+        """Cloud latency / errors since the current step began (real traffic + probes)"""
+        with self._lock:
+            since = self.step_started
+            probes = list(self._probe_results)
+        latencies = []
+        errors = 0
+        for record in list(self._samples()):
+            if record.get('source') != 'cloud' or record.get('timestamp', '') < since:
+                continue
+            latencies.append(record['response_time'])
+            if record.get('error'):
+                errors += 1
+        for _, latency_ms, error in probes:
+            latencies.append(latency_ms)
+            if error:
+                errors += 1
+        latencies.sort()
+        samples = len(latencies)
+        return {
+            'samples': samples,
+            'probes': len(probes),
+            'errors': errors,
+            'error_rate': round(errors / samples * 100, 2) if samples else 0,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'since': since
+        }
+
+    def _breach(self, window: Dict[str, Any]) -> Optional[str]:
+        settings = self.settings
+        if window['error_rate'] > settings['max_error_rate']:
+            return f"error rate {window['error_rate']}% > {settings['max_error_rate']}%"
+        if window['p95_ms'] > settings['max_p95_ms']:
+            return f"p95 {window['p95_ms']}ms > {settings['max_p95_ms']}ms"
+        if window['p99_ms'] > settings['max_p99_ms']:
+            return f"p99 {window['p99_ms']}ms > {settings['max_p99_ms']}ms"
+        return None
+
+    @staticmethod
+    def _summary(window: Dict[str, Any]) -> str:
+        return (f"{window['samples']} samples, error rate {window['error_rate']}%, "
+                f"p95 {window['p95_ms']}ms, p99 {window['p99_ms']}ms")
+
+    # ============================================
+    # STATUS
+    # ============================================
+
+    def _event(self, action: str, percentage: float, detail: str):
+        self.history.append({
+            'action': action,
+            'migration_percentage': percentage,
+            'detail': detail,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def _publish(self):
+        if self.shared is not None:
+            status = self._local_status()
+            # After a stop/restart from another worker the generation moved on: keep its record
+            self.shared.update_doc('ramp', lambda doc: status if self.shared.get('ramp_generation') == self._generation else doc)
+
+    def get_status(self) -> Dict[str, Any]:
+        if self.shared is not None:
+            doc = self.shared.load_doc('ramp')
+            if doc is not None:
+                return {**doc, 'migration_percentage': self._get_percentage(),
+                        'timestamp': datetime.now().isoformat()}
+        return self._local_status()
+
+    def _local_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'running': self.state == 'running',
+                'reason': self.reason,
+                'migration_percentage': self._get_percentage(),
+                'last_good_percentage': self.last_good,
+                'settings': dict(self.settings),
+                'started_at': self.started_at,
+                'step_started': self.step_started,
+                'window': dict(self.last_window),
+                'history': list(self.history)[-20:],
+                'timestamp': datetime.now().isoformat()
+            }
@@ -0,0 +1,306 @@
+# ============================================
+# FEATURE #28: Request Record Ring Buffer
+# File: backend/request_ring.py
+# Purpose: Keep the proxy's recent request records in preallocated columns,
+#          so logging a request overwrites a slot instead of building a dict
+# ============================================
+
+import math
+import threading
+import time
+from array import array
+from typing import Dict, Any, List, Optional, Tuple
+
+NAN = float('nan')
+
+# Latency sums are kept as integers in units of 2**-20 ms (about a nanosecond). Append adds
+# and eviction subtracts the very same integer, so the running sum never drifts the way a
+# float would; a slot's value fits an array('q') column up to ~100 days
+_FIXED_BITS = 20
+_FIXED_SCALE = float(1 << _FIXED_BITS)
+
+# Fields of a record, in the order the old per-request dicts had them
+RECORD_FIELDS = ('id', 'timestamp', 'endpoint', 'response_time', 'source', 'error', 'legacy_time', 'cloud_time')
+
+
+class RequestRecord:
+    """One request read back out of the ring"""
+
+    __slots__ = RECORD_FIELDS + ('monotonic_ns',)
+
+    def __init__(self, ring: 'RequestRing', slot: int):
+        self.id = ring._ids[slot]
+        self.timestamp = ring._timestamps[slot]
+        self.endpoint = ring._endpoint_names[ring._endpoints[slot]]
+        self.response_time = ring._latency[slot]
+        self.source = ring._source_names[ring._sources[slot]]
+        self.error = ring._error_text[slot] if ring._error_flags[slot] else None
+        self.legacy_time = _optional(ring._legacy_time[slot])
+        self.cloud_time = _optional(ring._cloud_time[slot])
+        self.monotonic_ns = ring._monotonic_ns[slot]
+
+    def get(self, field: str, default=None):
+        return getattr(self, field, default)
+
+    def __getitem__(self, field: str):
+        return getattr(self, field)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in RECORD_FIELDS}
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class RequestRing:
+    """
+    Fixed-capacity ring of request records stored column by column.
+
+    Numbers live unboxed in array columns; endpoint and source names are
+    interned to small integer codes. Timestamps and error texts are kept by
+    reference - the caller has already built those strings. Appending writes
+    one slot in every column, so it costs the same at any fill level.
+
+    Per-source counts and latency sums are kept up to date as slots are
+    written and overwritten, so source_stats() does not scan the ring.
+    """
+
+    def __init__(self, capacity: int = 100, max_names: int = 1024):
+        """
+        Args:
+            capacity: Records kept; the oldest is overwritten once full
+            max_names: Interned endpoint names kept before unused ones are dropped
+        """
+        self.capacity = capacity
+        self.max_names = max_names
+        self._ids = array('q', [0]) * capacity
+        self._monotonic_ns = array('q', [0]) * capacity
+        self._latency = array('d', [0.0]) * capacity
+        self._legacy_time = array('d', [NAN]) * capacity
+        self._cloud_time = array('d', [NAN]) * capacity
+        self._sources = array('B', [0]) * capacity
+        self._endpoints = array('I', [0]) * capacity
+        self._error_flags = array('B', [0]) * capacity
+        self._error_text: List[Optional[str]] = [None] * capacity
+        self._timestamps: List[Optional[str]] = [None] * capacity
+        self._source_codes = {'legacy': 0, 'cloud': 1}
+        self._source_names = ['legacy', 'cloud']
+        self._source_counts = [0, 0]
+        self._source_sums = [0, 0] # fixed point, see _FIXED_BITS
+        self._fixed_latency = array('q', [0]) * capacity
+        self._endpoint_codes: Dict[str, int] = {}
+        self._endpoint_names: List[str] = []
+        self._appended = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._appended, self.capacity)
+
+    def append(self, record_id: int, timestamp: str, endpoint: str, response_time: float, source: str,
+               error: Optional[str] = None, legacy_time: Optional[float] = None,
+               cloud_time: Optional[float] = None):
+        fixed = round(response_time * _FIXED_SCALE)
+        with self._lock:
+            endpoint_code = self._endpoint_codes.get(endpoint)
+            code = self._source_codes.get(source)
+            slot = self._appended % self.capacity
+            if self._appended >= self.capacity:
+                # Evict the record this slot held
+                evicted = self._sources[slot]
+                self._source_counts[evicted] -= 1
+                self._source_sums[evicted] -= self._fixed_latency[slot]
+            self._appended += 1
+            self._ids[slot] = record_id
+            self._monotonic_ns[slot] = time.monotonic_ns()
+            self._timestamps[slot] = timestamp
+            self._endpoints[slot] = self._endpoint_code(endpoint) if endpoint_code is None else endpoint_code
+            self._latency[slot] = response_time
+            if code is None:
+                code = self._source_code(source)
+            self._sources[slot] = code
+            self._fixed_latency[slot] = fixed
+            self._source_counts[code] += 1
+            self._source_sums[code] += fixed
+            self._error_flags[slot] = 1 if error else 0
+            self._error_text[slot] = error
+            self._legacy_time[slot] = NAN if legacy_time is None else legacy_time
+            self._cloud_time[slot] = NAN if cloud_time is None else cloud_time
+
+    def _source_code(self, source: str) -> int:
+        code = self._source_codes.get(source)
+        if code is None:
+            code = self._source_codes[source] = len(self._source_names)
+            self._source_names.append(source)
+            self._source_counts.append(0)
+            self._source_sums.append(0)
+        return code
+
+    def _endpoint_code(self, endpoint: str) -> int:
+        code = self._endpoint_codes.get(endpoint)
+        if code is None:
+            if len(self._endpoint_names) >= self.max_names:
+                self._compact_endpoints()
+            code = self._endpoint_codes[endpoint] = len(self._endpoint_names)
+            self._endpoint_names.append(endpoint)
+        return code
+
+    def _compact_endpoints(self):
+        # Endpoints come from clients, so the name table is rebuilt from live slots rather than grow forever
+        live = [self._endpoint_names[self._endpoints[slot]] for slot in range(len(self))]
+        self._endpoint_codes, self._endpoint_names = {}, []
+        for slot, name in enumerate(live):
+            code = self._endpoint_codes.get(name)
+            if code is None:
+                code = self._endpoint_codes[name] = len(self._endpoint_names)
+                self._endpoint_names.append(name)
+            self._endpoints[slot] = code
+
+    def _slots(self) -> range:
+        """Slot indexes oldest first (caller holds the lock)"""
+        count = len(self)
+        start = self._appended - count
+        return range(start, start + count)
+
+    def records(self) -> List[RequestRecord]:
+        with self._lock:
+            return [RequestRecord(self, position % self.capacity) for position in self._slots()]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [record.to_dict() for record in self.records()]
+
+    def source_stats(self) -> Dict[str, Tuple[int, float]]:
+        """(count, mean response time) per source present in the ring - constant time"""
+        with self._lock:
+            return {
+                name: (count, total / (count << _FIXED_BITS))
+                for name, count, total in zip(self._source_names, self._source_counts, self._source_sums)
+                if count
+            }
+
+    def update_times(self, record_id: int, legacy_time: float, cloud_time: float) -> bool:
+        with self._lock:
+            for position in reversed(self._slots()):
+                slot = position % self.capacity
+                if self._ids[slot] == record_id:
+                    self._legacy_time[slot] = legacy_time
+                    self._cloud_time[slot] = cloud_time
+                    return True
+        return False
+
+    def clear(self):
+        with self._lock:
+            self._appended = 0
+            self._source_counts = [0] * len(self._source_names)
+            self._source_sums = [0] * len(self._source_names)
+            for slot in range(self.capacity):
+                self._error_text[slot] = None
+                self._timestamps[slot] = None
+
+
+if __name__ == '__main__':
+    # Benchmark: per-request cost of the old list-of-dicts trim vs the ring, then of the whole
+    # MetricsCollector.log_request bookkeeping around it (history entry, timestamp, trims)
+    import tracemalloc
+    from datetime import datetime
+
+    N = 100000
+
+    class ListRecords:
+        def __init__(self):
+            self.requests = []
+
+        def append(self, record_id, endpoint, response_time, source):
+            self.requests.append({
+                'id': record_id,
+                'timestamp': datetime.now().isoformat(),
+                'endpoint': endpoint,
+                'response_time': response_time,
+                'source': source,
+                'error': None,
+                'legacy_time': None,
+                'cloud_time': None
+            })
+            if len(self.requests) > 100:
+                self.requests = self.requests[-100:]
+
+    class RingRecords:
+        def __init__(self):
+            self.ring = RequestRing(100)
+
+        def append(self, record_id, endpoint, response_time, source):
+            # The timestamp string is built once per request in MetricsCollector either way
+            self.ring.append(record_id, datetime.now().isoformat(), endpoint, response_time, source)
+
+    endpoints = ['inventory/get_part', 'orders/create', 'dealers/get']
+    for name, store in (('list of dicts', ListRecords()), ('ring buffer', RingRecords())):
+        for i in range(200):
+            store.append(i, endpoints[i % 3], 12.5, 'cloud' if i % 2 else 'legacy')
+
+        started = time.perf_counter()
+        for i in range(N):
+            store.append(i, endpoints[i % 3], 12.5, 'cloud' if i % 2 else 'legacy')
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        peak_bytes = 0
+        for i in range(1000):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            store.append(i, endpoints[i % 3], 12.5, 'cloud')
+            peak_bytes += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+
+        print(f"{name:14s} {elapsed / N * 1e6:6.2f}us/append  "
+              f"{peak_bytes / 1000:7.0f} bytes allocated/append")
+
+    def log_request_before(state, record_id, endpoint, response_time, source):
+        # Two dicts, two timestamps, both lists copied by the trim
+        entry = {'id': record_id, 'timestamp': datetime.now().isoformat(), 'endpoint': endpoint,
+                 'response_time': response_time, 'source': source, 'error': None, 'legacy_time': None,
+                 'cloud_time': None, 'request_data': None, 'response_data': None, 'migration_percentage': 0}
+        state['history'].append(entry)
+        state['requests'].append({'id': record_id, 'timestamp': datetime.now().isoformat(), 'endpoint': endpoint,
+                                  'response_time': response_time, 'source': source, 'error': None,
+                                  'legacy_time': None, 'cloud_time': None})
+        if len(state['requests']) > 100:
+            state['requests'] = state['requests'][-100:]
+        if len(state['history']) > 50:
+            state['history'] = state['history'][-50:]
+
+    def log_request_after(state, record_id, endpoint, response_time, source):
+        timestamp = datetime.now().isoformat()
+        entry = {'id': record_id, 'timestamp': timestamp, 'endpoint': endpoint,
+                 'response_time': response_time, 'source': source, 'error': None, 'legacy_time': None,
+                 'cloud_time': None, 'request_data': None, 'response_data': None, 'migration_percentage': 0}
+        state['history'].append(entry)
+        state['ring'].append(record_id, timestamp, endpoint, response_time, source)
+        if len(state['history']) > 50:
+            del state['history'][:-50]
+
+    for name, log_request, state in (('log_request before', log_request_before, {'history': [], 'requests': []}),
+                                     ('log_request after', log_request_after, {'history': [], 'ring': RequestRing(100)})):
+        for i in range(200):
+            log_request(state, i, endpoints[i % 3], 12.5, 'legacy')
+        started = time.perf_counter()
+        for i in range(N):
+            log_request(state, i, endpoints[i % 3], 12.5, 'cloud' if i % 2 else 'legacy')
+        print(f"{name:18s} {(time.perf_counter() - started) / N * 1e6:6.2f}us/request")
+
+    # Aggregates for /proxy/metrics: scanning the window vs the running per-source totals
+    for capacity in (100, 10000):
+        ring = RequestRing(capacity)
+        for i in range(capacity):
+            ring.append(i, 'ts', endpoints[i % 3], 12.5 + i % 7, 'cloud' if i % 2 else 'legacy')
+        started = time.perf_counter()
+        for _ in range(1000):
+            records = ring.to_dicts()
+            legacy_times = [r['response_time'] for r in records if r['source'] == 'legacy']
+            cloud_times = [r['response_time'] for r in records if r['source'] == 'cloud']
+            sum(legacy_times) / len(legacy_times), sum(cloud_times) / len(cloud_times)
+        scan = (time.perf_counter() - started) / 1000
+        started = time.perf_counter()
+        for _ in range(1000):
+            ring.source_stats()
+        running = (time.perf_counter() - started) / 1000
+        print(f"window {capacity:5d}: scan {scan * 1e6:9.1f}us  running totals {running * 1e6:5.1f}us")
@@ -0,0 +1,188 @@
+# ============================================
+# FEATURE #16: Legacy Response Cache
+# File: backend/response_cache.py
+# Purpose: TTL + LRU (by bytes) cache for slow legacy reads
+# ============================================
+
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# Seconds a legacy answer stays fresh, per endpoint (only these endpoints are cached)
+DEFAULT_TTLS = {
+    "inventory/get_part": 30,
+    "inventory/list_all": 15,
+    "dealer/get_details": 60,
+}
+
+# Writes and the cache tags they make stale
+WRITE_INVALIDATIONS = {
+    "orders/create": ("part_number",),
+}
+
+ALL_INVENTORY_TAG = "inventory:all"
+
+CacheEntry = namedtuple('CacheEntry', ['value', 'size', 'expires_at', 'tags'])
+
+
+def _size_of(value) -> int:
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return len(json.dumps(value, default=str).encode('utf-8'))
+
+
+class ResponseCache:
+    """Bounded response cache keyed on endpoint + normalized request body"""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, ttls: Optional[Dict[str, float]] = None,
+                 enabled: bool = True):
+        """
+        Args:
+            max_bytes: Total size of cached bodies before LRU eviction kicks in
+            ttls: Seconds to keep each endpoint's responses (endpoint -> ttl)
+        """
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tag_index = defaultdict(set)
+        self.bytes_held = 0
+        # Bumped on every invalidation so reads that raced a write are not stored
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    # ============================================
+    # KEYS & TAGS
+    # ============================================
+
+    @staticmethod
+    def make_key(endpoint: str, data) -> str:
+        return f"{endpoint}|{json.dumps(data or {}, sort_keys=True, separators=(',', ':'), default=str)}"
+
+    @staticmethod
+    def _tags_for(endpoint: str, data) -> tuple:
+        if endpoint == "inventory/list_all":
+            return (ALL_INVENTORY_TAG,)
+        part_number = (data or {}).get('part_number')
+        return (f"part:{part_number}",) if part_number else ()
+
+    def is_cacheable(self, endpoint: str) -> bool:
+        return self.enabled and endpoint in self.ttls
+
+    # ============================================
+    # READ / WRITE
+    # ============================================
+
+    def get(self, endpoint: str, data):
+        """Return a fresh cached value or None (counts the hit/miss)"""
+        if not self.is_cacheable(endpoint):
+            return None
+        key = self.make_key(endpoint, data)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, endpoint: str, data, value, generation: int):
+        """Store a value fetched while `generation` was current"""
+        if not self.is_cacheable(endpoint):
+            return
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        key = self.make_key(endpoint, data)
+        tags = self._tags_for(endpoint, data)
+        with self._lock:
+            if generation != self.generation:
+                return # a write landed while this read was in flight
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(value, size, time.monotonic() + self.ttls[endpoint], tags)
+            self.bytes_held += size
+            for tag in tags:
+                self._tag_index[tag].add(key)
+            while self.bytes_held > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_for_write(self, endpoint: str, data) -> int:
+        """Drop entries a write to `endpoint` may have made stale"""
+        fields = WRITE_INVALIDATIONS.get(endpoint)
+        if fields is None:
+            return 0
+        tags = [ALL_INVENTORY_TAG]
+        for field in fields:
+            value = (data or {}).get(field)
+            if value:
+                tags.append(f"part:{value}")
+        removed = 0
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._tag_index.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+            self.invalidations += removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_index.clear()
+            self.bytes_held = 0
+            self.generation += 1
+
+    def _remove(self, key: str):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes_held -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    # ============================================
+    # STATS
+    # ============================================
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes_held': self.bytes_held,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0,
+                'miss_ratio': round(self.misses / lookups, 3) if lookups else 0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'ttls': dict(self.ttls),
+                'timestamp': datetime.now().isoformat()
+            }
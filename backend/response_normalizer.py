@@ -0,0 +1,341 @@
+# ============================================
+# FEATURE #20: Legacy Response Normalizer
+# File: backend/response_normalizer.py
+# Purpose: Stream-parse legacy XML straight into the cloud JSON schema
+# ============================================
+
+import ast
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, Callable, Iterable, Tuple, Union
+
+# Fields that stay on the envelope; everything else goes under 'data' like the cloud API
+ENVELOPE_FIELDS = ('status', 'message', 'timestamp')
+
+# legacy to_xml writes lists as str(list): a Python repr of flat dicts of scalars.
+# These patterns read that shape directly; anything else falls back to ast.literal_eval.
+_STR = r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*\""""
+_SCALAR = rf"{_STR}|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|True|False|None"
+_REPR_PAIR = re.compile(rf"({_STR}): ({_SCALAR})(?:, |$)")
+_REPR_DICT = re.compile(rf"\{{((?:(?:{_STR}): (?:{_SCALAR})(?:, (?!\}}))?)*)\}}(?:, |\]$)")
+_REPR_CONSTANTS = {'True': True, 'False': False, 'None': None}
+
+# Bytes handed to the parser per read from the upstream socket
+CHUNK_SIZE = 16 * 1024
+
+
+def _text(value) -> str:
+    return str(value)
+
+
+def _int(value) -> int:
+    return int(float(value)) if isinstance(value, str) else int(value)
+
+
+def _float(value) -> float:
+    return float(value)
+
+
+def _bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def _lower(value) -> str:
+    return str(value).lower()
+
+
+# Record kind -> {legacy tag: (cloud field, converter)}
+FIELD_MAPS: Dict[str, Dict[str, Tuple[str, Callable]]] = {
+    'part': {
+        'PART_NO': ('id', _text),
+        'PART_NAME': ('name', _text),
+        'PART_DESC': ('description', _text),
+        'STOCK_QTY': ('stock', _int),
+        'PRICE': ('price', _float),
+        'SUPPLIER': ('supplier', _text),
+        'STATUS': ('status', _lower),
+    },
+    'dealer': {
+        'DEALER_ID': ('id', _text),
+        'DEALER_NAME': ('name', _text),
+        'COUNTRY': ('country', _text),
+        'TERRITORY': ('territory', _text),
+        'ACTIVE': ('active', _bool),
+        'CONTACT': ('contact', _text),
+    },
+    'order': {
+        'order_id': ('order_id', _text),
+        'dealer_id': ('dealer_id', _text),
+        'part_number': ('part_number', _text),
+        'quantity': ('quantity', _int),
+        'discount_applied': ('discount_applied', _float),
+        'discount_percentage': ('discount_percentage', _float),
+        'created_at': ('created_at', _text),
+    },
+}
+
+# Legacy XML tag -> cloud JSON field, across every record kind
+LEGACY_FIELD_MAP = {tag: field for fields in FIELD_MAPS.values() for tag, (field, _) in fields.items()}
+
+# Endpoint -> top-level legacy tags: records as (kind, is_list), scalars as converters
+ENDPOINT_SCHEMAS = {
+    'inventory/get_part': {'records': {'part': ('part', False)}},
+    'dealer/get_details': {'records': {'dealer': ('dealer', False)}},
+    'inventory/list_all': {'records': {'parts': ('part', True)}, 'scalars': {'part_count': _int}},
+    'orders/create': {'records': {'order': ('order', False)}},
+}
+
+
+class CompiledNormalizer:
+    """One endpoint's schema, resolved into flat tag lookups once at startup"""
+
+    __slots__ = ('endpoint', 'records', 'scalars')
+
+    def __init__(self, endpoint: str, schema: Dict[str, Any]):
+        self.endpoint = endpoint
+        self.records = {
+            tag: (FIELD_MAPS[kind], is_list) for tag, (kind, is_list) in schema.get('records', {}).items()
+        }
+        self.scalars = dict(schema.get('scalars', {}))
+
+    @staticmethod
+    def _repr_records(fields, text: str):
+        """Mapped records from a repr'd list of flat dicts, or None if the text is another shape"""
+        if text == '[]':
+            return []
+        records = []
+        position = 1
+        for match in _REPR_DICT.finditer(text, 1):
+            if match.start() != position:
+                return None
+            record = {}
+            for key, token in _REPR_PAIR.findall(match.group(1)):
+                if '\\' in key or '\\' in token:
+                    return None # escaped characters: let literal_eval unescape them
+                tag = key[1:-1]
+                if token[0] in '\'"':
+                    value = token[1:-1]
+                else:
+                    value = _REPR_CONSTANTS.get(token, token)
+                mapping = fields.get(tag)
+                if mapping is None:
+                    record[tag] = value if token[0] in '\'"' else ast.literal_eval(token)
+                    continue
+                field, convert = mapping
+                try:
+                    record[field] = convert(value)
+                except (TypeError, ValueError):
+                    record[field] = value
+            records.append(record)
+            position = match.end()
+        return records if position == len(text) else None
+
+    @staticmethod
+    def _map_record(fields, raw: Dict[str, Any]) -> Dict[str, Any]:
+        record = {}
+        for tag, value in raw.items():
+            mapping = fields.get(tag)
+            if mapping is None:
+                record[tag] = value # unknown legacy column: pass through untouched
+                continue
+            field, convert = mapping
+            try:
+                record[field] = convert(value)
+            except (TypeError, ValueError):
+                record[field] = value
+        return record
+
+    def _top_level(self, tag: str, value) -> Any:
+        """Convert one finished child of the root element"""
+        record = self.records.get(tag)
+        if record is not None:
+            fields, is_list = record
+            if isinstance(value, str):
+                # legacy to_xml writes nested lists as their Python repr
+                if value[:1] == '[':
+                    records = self._repr_records(fields, value)
+                    if records is not None:
+                        return records
+                try:
+                    value = ast.literal_eval(value) if value[:1] in ('[', '{') else value
+                except (ValueError, SyntaxError):
+                    return value
+            if isinstance(value, dict):
+                value = self._map_record(fields, value)
+                return [value] if is_list else value
+            if isinstance(value, list):
+                return [self._map_record(fields, item) if isinstance(item, dict) else item for item in value]
+            return value
+        convert = self.scalars.get(tag)
+        if convert is not None:
+            try:
+                return convert(value)
+            except (TypeError, ValueError):
+                return value
+        return value
+
+    def parser(self) -> 'LegacyStreamParser':
+        return LegacyStreamParser(self)
+
+    def normalize(self, chunks: Iterable[Union[bytes, str]]) -> Dict[str, Any]:
+        parser = self.parser()
+        for chunk in chunks:
+            parser.feed(chunk)
+        return parser.close()
+
+    @staticmethod
+    def _envelope(fields) -> Dict[str, Any]:
+        envelope = {}
+        data = {}
+        for tag, value in fields:
+            if tag in ENVELOPE_FIELDS:
+                envelope[tag] = value
+            else:
+                data[tag] = value
+        if data or envelope.get('status') != 'ERROR':
+            envelope['data'] = data
+        # Match the cloud key order: status, data, message, timestamp
+        return {key: envelope[key] for key in ('status', 'data', 'message', 'timestamp') if key in envelope}
+
+
+class LegacyStreamParser:
+    """
+    Incremental parse of one legacy response: feed() body chunks, close() for the envelope.
+
+    Finished elements are folded into plain Python values and detached at once,
+    so memory holds the output plus the currently open path, never a whole tree.
+    """
+
+    __slots__ = ('compiled', '_parser', '_open', '_children', '_result')
+
+    def __init__(self, compiled: CompiledNormalizer):
+        self.compiled = compiled
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._open = []
+        self._children = [] # per open element: list of (tag, value) for its finished children
+        self._result = None
+
+    def feed(self, chunk: Union[bytes, str]):
+        if chunk:
+            self._parser.feed(chunk)
+            self._handle(self._parser.read_events())
+
+    def close(self) -> Dict[str, Any]:
+        self._parser.close()
+        self._handle(self._parser.read_events())
+        if self._result is None:
+            raise ValueError(f"Empty legacy response for {self.compiled.endpoint}")
+        return self._result
+
+    def _handle(self, events):
+        open_elements = self._open
+        children = self._children
+        for event, element in events:
+            if event == 'start':
+                open_elements.append(element)
+                children.append([])
+                continue
+
+            own = children.pop()
+            open_elements.pop()
+            depth = len(open_elements)
+
+            if depth == 0:
+                self._result = self.compiled._envelope(own)
+                continue
+
+            if not own:
+                value = (element.text or '').strip()
+            elif all(tag == 'item' for tag, _ in own):
+                value = [item for _, item in own]
+            else:
+                value = dict(own)
+            if depth == 1:
+                value = self.compiled._top_level(element.tag, value)
+            children[-1].append((element.tag, value))
+
+            # Detach the finished element so the partial tree never grows
+            element.clear()
+            open_elements[-1].remove(element)
+
+
+class ResponseNormalizer:
+    """Per-endpoint compiled normalizers for legacy XML responses"""
+
+    def __init__(self, schemas: Dict[str, Dict[str, Any]] = None, enabled: bool = True):
+        """
+        Args:
+            schemas: Endpoint -> schema (see ENDPOINT_SCHEMAS); compiled here, once
+            enabled: When False legacy XML is passed through untouched
+        """
+        self.enabled = enabled
+        self._compiled = {
+            endpoint: CompiledNormalizer(endpoint, schema)
+            for endpoint, schema in (ENDPOINT_SCHEMAS if schemas is None else schemas).items()
+        }
+        # Endpoints without a schema still get the envelope + Python-repr handling
+        self._fallback = CompiledNormalizer('*', {})
+
+    def parser(self, endpoint: str) -> LegacyStreamParser:
+        return self._compiled.get(endpoint, self._fallback).parser()
+
+    def normalize(self, endpoint: str, chunks: Iterable[Union[bytes, str]]) -> Dict[str, Any]:
+        return self._compiled.get(endpoint, self._fallback).normalize(chunks)
+
+    def normalize_text(self, endpoint: str, xml_text: Union[bytes, str]) -> Dict[str, Any]:
+        return self.normalize(endpoint, (xml_text,))
+
+
+if __name__ == '__main__':
+    import time
+    import tracemalloc
+    from legacy_system import to_xml
+
+    def dom_normalize(xml_text):
+        # What the proxy would otherwise do: whole DOM, literal_eval, rename keys
+        root = ET.fromstring(xml_text)
+        envelope = {'data': {}}
+        for child in root:
+            if child.tag in ENVELOPE_FIELDS:
+                envelope[child.tag] = child.text
+            elif child.tag == 'parts':
+                envelope['data']['parts'] = [
+                    {LEGACY_FIELD_MAP.get(k, k): v for k, v in part.items()}
+                    for part in ast.literal_eval(child.text)
+                ]
+            else:
+                envelope['data'][child.tag] = child.text
+        return envelope
+
+    def measure(run, rounds):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            run()
+        elapsed = (time.perf_counter() - started) / rounds * 1000
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak
+
+    normalizer = ResponseNormalizer()
+    print("InventoryResponse normalization (16 KB chunks for the streaming parser)")
+    for count in (100, 1000, 10000):
+        parts = [{
+            'PART_NO': f"PART{i:05d}", 'PART_NAME': f"Part {i}", 'PART_DESC': 'Benchmark part',
+            'STOCK_QTY': i, 'PRICE': i * 1.5, 'SUPPLIER': 'BOSCH', 'STATUS': 'ACTIVE'
+        } for i in range(count)]
+        xml_text = to_xml({'status': 'SUCCESS', 'part_count': count, 'parts': parts,
+                           'timestamp': '2024-01-01T00:00:00'}, 'InventoryResponse')
+        body = xml_text.encode('utf-8')
+        chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+        assert normalizer.normalize('inventory/list_all', chunks)['data']['parts'][-1]['stock'] == count - 1
+
+        rounds = max(3, 5000 // count)
+        for name, run in (('dom', lambda: dom_normalize(xml_text)),
+                          ('streaming', lambda: normalizer.normalize('inventory/list_all', chunks))):
+            elapsed, peak = measure(run, rounds)
+            print(f"  {count:6d} parts ({len(body) / 1024:7.1f} KB) {name:9s}: "
+                  f"{elapsed:8.2f} ms/doc, peak {peak / 1024:8.1f} KB")
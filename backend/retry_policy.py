@@ -0,0 +1,219 @@
+# ============================================
+# FEATURE #22: Deadlines & Retry Budget
+# File: backend/retry_policy.py
+# Purpose: Carry the client's deadline into upstream timeouts and retry
+#          transient failures without amplifying an outage
+# ============================================
+
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+import httpx
+import requests
+
+from structured_log import get_logger
+
+log = get_logger()
+
+# Upstream statuses worth another attempt (the backend is overloaded or restarting)
+TRANSIENT_STATUSES = frozenset({502, 503, 504})
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the client's deadline leaves no time for (another) upstream call"""
+
+
+class Deadline:
+    """Absolute point in time a request must be answered by"""
+
+    __slots__ = ('budget_ms', 'expires_at')
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000
+
+    @classmethod
+    def parse(cls, header_value=None, body_value=None) -> Optional['Deadline']:
+        """Deadline from the X-Deadline-Ms header or a 'deadline_ms' body field (header wins)"""
+        value = header_value if header_value not in (None, '') else body_value
+        if value in (None, ''):
+            return None
+        try:
+            budget_ms = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid deadline: {value!r} (expected milliseconds)")
+        if budget_ms <= 0:
+            raise ValueError("deadline_ms must be > 0")
+        return cls(budget_ms)
+
+    def remaining(self) -> float:
+        """Seconds left (negative once expired)"""
+        return self.expires_at - time.monotonic()
+
+    def timeout(self, cap: float) -> float:
+        """Upstream timeout: what is left of the deadline, never more than `cap` seconds"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline of {self.budget_ms:.0f}ms exceeded")
+        return min(cap, remaining)
+
+
+def upstream_timeout(deadline: Optional[Deadline], cap: float) -> float:
+    return deadline.timeout(cap) if deadline is not None else cap
+
+
+def is_transient(error: Exception) -> bool:
+    # requests for the threaded router, httpx for the asyncio engine
+    if isinstance(error, (requests.HTTPError, httpx.HTTPStatusError)):
+        return error.response is not None and error.response.status_code in TRANSIENT_STATUSES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError))
+
+
+class RetryBudget:
+    """Token bucket: every request earns budget_percent/100 of a retry"""
+
+    def __init__(self, budget_percent: float = 10, max_tokens: float = 10):
+        self.budget_percent = budget_percent
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.budget_percent / 100)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class RetryPolicy:
+    """Retry idempotent upstream calls on transient errors with full-jitter exponential backoff"""
+
+    def __init__(self, enabled: bool = True, max_attempts: int = 3, base_delay_ms: float = 50,
+                 max_delay_ms: float = 1000, budget_percent: float = 10):
+        """
+        Args:
+            max_attempts: Total tries per call, including the first
+            base_delay_ms: Backoff before the first retry; doubles per attempt
+            max_delay_ms: Cap on a single backoff
+            budget_percent: Retries allowed as a percentage of calls, shared by all endpoints
+        """
+        self.enabled = enabled
+        self.max_attempts = max_attempts
+        self.base_delay_ms = base_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.budget = RetryBudget(budget_percent)
+
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            'calls': 0,
+            'retries': 0,
+            'retry_successes': 0,
+            'budget_exhausted': 0,
+            'deadline_skips': 0,
+            'gave_up': 0,
+        })
+
+    def configure(self, enabled: Optional[bool] = None, max_attempts: Optional[int] = None,
+                  budget_percent: Optional[float] = None):
+        if max_attempts is not None and max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1")
+        if budget_percent is not None and not 0 <= budget_percent <= 100:
+            raise ValueError("budget_percent must be between 0-100")
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if max_attempts is not None:
+            self.max_attempts = max_attempts
+        if budget_percent is not None:
+            self.budget.budget_percent = budget_percent
+
+    def _count(self, endpoint: str, field: str):
+        with self._lock:
+            self._stats[endpoint][field] += 1
+
+    def backoff_ms(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay_ms, self.base_delay_ms * 2 ** retry))
+
+    def call(self, endpoint: str, fn: Callable[[], Any], deadline: Optional[Deadline] = None):
+        """Run fn(), retrying transient failures while attempts, budget and deadline allow"""
+        if not self.enabled:
+            return fn()
+        self._count(endpoint, 'calls')
+        self.budget.deposit()
+
+        retry = 0
+        while True:
+            try:
+                result = fn()
+                if retry:
+                    self._count(endpoint, 'retry_successes')
+                return result
+            except Exception as e:
+                delay_ms = self._next_delay(endpoint, e, retry, deadline)
+                if delay_ms is None:
+                    raise
+                retry += 1
+                time.sleep(delay_ms / 1000)
+
+    async def call_async(self, endpoint: str, fn: Callable[[], Awaitable], deadline: Optional[Deadline] = None):
+        """call() for the asyncio engine: awaits fn() and sleeps on the event loop between attempts"""
+        if not self.enabled:
+            return await fn()
+        self._count(endpoint, 'calls')
+        self.budget.deposit()
+
+        retry = 0
+        while True:
+            try:
+                result = await fn()
+                if retry:
+                    self._count(endpoint, 'retry_successes')
+                return result
+            except Exception as e:
+                delay_ms = self._next_delay(endpoint, e, retry, deadline)
+                if delay_ms is None:
+                    raise
+                retry += 1
+                await asyncio.sleep(delay_ms / 1000)
+
+    def _next_delay(self, endpoint: str, error: Exception, retry: int,
+                    deadline: Optional[Deadline]) -> Optional[float]:
+        # Backoff before the next attempt, or None when the error should be raised
+        if not is_transient(error):
+            return None
+        if retry + 1 >= self.max_attempts:
+            self._count(endpoint, 'gave_up')
+            return None
+        delay_ms = self.backoff_ms(retry)
+        if deadline is not None and deadline.remaining() * 1000 <= delay_ms:
+            self._count(endpoint, 'deadline_skips')
+            return None
+        if not self.budget.try_spend():
+            self._count(endpoint, 'budget_exhausted')
+            return None
+        self._count(endpoint, 'retries')
+        log.warning('retry', f"Retry {retry + 1} in {delay_ms:.0f}ms", endpoint=endpoint, error=str(error))
+        return delay_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {endpoint: dict(counts) for endpoint, counts in sorted(self._stats.items())}
+        return {
+            'enabled': self.enabled,
+            'max_attempts': self.max_attempts,
+            'budget_percent': self.budget.budget_percent,
+            'budget_tokens': round(self.budget.tokens, 2),
+            'retries': sum(counts['retries'] for counts in endpoints.values()),
+            'budget_exhausted': sum(counts['budget_exhausted'] for counts in endpoints.values()),
+            'endpoints': endpoints,
+            'timestamp': datetime.now().isoformat()
+        }
@@ -0,0 +1,281 @@
+# ============================================
+# FEATURE #30: Time-Windowed Rolling Metrics
+# File: backend/rolling_window.py
+# Purpose: Request counts, errors and latency per source / endpoint over the
+#          last minute, 5 minutes, hour... in a fixed number of time buckets
+# ============================================
+
+import math
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from latency_sketch import LatencySketch, bucket_index, MAX_MICROS
+
+# Named windows offered to the dashboard; any '<n>s', '<n>m' or '<n>h' up to 24h also works
+WINDOWS = ('1m', '5m', '15m', '1h', '24h')
+_WINDOW_PATTERN = re.compile(r'^(\d+)([smh])$')
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600}
+
+# (bucket width in seconds, number of buckets)
+SECONDS = (1, 60)
+MINUTES = (60, 60)
+HOURS = (3600, 24)
+
+
+def parse_window(window: str) -> int:
+    """'5m' -> 300 seconds"""
+    match = _WINDOW_PATTERN.match(window or '')
+    if match is None:
+        raise ValueError(f"Invalid window {window!r} (expected e.g. 30s, 5m, 1h)")
+    seconds = int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    if not 1 <= seconds <= HOURS[0] * HOURS[1]:
+        raise ValueError("window must be between 1s and 24h")
+    return seconds
+
+
+class WindowStats:
+    """Counts and a sparse latency histogram for one (source, endpoint) in one bucket"""
+
+    __slots__ = ('count', 'errors', 'total', 'min', 'max', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.histogram: Dict[int, int] = {} # latency bucket index -> count
+
+    def record(self, response_time: float, error: bool):
+        response_time = max(0.0, response_time)
+        index = bucket_index(min(int(response_time * 1000), MAX_MICROS))
+        self.histogram[index] = self.histogram.get(index, 0) + 1
+        self.count += 1
+        self.total += response_time
+        if error:
+            self.errors += 1
+        if response_time < self.min:
+            self.min = response_time
+        if response_time > self.max:
+            self.max = response_time
+
+    def merge(self, other: 'WindowStats'):
+        histogram = self.histogram
+        for index, n in other.histogram.items():
+            histogram[index] = histogram.get(index, 0) + n
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def scaled(self, fraction: float) -> 'WindowStats':
+        """The share of these requests that fell in `fraction` of the bucket's period, assuming an even spread"""
+        part = WindowStats()
+        part.count = round(self.count * fraction)
+        if not part.count:
+            return part
+        # Largest remainder, so the histogram still adds up to count
+        shares = {index: n * fraction for index, n in self.histogram.items()}
+        histogram = {index: int(share) for index, share in shares.items()}
+        missing = part.count - sum(histogram.values())
+        for index in sorted(shares, key=lambda index: shares[index] - histogram[index], reverse=True)[:missing]:
+            histogram[index] += 1
+        part.histogram = {index: n for index, n in histogram.items() if n}
+        part.errors = round(self.errors * fraction)
+        part.total = self.total * part.count / self.count
+        part.min = self.min
+        part.max = self.max
+        return part
+
+    def summary(self, seconds: int) -> Dict[str, Any]:
+        sketch = LatencySketch.from_counts(self.histogram, self.count, self.total, self.min, self.max)
+        return {
+            **sketch.summary(),
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.count * 100, 2) if self.count else 0,
+            'requests_per_second': round(self.count / seconds, 3)
+        }
+
+
+class _Bucket:
+    __slots__ = ('epoch', 'stats')
+
+    def __init__(self):
+        self.epoch = -1 # start of the period this bucket holds, in units of its width
+        self.stats: Dict[Tuple[str, str], WindowStats] = {}
+
+    def add(self, other: '_Bucket', fraction: float = 1.0):
+        for key, stats in other.stats.items():
+            mine = self.stats.get(key)
+            if mine is None:
+                mine = self.stats[key] = WindowStats()
+            mine.merge(stats if fraction == 1.0 else stats.scaled(fraction))
+
+
+class _Ring:
+    """Fixed number of buckets of one width; a bucket is reused once its period falls out of range"""
+
+    def __init__(self, width: int, size: int, spare: int = 0):
+        self.width = width
+        self.span = width * size # longest window this ring answers
+        self.size = size + spare
+        self.buckets = [_Bucket() for _ in range(self.size)]
+
+    def bucket(self, epoch: int) -> _Bucket:
+        bucket = self.buckets[epoch % self.size]
+        if bucket.epoch != epoch:
+            bucket.epoch = epoch
+            bucket.stats = {}
+        return bucket
+
+    def get(self, epoch: int) -> Optional[_Bucket]:
+        bucket = self.buckets[epoch % self.size]
+        return bucket if bucket.epoch == epoch else None
+
+    def since(self, first_epoch: int):
+        return [bucket for bucket in self.buckets if bucket.epoch >= first_epoch]
+
+    def clear(self):
+        for bucket in self.buckets:
+            bucket.epoch = -1
+            bucket.stats = {}
+
+
+class RollingMetrics:
+    """
+    Requests land in the current one-second bucket. When a second is over,
+    its bucket is added into the bucket for its minute and for its hour, so
+    the rollup costs one merge per busy second, not per request.
+
+    A query reads the finest ring that covers the window: seconds up to a
+    minute, minutes up to an hour, hours up to a day; of the oldest minute or
+    hour, only the part still inside the window is counted (prorated, as if
+    its requests were spread evenly). Memory depends on the number of
+    buckets and endpoints only, never on the request rate.
+    """
+
+    OTHER = '(other)'
+
+    def __init__(self, max_endpoints: int = 64, clock=time.time):
+        """
+        Args:
+            max_endpoints: Distinct endpoints tracked; the rest share '(other)'
+            clock: Seconds since the epoch (tests pass a fake one)
+        """
+        self.max_endpoints = max_endpoints
+        self._clock = clock
+        self._seconds = _Ring(*SECONDS)
+        # One spare bucket each: a window's oldest minute / hour is usually only partly inside it
+        self._minutes = _Ring(*MINUTES, spare=1)
+        self._hours = _Ring(*HOURS, spare=1)
+        self._current: Optional[_Bucket] = None # the second being filled, not rolled up yet
+        self._endpoints = set()
+        self._lock = threading.Lock()
+
+    def record(self, source: str, endpoint: str, response_time: float, error=None):
+        with self._lock:
+            bucket = self._advance(int(self._clock()))
+            if endpoint not in self._endpoints:
+                if len(self._endpoints) >= self.max_endpoints:
+                    endpoint = self.OTHER
+                self._endpoints.add(endpoint)
+            stats = bucket.stats.get((source, endpoint))
+            if stats is None:
+                stats = bucket.stats[(source, endpoint)] = WindowStats()
+            stats.record(response_time, bool(error))
+
+    def _advance(self, now: int) -> _Bucket:
+        """Current second's bucket, rolling the previous one up first (caller holds the lock)"""
+        current = self._current
+        if current is not None and current.epoch == now:
+            return current
+        if current is not None and current.stats:
+            self._minutes.bucket(current.epoch // self._minutes.width).add(current)
+            self._hours.bucket(current.epoch // self._hours.width).add(current)
+        self._current = self._seconds.bucket(now)
+        return self._current
+
+    def reset(self):
+        with self._lock:
+            for ring in (self._seconds, self._minutes, self._hours):
+                ring.clear()
+            self._current = None
+            self._endpoints = set()
+
+    def query(self, window: str) -> Dict[str, Any]:
+        seconds = parse_window(window)
+        with self._lock:
+            now = int(self._clock())
+            current = self._advance(now)
+            first = now - seconds + 1
+            merged = _Bucket()
+            if seconds <= self._seconds.span:
+                ring = self._seconds
+                for bucket in ring.since(first):
+                    merged.add(bucket)
+            else:
+                ring = self._minutes if seconds <= self._minutes.span else self._hours
+                # Whole periods from the first one starting inside the window; finished seconds are
+                # already in their minute / hour, the one being filled is not
+                first_period = -(-first // ring.width)
+                for bucket in ring.since(first_period) + [current]:
+                    merged.add(bucket)
+                # The older, partial period: its share of the seconds still inside the window
+                head = first_period * ring.width - first
+                oldest = ring.get(first_period - 1) if head else None
+                if oldest is not None:
+                    merged.add(oldest, head / ring.width)
+
+        sources: Dict[str, WindowStats] = {}
+        endpoints: Dict[str, Dict[str, WindowStats]] = {}
+        for (source, endpoint), stats in merged.stats.items():
+            total = sources.get(source)
+            if total is None:
+                total = sources[source] = WindowStats()
+                endpoints[source] = {}
+            total.merge(stats)
+            endpoints[source][endpoint] = stats
+        return {
+            'window': window,
+            'seconds': seconds,
+            'resolution_seconds': ring.width,
+            'sources': {source: stats.summary(seconds) for source, stats in sorted(sources.items())},
+            'endpoints': {source: {endpoint: stats.summary(seconds) for endpoint, stats in sorted(by_endpoint.items())}
+                          for source, by_endpoint in sorted(endpoints.items())},
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+if __name__ == '__main__':
+    # Self-check with a fake clock, then the cost of recording at a high request rate
+    import random
+
+    clock = [1_700_000_000.0]
+    rolling = RollingMetrics(clock=lambda: clock[0])
+    for second in range(7200): # two hours, one cloud request per second, an error every 10th
+        rolling.record('cloud', 'inventory/get_part', 50.0 + second % 10, error='boom' if second % 10 == 0 else None)
+        clock[0] += 1
+    clock[0] -= 1 # query within the last second that had traffic
+    for window, expected in (('1m', 60), ('90s', 90), ('5m', 300), ('1h', 3600), ('24h', 7200)):
+        result = rolling.query(window)
+        cloud = result['sources']['cloud']
+        print(f"{window:>4}: {cloud['count']:5d} requests  {cloud['errors']:4d} errors  "
+              f"p99 {cloud['p99']}ms  (resolution {result['resolution_seconds']}s)")
+        if expected is not None:
+            assert cloud['count'] == expected, (window, cloud['count'])
+
+    N = 200000
+    rolling = RollingMetrics()
+    endpoints = ['inventory/get_part', 'orders/create', 'dealers/get']
+    started = time.perf_counter()
+    for i in range(N):
+        rolling.record('cloud' if i % 2 else 'legacy', endpoints[i % 3], random.uniform(10, 3000))
+    elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    rolling.query('5m')
+    print(f"record: {elapsed / N * 1e6:.2f}us per request ({N / elapsed:,.0f}/s)  "
+          f"query 5m: {(time.perf_counter() - started) * 1000:.1f}ms")
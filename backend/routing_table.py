@@ -0,0 +1,345 @@
+# ============================================
+# FEATURE #13: Per-Endpoint Routing Table
+# File: backend/routing_table.py
+# Purpose: Compile the saved migration plan into an immutable lookup table,
+#          and keep every published version for constant-time rollback
+# ============================================
+
+import json
+import os
+import threading
+from collections import namedtuple, deque
+from types import MappingProxyType
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+from structured_log import get_logger
+
+log = get_logger()
+
+# endpoint -> (legacy path, cloud path)
+ENDPOINT_PATHS = {
+    "inventory/get_part": ("inventory/get_part", "api/v1/parts/get"),
+    "dealer/get_details": ("dealer/get_details", "api/v1/dealers/get"),
+    "inventory/list_all": ("inventory/list_all", "api/v1/inventory/list"),
+    "orders/create": ("orders/create", "api/v1/orders/create"),
+}
+
+# Read-only endpoints that are safe to send twice (mirror, hedge, retry, coalesce)
+IDEMPOTENT_ENDPOINTS = frozenset({
+    "inventory/get_part",
+    "dealer/get_details",
+    "inventory/list_all",
+})
+
+# Plan subsystems and the endpoints they own
+SUBSYSTEM_ENDPOINTS = {
+    "inventory": ("inventory/get_part", "inventory/list_all"),
+    "dealer": ("dealer/get_details",),
+    "orders": ("orders/create",),
+}
+
+# percentage is None when the endpoint follows the global migration percentage; timeout is in seconds
+Route = namedtuple('Route', ['endpoint', 'legacy_url', 'cloud_url', 'percentage', 'timeout'])
+
+# Parts of a routing configuration; a version is compiled from one of these
+SPEC_FIELDS = ('legacy_url', 'cloud_url', 'plan', 'timeouts')
+
+
+def _percentage(value, name: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Migration percentage for '{name}' must be a number")
+    if not 0 <= value <= 100:
+        raise ValueError(f"Migration percentage for '{name}' must be between 0-100")
+    return value
+
+
+def _timeout(value, name: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"Timeout for '{name}' must be a number of seconds > 0")
+    return float(value)
+
+
+def _url(value, name: str) -> str:
+    if not isinstance(value, str) or not value.startswith(('http://', 'https://')):
+        raise ValueError(f"{name} must be an http(s) URL")
+    return value.rstrip('/')
+
+
+class RoutingTable:
+    """Immutable endpoint -> Route table; replace the whole table to change it"""
+
+    def __init__(self, legacy_url: str, cloud_url: str, routes: Dict[str, Route], version: int = 0,
+                 default_timeout: float = 10.0, spec: Optional[Dict[str, Any]] = None,
+                 source: str = 'startup', note: Optional[str] = None):
+        self.legacy_url = legacy_url
+        self.cloud_url = cloud_url
+        self.routes = MappingProxyType(dict(routes))
+        self.version = version
+        self.default_timeout = default_timeout
+        # What this version was compiled from, so it can be shared, journaled and re-published
+        self.spec = MappingProxyType(dict(spec or {}))
+        self.source = source
+        self.note = note
+        self.compiled_at = datetime.now().isoformat()
+
+    def lookup(self, endpoint: str) -> Route:
+        """One dict lookup on the hot path; unknown endpoints get a default route"""
+        route = self.routes.get(endpoint)
+        if route is None:
+            route = Route(endpoint, f"{self.legacy_url}/{endpoint}", f"{self.cloud_url}/api/v1/{endpoint}",
+                          None, self.default_timeout)
+        return route
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'source': self.source,
+            'note': self.note,
+            'compiled_at': self.compiled_at
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            'spec': dict(self.spec),
+            'routes': {name: route._asdict() for name, route in self.routes.items()}
+        }
+
+
+def compile_routing_table(legacy_url: str, cloud_url: str, plan: Optional[Dict[str, Any]] = None,
+                          version: int = 0, timeouts: Optional[Dict[str, Any]] = None,
+                          default_timeout: float = 10.0, source: str = 'startup',
+                          note: Optional[str] = None) -> RoutingTable:
+    """
+    Build a RoutingTable from a migration plan.
+
+    Plan format (both sections optional):
+        {"subsystems": {"inventory": 80, ...}, "endpoints": {"orders/create": 10, ...}}
+
+    Endpoint values win over subsystem values; anything unset follows the
+    global migration percentage. Unknown subsystems (e.g. the planning
+    sliders' 'engine') are ignored.
+
+    Timeouts (seconds, both optional): {"default": 10, "endpoints": {"orders/create": 5}}
+    """
+    legacy_url = _url(legacy_url, 'legacy_url')
+    cloud_url = _url(cloud_url, 'cloud_url')
+    plan = plan or {}
+    timeouts = timeouts or {}
+    default_timeout = _timeout(timeouts.get('default', default_timeout), 'default')
+    endpoint_timeouts = {
+        endpoint: _timeout(value, endpoint) for endpoint, value in (timeouts.get('endpoints') or {}).items()
+    }
+    percentages = {}
+
+    for subsystem, value in (plan.get('subsystems') or {}).items():
+        for endpoint in SUBSYSTEM_ENDPOINTS.get(subsystem, ()):
+            percentages[endpoint] = _percentage(value, subsystem)
+
+    for endpoint, value in (plan.get('endpoints') or {}).items():
+        percentages[endpoint] = _percentage(value, endpoint)
+
+    routes = {}
+    for endpoint in set(ENDPOINT_PATHS) | set(percentages) | set(endpoint_timeouts):
+        legacy_path, cloud_path = ENDPOINT_PATHS.get(endpoint, (endpoint, f"api/v1/{endpoint}"))
+        routes[endpoint] = Route(
+            endpoint,
+            f"{legacy_url}/{legacy_path}",
+            f"{cloud_url}/{cloud_path}",
+            percentages.get(endpoint),
+            endpoint_timeouts.get(endpoint, default_timeout)
+        )
+
+    spec = {
+        'legacy_url': legacy_url,
+        'cloud_url': cloud_url,
+        'plan': plan,
+        'timeouts': {'default': default_timeout, 'endpoints': endpoint_timeouts}
+    }
+    return RoutingTable(legacy_url, cloud_url, routes, version, default_timeout, spec, source, note)
+
+
+def record_version(doc: Optional[Dict[str, Any]], version: int, spec: Optional[Dict[str, Any]],
+                   keep: int = 50) -> Dict[str, Any]:
+    """Fold a publish/activate into a {'active', 'versions'} record (shared memory, state log)"""
+    doc = {'active': None, 'versions': {}} if doc is None else doc
+    versions = dict(doc['versions'])
+    if spec is not None:
+        versions[str(version)] = dict(spec)
+    for old in sorted(versions, key=int)[:max(0, len(versions) - keep)]:
+        if int(old) != version:
+            del versions[old]
+    return {'active': version, 'versions': versions}
+
+
+class RoutingConfigStore:
+    """
+    Every published routing configuration, by version.
+
+    Request threads read `active` - a plain attribute, no lock - and get an
+    immutable RoutingTable. Publishing compiles a new table off to the side
+    and swaps it in with one assignment; rollback re-points `active` at a table
+    that is already compiled, so it costs the same whatever the version.
+    """
+
+    def __init__(self, initial: RoutingTable, max_versions: int = 50,
+                 next_version: Optional[Callable[[], int]] = None):
+        """
+        Args:
+            initial: Version the proxy starts with
+            max_versions: Versions kept for rollback (the active one is never dropped)
+            next_version: Allocates version numbers; pass a shared counter when several
+                          workers publish, so a number means the same config everywhere
+        """
+        self.active = initial
+        self.max_versions = max_versions
+        self._next_version = next_version
+        self._versions: Dict[int, RoutingTable] = {initial.version: initial}
+        self._latest = initial.version
+        self._lock = threading.Lock() # serializes writers only
+        self.history = deque(maxlen=100)
+        # Called with (table, action, source) after every change, e.g. to share or journal it
+        self.listeners: List[Callable[[RoutingTable, str, str], None]] = []
+
+    def publish(self, changes: Dict[str, Any], source: str = 'api', note: Optional[str] = None,
+                version: Optional[int] = None, activate: bool = True,
+                if_changed: bool = False) -> RoutingTable:
+        """Compile the active spec with `changes` applied into a new version (and make it active)"""
+        unknown = set(changes) - set(SPEC_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown routing config fields: {', '.join(sorted(unknown))}")
+        with self._lock:
+            spec = {**self.active.spec, **{key: value for key, value in changes.items() if value is not None}}
+            if if_changed:
+                # Compile once to normalise (URLs, timeouts) before comparing with what is running
+                unchanged = compile_routing_table(spec['legacy_url'], spec['cloud_url'], spec.get('plan'),
+                                                  timeouts=spec.get('timeouts'))
+                if unchanged.spec == self.active.spec:
+                    return self.active
+            if version is None:
+                version = self._next_version() if self._next_version is not None else self._latest + 1
+            table = compile_routing_table(spec['legacy_url'], spec['cloud_url'], spec.get('plan'), version,
+                                          timeouts=spec.get('timeouts'), source=source, note=note)
+            self._versions[version] = table
+            self._latest = max(self._latest, version)
+            previous = self.active.version
+            if activate:
+                self.active = table
+            while len(self._versions) > self.max_versions:
+                oldest = min(self._versions)
+                if oldest == self.active.version:
+                    break
+                del self._versions[oldest]
+            self._record('publish' if activate else 'load', previous, table, source)
+        self._notify(table, 'publish' if activate else 'load', source)
+        return table
+
+    def activate(self, version: int, source: str = 'api') -> RoutingTable:
+        """Make an already compiled version active again - this is the rollback"""
+        with self._lock:
+            table = self._versions.get(version)
+            if table is None:
+                raise ValueError(f"Routing config version {version} is not available")
+            previous = self.active.version
+            self.active = table
+            self._record('activate', previous, table, source)
+        self._notify(table, 'activate', source)
+        return table
+
+    def get(self, version: int) -> Optional[RoutingTable]:
+        return self._versions.get(version)
+
+    def _record(self, action: str, previous: int, table: RoutingTable, source: str):
+        # Caller holds the lock
+        self.history.append({
+            'action': action,
+            'from_version': previous,
+            'to_version': table.version,
+            'source': source,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def _notify(self, table: RoutingTable, action: str, source: str):
+        for listener in self.listeners:
+            try:
+                listener(table, action, source)
+            except Exception as e:
+                log.error('routing', 'Routing config listener failed', error=str(e))
+
+    def get_stats(self) -> Dict[str, Any]:
+        versions = sorted(self._versions.values(), key=lambda table: table.version)
+        return {
+            'active': self.active.to_dict(),
+            'versions': [table.summary() for table in versions],
+            'history': list(self.history)[-20:],
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+class RoutingConfigWatcher:
+    """Publish a new version whenever the routing config file changes on disk"""
+
+    def __init__(self, path: str, store: RoutingConfigStore, interval: float = 2.0):
+        """
+        Args:
+            path: JSON file with any of the SPEC_FIELDS
+            interval: Seconds between mtime checks
+        """
+        self.path = path
+        self.store = store
+        self.interval = interval
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='routing-config-watcher', daemon=True)
+
+    def start(self):
+        self.check()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> Optional[RoutingTable]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return None
+        self._signature = signature
+        try:
+            with open(self.path) as f:
+                changes = json.load(f)
+            previous = self.store.active
+            table = self.store.publish(changes, source='file', note=os.path.basename(self.path), if_changed=True)
+        except Exception as e:
+            # A bad edit leaves the running version in place
+            self.errors += 1
+            self.last_error = str(e)
+            log.error('routing', 'Routing config file rejected', path=self.path, error=str(e))
+            return None
+        if table is previous:
+            return None
+        self.reloads += 1
+        log.info('routing', f"Routing config v{table.version} loaded from file", path=self.path)
+        return table
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'interval': self.interval,
+            'reloads': self.reloads,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'timestamp': datetime.now().isoformat()
+        }
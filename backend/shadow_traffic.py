@@ -0,0 +1,263 @@
+# ============================================
+# FEATURE #14: Shadow Traffic (Dark Launch)
+# File: backend/shadow_traffic.py
+# Purpose: Mirror requests to the other backend and compare the answers
+# ============================================
+
+import ast
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Union
+
+from circuit_breaker import CircuitOpenError
+from concurrency_limiter import ConcurrencyLimitExceeded
+from response_normalizer import LEGACY_FIELD_MAP
+from structured_log import get_logger
+
+log = get_logger()
+
+# Fields that legitimately differ between two calls
+VOLATILE_FIELDS = {'timestamp', 'order_id', 'created_at'}
+
+MAX_DIFFERENCES = 10
+
+
+# ============================================
+# CANONICAL RESPONSE COMPARISON
+# ============================================
+
+def _scalar(value) -> str:
+    """Canonical text for a leaf value: numbers as floats, everything else lowercased"""
+    if value is None:
+        return ''
+    text = str(value).strip()
+    try:
+        return repr(float(text))
+    except ValueError:
+        return text.lower()
+
+
+def _canonical_legacy_value(value):
+    if isinstance(value, dict):
+        return {
+            LEGACY_FIELD_MAP.get(key, key): _canonical_legacy_value(item)
+            for key, item in value.items()
+            if key not in VOLATILE_FIELDS
+        }
+    if isinstance(value, list):
+        return [_canonical_legacy_value(item) for item in value]
+    return _scalar(value)
+
+
+def _canonical_xml(element):
+    children = list(element)
+    if not children:
+        text = (element.text or '').strip()
+        # legacy to_xml writes nested lists as their Python repr
+        if text[:1] in ('[', '{'):
+            try:
+                return _canonical_legacy_value(ast.literal_eval(text))
+            except (ValueError, SyntaxError):
+                pass
+        return _scalar(text)
+    if all(child.tag == 'item' for child in children):
+        return [_canonical_xml(child) for child in children]
+    return {
+        LEGACY_FIELD_MAP.get(child.tag, child.tag): _canonical_xml(child)
+        for child in children
+        if child.tag not in VOLATILE_FIELDS
+    }
+
+
+def _canonical_json(value):
+    if isinstance(value, dict):
+        return {key: _canonical_json(item) for key, item in value.items() if key not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_canonical_json(item) for item in value]
+    return _scalar(value)
+
+
+def canonical_legacy(xml_text: str) -> Dict[str, Any]:
+    """Legacy XML envelope -> canonical dict in cloud field names"""
+    return _canonical_xml(ET.fromstring(xml_text))
+
+
+def canonical_cloud(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Cloud JSON envelope -> canonical dict, with the 'data' wrapper flattened"""
+    flattened = {key: value for key, value in payload.items() if key != 'data'}
+    flattened.update(payload.get('data') or {})
+    return _canonical_json(flattened)
+
+
+def _diff(legacy, cloud, path: str, differences: List[str]):
+    if len(differences) >= MAX_DIFFERENCES:
+        return
+    if isinstance(legacy, dict) and isinstance(cloud, dict):
+        for key in sorted(set(legacy) | set(cloud)):
+            _diff(legacy.get(key), cloud.get(key), f"{path}.{key}" if path else key, differences)
+    elif isinstance(legacy, list) and isinstance(cloud, list):
+        if len(legacy) != len(cloud):
+            differences.append(f"{path}: {len(legacy)} items (legacy) vs {len(cloud)} items (cloud)")
+            return
+        for index, (left, right) in enumerate(zip(legacy, cloud)):
+            _diff(left, right, f"{path}[{index}]", differences)
+    elif legacy != cloud:
+        differences.append(f"{path}: {legacy!r} (legacy) vs {cloud!r} (cloud)")
+
+
+def compare_responses(legacy_response: Union[str, Dict[str, Any]], cloud_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Response-equivalence verdict between a legacy answer (raw XML or normalized) and a cloud one"""
+    differences: List[str] = []
+    if isinstance(legacy_response, dict):
+        legacy = canonical_cloud(legacy_response) # already normalized to the cloud schema
+    else:
+        legacy = canonical_legacy(legacy_response)
+    _diff(legacy, canonical_cloud(cloud_payload), '', differences)
+    return {
+        'verdict': 'match' if not differences else 'mismatch',
+        'differences': differences
+    }
+
+
+# ============================================
+# MIRROR
+# ============================================
+
+class ShadowMirror:
+    """Send a sampled copy of each request to the other backend on a bounded worker pool"""
+
+    def __init__(self, router, enabled: bool = False, sample_rate: float = 0.1,
+                 max_queue: int = 32, workers: int = 2, endpoints=None):
+        """
+        Args:
+            router: StranglerRouter whose guarded (breaker + limiter) upstream calls are reused
+            sample_rate: Fraction of eligible requests to mirror (0-1)
+            max_queue: Max mirrored calls queued or running; extra ones are dropped
+            workers: Background threads sending mirrored calls
+            endpoints: Endpoints allowed to be mirrored (reads only by default)
+        """
+        self.router = router
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.endpoints = frozenset(endpoints or ())
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shadow')
+
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.mirrored = 0
+        self.matches = 0
+        self.mismatches = 0
+        self.errors = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.results = deque(maxlen=50)
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                  max_queue: Optional[int] = None):
+        if sample_rate is not None and not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0-1")
+        if max_queue is not None and max_queue < 0:
+            raise ValueError("max_queue must be >= 0")
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if max_queue is not None:
+            self.max_queue = max_queue
+
+    def mirror(self, route, method: str, data, primary_source: str, primary_response,
+               primary_time: float, request_id: int) -> bool:
+        """Called on the hot path: sample, enqueue and return immediately"""
+        if not self.enabled or route.endpoint not in self.endpoints:
+            return False
+        if primary_source not in ('legacy', 'cloud'):
+            return False # cache hits have nothing to compare against
+        if random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.dropped += 1
+                return False
+            self.pending += 1
+        self.executor.submit(self._run, route, method, data, primary_source,
+                             primary_response, primary_time, request_id)
+        return True
+
+    def _run(self, route, method, data, primary_source, primary_response, primary_time, request_id):
+        shadow_source = 'legacy' if primary_source == 'cloud' else 'cloud'
+        start = time.time()
+        try:
+            # Same breaker and concurrency limit as real traffic, so mirroring can't pile onto a struggling backend
+            shadow_response = self.router._guarded_call(shadow_source, route, method, data)
+            shadow_time = (time.time() - start) * 1000
+
+            if primary_source == 'legacy':
+                legacy_time, cloud_time = primary_time, shadow_time
+                comparison = compare_responses(primary_response, shadow_response)
+            else:
+                legacy_time, cloud_time = shadow_time, primary_time
+                comparison = compare_responses(shadow_response, primary_response)
+        except (CircuitOpenError, ConcurrencyLimitExceeded) as e:
+            # Never sent: nothing to compare
+            with self._lock:
+                self.skipped += 1
+            log.info('shadow', 'Shadow call skipped', endpoint=route.endpoint, target=shadow_source, reason=str(e))
+            return
+        except Exception as e:
+            shadow_time = (time.time() - start) * 1000
+            legacy_time = primary_time if primary_source == 'legacy' else shadow_time
+            cloud_time = primary_time if primary_source == 'cloud' else shadow_time
+            comparison = {'verdict': 'error', 'differences': [str(e)]}
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+        with self._lock:
+            self.mirrored += 1
+            if comparison['verdict'] == 'match':
+                self.matches += 1
+            elif comparison['verdict'] == 'mismatch':
+                self.mismatches += 1
+            else:
+                self.errors += 1
+
+        result = {
+            'request_id': request_id,
+            'endpoint': route.endpoint,
+            'primary_source': primary_source,
+            'shadow_source': shadow_source,
+            'legacy_time': round(legacy_time, 2),
+            'cloud_time': round(cloud_time, 2),
+            'verdict': comparison['verdict'],
+            'differences': comparison['differences'],
+            'timestamp': datetime.now().isoformat()
+        }
+        self.results.append(result)
+        self.router.metrics.record_shadow(request_id, legacy_time, cloud_time, comparison)
+        log.info('shadow', f"Shadow comparison: {comparison['verdict']}", endpoint=route.endpoint,
+                 legacy_time=round(legacy_time), cloud_time=round(cloud_time))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            compared = self.matches + self.mismatches
+            return {
+                'enabled': self.enabled,
+                'sample_rate': self.sample_rate,
+                'max_queue': self.max_queue,
+                'endpoints': sorted(self.endpoints),
+                'pending': self.pending,
+                'mirrored': self.mirrored,
+                'matches': self.matches,
+                'mismatches': self.mismatches,
+                'errors': self.errors,
+                'dropped': self.dropped,
+                'skipped': self.skipped,
+                'match_rate': round(self.matches / compared * 100, 1) if compared else None,
+                'recent_results': list(self.results)[-10:]
+            }
@@ -0,0 +1,411 @@
+# ============================================
+# FEATURE #26: Shared-Memory State
+# File: backend/shared_state.py
+# Purpose: One mmap'd file every gunicorn worker maps, so N workers share
+#          counters, the request history and small JSON documents
+# ============================================
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+MAGIC = b'AMSTATE2'
+
+# Header: magic, owner (gunicorn master pid), capacity, slot size, document size
+_HEADER = struct.Struct('<8sqIII')
+HEADER_SIZE = 4096
+
+# Fixed 8-byte fields after the header; 'd' gauges, 'q' counters
+FIELDS = {
+    'total_requests': 'q',
+    'errors': 'q',
+    'ramp_generation': 'q',
+    'routing_version': 'q',
+    'migration_percentage': 'd',
+}
+_FIELD_OFFSETS = {name: _HEADER.size + 8 * i for i, name in enumerate(FIELDS)}
+
+# Per-source count and latency sum of the records in the ring, kept as they are written and
+# overwritten: [name 16s][count q][latency sum q], latency in units of 2**-LATENCY_BITS ms
+SOURCE_SLOTS = 16
+LATENCY_BITS = 20
+_SOURCE = struct.Struct('<16sqq')
+_SOURCES_OFFSET = 1024
+
+# Named JSON documents, each in its own fixed region: [version u64][length u32][bytes]
+DOCUMENTS = ('migration_plan', 'routing_config', 'rollback_states', 'ramp', 'auto_scaler', 'compliance',
+             'latency')
+_DOC_HEADER = struct.Struct('<QI')
+
+# Ring slot: [write seq u64][record id i64][length u32][source slot i8][latency q][bytes]
+_SLOT_HEADER = struct.Struct('<QqIbq')
+
+
+class _FileLock:
+    """Thread lock + flock(); flock alone does not exclude threads of the same process"""
+
+    __slots__ = ('lock', 'fd')
+
+    def __init__(self, lock, fd):
+        self.lock = lock
+        self.fd = fd
+
+    def __enter__(self):
+        self.lock.acquire()
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+
+class SharedState:
+    """
+    Counters, a fixed-size record ring and versioned JSON documents in one shared file.
+
+    Writers hold a _FileLock. Counters are single aligned 8-byte words,
+    so reading them needs no lock.
+    """
+
+    def __init__(self, path: str, capacity: int = 128, slot_size: int = 16 * 1024,
+                 doc_size: int = 256 * 1024, owner: Optional[int] = None):
+        """
+        Args:
+            path: Backing file; /dev/shm keeps it in RAM
+            capacity: Records kept in the ring (newest overwrite oldest)
+            slot_size: Bytes per ring slot, header included
+            doc_size: Bytes per named document, header included
+            owner: Process that owns this generation of state; defaults to our parent,
+                   i.e. the gunicorn master, so a restarted server starts clean
+        """
+        self.path = path
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.doc_size = doc_size
+        self.owner = os.getppid() if owner is None else owner
+        self._docs_offset = HEADER_SIZE
+        self._ring_offset = self._docs_offset + doc_size * len(DOCUMENTS)
+        self.size = self._ring_offset + slot_size * capacity
+
+        self._lock = threading.RLock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            self.created = self._initialise()
+        self._map = mmap.mmap(self._fd, self.size)
+        # Decoded records / documents, reused until their slot or version changes
+        self._record_cache: Dict[int, Tuple[int, Any]] = {}
+        self._doc_cache: Dict[str, Tuple[int, Any]] = {}
+
+    def _initialise(self) -> bool:
+        """Lay out a fresh file unless one with our layout and owner already exists"""
+        header = os.pread(self._fd, _HEADER.size, 0)
+        if len(header) == _HEADER.size and os.fstat(self._fd).st_size == self.size:
+            if _HEADER.unpack(header) == (MAGIC, self.owner, self.capacity, self.slot_size, self.doc_size):
+                return False
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, self.size)
+        os.pwrite(self._fd, _HEADER.pack(MAGIC, self.owner, self.capacity, self.slot_size, self.doc_size), 0)
+        for slot in range(self.capacity):
+            os.pwrite(self._fd, _SLOT_HEADER.pack(0, -1, 0, -1, 0), self._ring_offset + slot * self.slot_size)
+        return True
+
+    def _locked(self) -> '_FileLock':
+        return _FileLock(self._lock, self._fd)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    # ============================================
+    # COUNTERS & GAUGES
+    # ============================================
+
+    def get(self, name: str):
+        return struct.unpack_from('<' + FIELDS[name], self._map, _FIELD_OFFSETS[name])[0]
+
+    def set(self, name: str, value):
+        with self._locked():
+            struct.pack_into('<' + FIELDS[name], self._map, _FIELD_OFFSETS[name], value)
+
+    def incr(self, name: str, delta=1):
+        """Atomically add delta; returns the new value"""
+        fmt = '<' + FIELDS[name]
+        offset = _FIELD_OFFSETS[name]
+        with self._locked():
+            value = struct.unpack_from(fmt, self._map, offset)[0] + delta
+            struct.pack_into(fmt, self._map, offset, value)
+        return value
+
+    # ============================================
+    # RECORD RING
+    # ============================================
+
+    def _slot(self, record_id: int) -> int:
+        return self._ring_offset + (record_id % self.capacity) * self.slot_size
+
+    def _write_slot(self, offset: int, record_id: int, payload: bytes, source: int = -1, latency: int = 0):
+        seq = _SLOT_HEADER.unpack_from(self._map, offset)[0] + 1
+        self._map[offset + _SLOT_HEADER.size:offset + _SLOT_HEADER.size + len(payload)] = payload
+        _SLOT_HEADER.pack_into(self._map, offset, seq, record_id, len(payload), source, latency)
+
+    def _add_source(self, index: int, count: int, latency: int):
+        offset = _SOURCES_OFFSET + index * _SOURCE.size + 16
+        old_count, old_latency = struct.unpack_from('<qq', self._map, offset)
+        struct.pack_into('<qq', self._map, offset, old_count + count, old_latency + latency)
+
+    def _source_index(self, source: str) -> int:
+        """Slot of a source name, claiming a free one the first time (caller holds the lock); -1 if full"""
+        name = source.encode('utf-8')[:16]
+        for index in range(SOURCE_SLOTS):
+            stored = _SOURCE.unpack_from(self._map, _SOURCES_OFFSET + index * _SOURCE.size)[0].rstrip(b'\0')
+            if stored == name:
+                return index
+            if not stored:
+                _SOURCE.pack_into(self._map, _SOURCES_OFFSET + index * _SOURCE.size, name, 0, 0)
+                return index
+        return -1
+
+    def encode(self, record) -> bytes:
+        payload = json.dumps(record, default=str, separators=(',', ':')).encode('utf-8')
+        if len(payload) > self.slot_size - _SLOT_HEADER.size:
+            raise ValueError(f"Record of {len(payload)} bytes does not fit a {self.slot_size} byte slot")
+        return payload
+
+    def append(self, record_id: int, payload: bytes, source: Optional[str] = None, response_time: float = 0.0):
+        """
+        Store an encoded record under its id (ids come from incr(), so slots never collide).
+        With a source, the record counts towards source_stats() until its slot is overwritten.
+        """
+        offset = self._slot(record_id)
+        latency = int(response_time * (1 << LATENCY_BITS))
+        with self._locked():
+            _, stored_id, _, evicted, evicted_latency = _SLOT_HEADER.unpack_from(self._map, offset)
+            if stored_id != -1 and evicted >= 0:
+                self._add_source(evicted, -1, -evicted_latency)
+            index = self._source_index(source) if source is not None else -1
+            if index >= 0:
+                self._add_source(index, 1, latency)
+            self._write_slot(offset, record_id, payload, index, latency if index >= 0 else 0)
+
+    def source_stats(self) -> Dict[str, Tuple[int, float]]:
+        """(count, mean response time) per source over the records in the ring - constant time"""
+        stats = {}
+        with self._locked():
+            for index in range(SOURCE_SLOTS):
+                name, count, latency = _SOURCE.unpack_from(self._map, _SOURCES_OFFSET + index * _SOURCE.size)
+                if not name.rstrip(b'\0'):
+                    break
+                if count:
+                    stats[name.rstrip(b'\0').decode('utf-8')] = (count, latency / (count << LATENCY_BITS))
+        return stats
+
+    def update(self, record_id: int, change: Callable[[Dict[str, Any]], None]) -> bool:
+        """Read-modify-write one record in place; False if it has already been overwritten"""
+        offset = self._slot(record_id)
+        with self._locked():
+            _, stored_id, length, source, latency = _SLOT_HEADER.unpack_from(self._map, offset)
+            if stored_id != record_id:
+                return False
+            start = offset + _SLOT_HEADER.size
+            record = json.loads(self._map[start:start + length])
+            change(record)
+            self._write_slot(offset, record_id, self.encode(record), source, latency)
+        return True
+
+    def records(self, newest: int, limit: Optional[int] = None) -> List[Any]:
+        """Records with ids up to `newest` (exclusive), oldest first"""
+        count = min(newest, self.capacity if limit is None else min(limit, self.capacity))
+        out = []
+        cache = self._record_cache
+        with self._locked():
+            for record_id in range(newest - count, newest):
+                offset = self._slot(record_id)
+                seq, stored_id, length = _SLOT_HEADER.unpack_from(self._map, offset)[:3]
+                if stored_id != record_id:
+                    continue # id reserved but not written yet
+                cached = cache.get(record_id)
+                if cached is None or cached[0] != seq:
+                    start = offset + _SLOT_HEADER.size
+                    cached = cache[record_id] = (seq, json.loads(self._map[start:start + length]))
+                out.append(cached[1])
+        if len(cache) > 2 * self.capacity:
+            floor = newest - self.capacity
+            for record_id in [rid for rid in cache if rid < floor]:
+                del cache[record_id]
+        return out
+
+    # ============================================
+    # DOCUMENTS
+    # ============================================
+
+    def _doc_offset(self, name: str) -> int:
+        return self._docs_offset + DOCUMENTS.index(name) * self.doc_size
+
+    def doc_version(self, name: str) -> int:
+        return _DOC_HEADER.unpack_from(self._map, self._doc_offset(name))[0]
+
+    def load_doc(self, name: str, default=None):
+        offset = self._doc_offset(name)
+        cached = self._doc_cache.get(name)
+        if cached is not None and cached[0] == self.doc_version(name):
+            return cached[1]
+        with self._locked():
+            version, length = _DOC_HEADER.unpack_from(self._map, offset)
+            if version == 0:
+                return default
+            start = offset + _DOC_HEADER.size
+            value = json.loads(self._map[start:start + length])
+        self._doc_cache[name] = (version, value)
+        return value
+
+    def _write_doc(self, name: str, value) -> int:
+        # Caller holds the lock
+        payload = json.dumps(value, default=str, separators=(',', ':')).encode('utf-8')
+        if len(payload) > self.doc_size - _DOC_HEADER.size:
+            raise ValueError(f"Document {name} ({len(payload)} bytes) does not fit in {self.doc_size} bytes")
+        offset = self._doc_offset(name)
+        version = _DOC_HEADER.unpack_from(self._map, offset)[0] + 1
+        start = offset + _DOC_HEADER.size
+        self._map[start:start + len(payload)] = payload
+        _DOC_HEADER.pack_into(self._map, offset, version, len(payload))
+        return version
+
+    def save_doc(self, name: str, value) -> int:
+        """Replace a document; returns its new version"""
+        with self._locked():
+            return self._write_doc(name, value)
+
+    def update_doc(self, name: str, change: Callable[[Any], Any], default=None):
+        """Read-modify-write a document under the lock, so workers never lose each other's changes"""
+        offset = self._doc_offset(name)
+        with self._locked():
+            version, length = _DOC_HEADER.unpack_from(self._map, offset)
+            start = offset + _DOC_HEADER.size
+            value = json.loads(self._map[start:start + length]) if version else default
+            value = change(value)
+            self._write_doc(name, value)
+        return value
+
+    def bind(self, name: str, obj, fields: Dict[str, Optional[Callable]]) -> 'SharedObject':
+        return SharedObject(self, name, obj, fields)
+
+    # ============================================
+    # RESET & STATS
+    # ============================================
+
+    def reset_records(self):
+        with self._locked():
+            for name in ('total_requests', 'errors'):
+                struct.pack_into('<q', self._map, _FIELD_OFFSETS[name], 0)
+            for slot in range(self.capacity):
+                offset = self._ring_offset + slot * self.slot_size
+                seq = _SLOT_HEADER.unpack_from(self._map, offset)[0] + 1
+                _SLOT_HEADER.pack_into(self._map, offset, seq, -1, 0, -1, 0)
+            self._map[_SOURCES_OFFSET:_SOURCES_OFFSET + SOURCE_SLOTS * _SOURCE.size] = bytes(SOURCE_SLOTS * _SOURCE.size)
+        self._record_cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'size_bytes': self.size,
+            'capacity': self.capacity,
+            'slot_size': self.slot_size,
+            'pid': os.getpid(),
+            'owner': self.owner,
+            'counters': {name: self.get(name) for name in FIELDS},
+            'document_versions': {name: self.doc_version(name) for name in DOCUMENTS},
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+class SharedObject:
+    """Mirror some attributes of a per-process object into a shared document"""
+
+    def __init__(self, state: SharedState, name: str, obj, fields: Dict[str, Optional[Callable]]):
+        """
+        Args:
+            fields: Attribute -> function rebuilding it from its JSON form (None keeps the JSON value)
+        """
+        self.state = state
+        self.name = name
+        self.obj = obj
+        self.fields = fields
+        self.version = 0
+
+    def pull(self):
+        """Adopt the shared copy if another worker changed it since our last pull/push"""
+        version = self.state.doc_version(self.name)
+        if version == self.version:
+            return
+        doc = self.state.load_doc(self.name)
+        if doc is not None:
+            for field, restore in self.fields.items():
+                if field in doc:
+                    setattr(self.obj, field, restore(doc[field]) if restore else doc[field])
+        self.version = version
+
+    def push(self):
+        doc = {}
+        for field in self.fields:
+            value = getattr(self.obj, field)
+            doc[field] = list(value) if not isinstance(value, (dict, list, str, int, float)) else value
+        self.version = self.state.save_doc(self.name, doc)
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    import tempfile
+    import time
+
+    # What one proxied request costs the worker in CPU: normalize a legacy XML body and
+    # log the request. Upstream I/O is left out; it overlaps anyway.
+    from legacy_system import to_xml
+    from response_normalizer import ResponseNormalizer
+
+    parts = [{'PART_NO': f"PART{i:03d}", 'PART_NAME': f"Part {i}", 'PART_DESC': 'Benchmark part',
+              'STOCK_QTY': i, 'PRICE': i * 1.5, 'SUPPLIER': 'BOSCH', 'STATUS': 'ACTIVE'} for i in range(20)]
+    body = to_xml({'status': 'SUCCESS', 'part_count': 20, 'parts': parts,
+                   'timestamp': '2024-01-01T00:00:00'}, 'InventoryResponse').encode()
+    seconds = 3.0
+
+    def worker(path, results, index):
+        state = SharedState(path, owner=0)
+        normalizer = ResponseNormalizer()
+        done = 0
+        stop_at = time.perf_counter() + seconds
+        while time.perf_counter() < stop_at:
+            response = normalizer.normalize_text('inventory/list_all', body)
+            record_id = state.incr('total_requests') - 1
+            state.append(record_id, state.encode({'id': record_id, 'endpoint': 'inventory/list_all',
+                                                  'source': 'legacy', 'response_time': 2000.0,
+                                                  'response_data': response}))
+            if done % 100 == 0:
+                state.records(state.get('total_requests'), 100) # a metrics poll now and then
+            done += 1
+        results[index] = done
+        state.close()
+
+    print(f"CPU cores: {os.cpu_count()}; {seconds:.0f}s per run, normalize + shared log_request per request")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (1, 2, 4):
+            path = os.path.join(tmp, f'state-{workers}')
+            SharedState(path, owner=0).close()
+            results = multiprocessing.Array('q', workers)
+            procs = [multiprocessing.Process(target=worker, args=(path, results, i)) for i in range(workers)]
+            for proc in procs:
+                proc.start()
+            for proc in procs:
+                proc.join()
+            total = sum(results) / seconds
+            baseline = baseline or total
+            state = SharedState(path, owner=0)
+            assert state.get('total_requests') == sum(results)
+            state.close()
+            print(f"  {workers} worker(s): {total:9.0f} req/s total, {total / workers:9.0f} req/s per worker, "
+                  f"{total / baseline:4.2f}x of 1 worker")
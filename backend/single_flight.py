@@ -0,0 +1,135 @@
+# ============================================
+# FEATURE #17: Request Coalescing (Single-Flight)
+# File: backend/single_flight.py
+# Purpose: Share one upstream call between identical concurrent requests
+# ============================================
+
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+
+class _Call:
+    """One in-flight upstream call and the requests waiting on it"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self, done=None):
+        self.done = done or threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls: the first caller runs, the rest wait"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, _Call] = {} # asyncio engine; its waiters can't block on a threading.Event
+
+        self.leaders = 0
+        self.coalesced_waiters = 0
+        self.max_waiters = 0
+        self.waiter_timeouts = 0
+
+    @staticmethod
+    def make_key(source: str, endpoint: str, data) -> str:
+        return f"{source}|{endpoint}|{json.dumps(data or {}, sort_keys=True, separators=(',', ':'), default=str)}"
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None):
+        """
+        Run fn() once per key at a time and hand its result to every caller.
+
+        Args:
+            key: Identity of the call (backend + endpoint + normalized body)
+            fn: The upstream call; runs on the first caller's thread
+            timeout: How long *this* caller waits if it joins an in-flight call
+        """
+        if not self.enabled:
+            return fn()
+
+        call, leader = self._join(self._calls, key, threading.Event)
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            with self._lock:
+                self.waiter_timeouts += 1
+            raise TimeoutError(f"Timed out after {timeout}s waiting for a coalesced upstream call")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable], timeout: Optional[float] = None):
+        """do() for the asyncio engine: the leader awaits fn(), the others await its result"""
+        if not self.enabled:
+            return await fn()
+
+        call, leader = self._join(self._async_calls, key, asyncio.Event)
+        if leader:
+            try:
+                call.result = await fn()
+            except asyncio.CancelledError:
+                # The leader's client went away; its waiters still need an answer
+                call.error = TimeoutError("Coalesced upstream call was cancelled")
+                raise
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._async_calls[key]
+                call.done.set()
+        else:
+            try:
+                await asyncio.wait_for(call.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self.waiter_timeouts += 1
+                raise TimeoutError(f"Timed out after {timeout}s waiting for a coalesced upstream call")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _join(self, calls: Dict[str, _Call], key: str, event):
+        # (call, True) for the caller that has to make it, (call, False) for one that waits
+        with self._lock:
+            call = calls.get(key)
+            if call is None:
+                call = calls[key] = _Call(event())
+                self.leaders += 1
+                return call, True
+            call.waiters += 1
+            self.coalesced_waiters += 1
+            self.max_waiters = max(self.max_waiters, call.waiters)
+            return call, False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self._calls.values()) + list(self._async_calls.values())
+            in_flight = len(calls)
+            waiting = sum(call.waiters for call in calls)
+            total = self.leaders + self.coalesced_waiters
+            return {
+                'enabled': self.enabled,
+                'in_flight_calls': in_flight,
+                'current_waiters': waiting,
+                'upstream_calls': self.leaders,
+                'coalesced_waiters': self.coalesced_waiters,
+                'coalesced_ratio': round(self.coalesced_waiters / total, 3) if total else 0,
+                'max_waiters': self.max_waiters,
+                'waiter_timeouts': self.waiter_timeouts,
+                'timestamp': datetime.now().isoformat()
+            }
@@ -0,0 +1,196 @@
+# ============================================
+# FEATURE #10: Pooled Keep-Alive Upstream Sessions
+# File: backend/upstream_pool.py
+# Purpose: Reuse TCP/TLS connections to the legacy and cloud services
+# ============================================
+
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from structured_log import get_logger
+
+log = get_logger()
+
+# Ask the OS to keep idle upstream sockets alive between requests
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+]
+
+
+def _timed_pool_class(pool_cls, on_connect):
+    """Subclass a urllib3 pool so every new TCP/TLS handshake is timed"""
+
+    class TimedConnection(pool_cls.ConnectionCls):
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            on_connect((time.perf_counter() - started) * 1000)
+
+    return type(pool_cls.__name__, (pool_cls,), {'ConnectionCls': TimedConnection})
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that uses timed, keep-alive connection pools"""
+
+    def __init__(self, on_connect, **kwargs):
+        self._on_connect = on_connect
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault('socket_options', KEEPALIVE_SOCKET_OPTIONS)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _timed_pool_class(HTTPConnectionPool, self._on_connect),
+            'https': _timed_pool_class(HTTPSConnectionPool, self._on_connect),
+        }
+
+
+class UpstreamPool:
+    """Keep-alive connection pool and stats for a single upstream service"""
+
+    def __init__(self, name: str, base_url: str, pool_size: int = 16,
+                 health_path: str = '/health', timeout: float = 10):
+        """
+        Args:
+            name: Label used in metrics ('legacy' or 'cloud')
+            base_url: Root URL of the upstream service
+            pool_size: Maximum number of kept-alive connections
+            health_path: Cheap endpoint used to pre-warm connections
+            timeout: Default request timeout in seconds
+        """
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.health_path = health_path
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self.total_requests = 0
+        self.active_connections = 0
+        self.new_connections = 0
+        self.connect_time_total_ms = 0.0
+        self.last_connect_ms = None
+        self.prewarmed_connections = 0
+        self.prewarm_errors = 0
+
+        self.adapter = _PooledAdapter(
+            self._record_connect,
+            pool_connections=1,
+            pool_maxsize=pool_size,
+        )
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    # ============================================
+    # REQUESTS
+    # ============================================
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request over a pooled connection"""
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self.total_requests += 1
+            self.active_connections += 1
+        try:
+            return self.session.request(method, url, **kwargs)
+        finally:
+            with self._lock:
+                self.active_connections -= 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    # ============================================
+    # PRE-WARMING
+    # ============================================
+
+    def prewarm(self, connections: int = 2):
+        """Open `connections` connections in parallel so they sit idle in the pool"""
+        connections = min(connections, self.pool_size)
+        url = f"{self.base_url}{self.health_path}"
+
+        def warm():
+            try:
+                self.get(url, timeout=self.timeout).close()
+                with self._lock:
+                    self.prewarmed_connections += 1
+            except Exception as e:
+                with self._lock:
+                    self.prewarm_errors += 1
+                log.warning('pool', 'Pre-warm failed', pool=self.name, error=str(e))
+
+        workers = [threading.Thread(target=warm, daemon=True) for _ in range(connections)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        log.info('pool', 'Pre-warmed connections', pool=self.name, prewarmed=self.prewarmed_connections,
+                 requested=connections)
+
+    def prewarm_async(self, connections: int = 2) -> threading.Thread:
+        """Pre-warm in the background so startup is never blocked on the network"""
+        thread = threading.Thread(target=self.prewarm, args=(connections,), daemon=True)
+        thread.start()
+        return thread
+
+    # ============================================
+    # STATS
+    # ============================================
+
+    def _record_connect(self, elapsed_ms: float):
+        with self._lock:
+            self.new_connections += 1
+            self.connect_time_total_ms += elapsed_ms
+            self.last_connect_ms = elapsed_ms
+
+    def _idle_connections(self) -> int:
+        pools = self.adapter.poolmanager.pools
+        idle = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None and pool.pool is not None:
+                idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        return idle
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Reuse ratio, active/idle connections and connect time for this pool"""
+        with self._lock:
+            total = self.total_requests
+            new = self.new_connections
+            active = self.active_connections
+            connect_total = self.connect_time_total_ms
+            last_connect: Optional[float] = self.last_connect_ms
+
+        reused = max(0, total - new)
+        return {
+            'name': self.name,
+            'base_url': self.base_url,
+            'pool_size': self.pool_size,
+            'total_requests': total,
+            'new_connections': new,
+            'reused_requests': reused,
+            'reuse_ratio': round(reused / total, 3) if total else 0,
+            'active_connections': active,
+            'idle_connections': self._idle_connections(),
+            'avg_connect_ms': round(connect_total / new, 2) if new else 0,
+            'last_connect_ms': round(last_connect, 2) if last_connect is not None else None,
+            'prewarmed_connections': self.prewarmed_connections,
+            'prewarm_errors': self.prewarm_errors,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def close(self):
+        self.session.close()
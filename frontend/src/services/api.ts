@@ -28,6 +28,31 @@ interface MigrationResponse {
   timestamp: string;
 }
 
+interface RampOptions {
+  target?: number;
+  step?: number;
+  interval?: number;
+  max_error_rate?: number;
+  max_p95_ms?: number;
+  max_p99_ms?: number;
+  on_breach?: "pause" | "rollback";
+}
+
+interface RampStatus {
+  state: "idle" | "running" | "stopped" | "paused" | "rolled_back" | "completed";
+  running: boolean;
+  reason: string | null;
+  migration_percentage: number;
+  window: Record<string, any>;
+  history: Array<Record<string, any>>;
+}
+
+interface RampResponse {
+  success: boolean;
+  ramp: RampStatus;
+  error?: string;
+}
+
 // Create axios instance
 const apiClient = axios.create({
   baseURL: API_URL,
@@ -53,9 +78,12 @@ const handleApiError = (error: any, functionName: string): any => {
 
 export const apiService = {
   // --- Pinia / Control Panel ---
-  async getMetrics(): Promise<MetricsResponse> {
+  // window: e.g. "5m" or "1h" for a time window instead of the last 100 requests
+  async getMetrics(window?: string): Promise<MetricsResponse> {
     try {
-      const response = await apiClient.get<MetricsResponse>("/proxy/metrics");
+      const response = await apiClient.get<MetricsResponse>("/proxy/metrics", {
+        params: window ? { window } : undefined,
+      });
       console.log("[API] Metrics received:", response.data);
       return response.data;
     } catch (error) {
@@ -98,6 +126,25 @@ export const apiService = {
     return response.data;
   },
 
+  // Server-side ramp: the proxy steps the percentage itself and gates each step on cloud SLOs
+  async startRamp(options: RampOptions = {}): Promise<RampResponse> {
+    const response = await apiClient.post<RampResponse>(
+      "/proxy/ramp/start",
+      options
+    );
+    return response.data;
+  },
+
+  async stopRamp(): Promise<RampResponse> {
+    const response = await apiClient.post<RampResponse>("/proxy/ramp/stop");
+    return response.data;
+  },
+
+  async getRampStatus(): Promise<RampResponse> {
+    const response = await apiClient.get<RampResponse>("/proxy/ramp/status");
+    return response.data;
+  },
+
   async saveMigrationPlan(planData: any): Promise<any> {
     const response = await apiClient.post("/proxy/plan/save", planData);
     return response.data;
@@ -124,6 +171,12 @@ export const apiService = {
     }
   },
 
+  // --- Live dashboard stream (server-sent events) ---
+  // Events: metrics (changed fields only), migration, history, compliance, scaling
+  openStream(): EventSource {
+    return new EventSource(`${API_URL}/proxy/stream`);
+  },
+
   // --- CodeAnalyzer ---
   async analyzeCode(file: string): Promise<any> {
     try {
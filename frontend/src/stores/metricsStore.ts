@@ -12,8 +12,17 @@ interface MetricsState {
   cost_saved: number;
   migration_percentage: number;
   performance_improvement: number;
+  // Live stream: while connected, components stop polling and read these instead
+  streamConnected: boolean;
+  history: any[];
+  historyTotal: number;
+  compliance: any | null;
+  scaling: any | null;
 }
 
+const HISTORY_LIMIT = 30;
+let stream: EventSource | null = null;
+
 export const useMetricsStore = defineStore("metrics", {
   // 1. STATE: The single source of truth
   state: (): MetricsState => ({
@@ -26,6 +35,11 @@ export const useMetricsStore = defineStore("metrics", {
     cost_saved: 0,
     migration_percentage: 0,
     performance_improvement: 0,
+    streamConnected: false,
+    history: [],
+    historyTotal: 0,
+    compliance: null,
+    scaling: null,
   }),
 
   // 2. GETTERS: Your computed properties
@@ -51,5 +65,43 @@ export const useMetricsStore = defineStore("metrics", {
         console.error("[Pinia] Error fetching metrics:", error);
       }
     },
+
+    // One stream per tab instead of every component polling on its own timer
+    connectStream() {
+      if (stream) return;
+      stream = apiService.openStream();
+      const on = (event: string, handler: (data: any) => void) =>
+        stream!.addEventListener(event, (e) => handler(JSON.parse((e as MessageEvent).data)));
+
+      stream.onopen = () => {
+        this.streamConnected = true;
+        console.log("[Pinia] Live stream connected");
+      };
+      stream.onerror = () => {
+        // Poll until onopen fires again, so a dropped connection never leaves the dashboard frozen.
+        this.streamConnected = false;
+        // CLOSED: refused (e.g. too many open streams) - stay on polling.
+        // Otherwise the browser reconnects by itself.
+        if (stream?.readyState === EventSource.CLOSED) {
+          this.disconnectStream();
+          console.warn("[Pinia] Live stream unavailable, polling instead");
+        }
+      };
+      on("metrics", (delta) => this.$patch(delta));
+      on("migration", (data) => this.$patch(data));
+      on("history", (data) => {
+        const entries = data.reset ? data.entries : [...data.entries, ...this.history];
+        this.history = entries.slice(0, HISTORY_LIMIT);
+        this.historyTotal = data.total_requests;
+      });
+      on("compliance", (data) => (this.compliance = data));
+      on("scaling", (data) => (this.scaling = data));
+    },
+
+    disconnectStream() {
+      stream?.close();
+      stream = null;
+      this.streamConnected = false;
+    },
   },
 });